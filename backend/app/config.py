@@ -1,6 +1,6 @@
 """Configuration and environment variables."""
 from pathlib import Path
-from typing import List
+from typing import Dict, List
 
 from pydantic_settings import BaseSettings
 
@@ -11,12 +11,18 @@ class Settings(BaseSettings):
     # LLM Configuration
     openai_api_key: str = ""
     openai_project_id: str = ""
+    openai_base_url: str = ""  # OpenAI-compatible endpoint; defaults to api.openai.com
     anthropic_api_key: str = ""
     anthropic_model: str = "claude-3-haiku-20240307"
     google_api_key: str = ""
     llm_model: str = "gpt-4"
     llm_provider: str = "openai"
     gemini_model: str = "gemini-pro"
+    tool_timeout_seconds: float = 25.0  # per tool call; calls in one turn run concurrently
+    llm_context_window: int = 0  # tokens; 0 uses the known window for LLM_MODEL
+    llm_reserved_output_tokens: int = 1000  # kept free for the model's answer
+    token_cache_size: int = 4096  # cached per-message token counts
+    tool_response_templates: bool = True  # phrase templatable tool results without a second completion
     
     # Eleven Labs
     eleven_labs_api_key: str = ""
@@ -42,8 +48,34 @@ class Settings(BaseSettings):
     mcp_rag_service: str = "mcp-rag"
     
     # Product Catalog
-    product_catalog_url: str = "https://tubbyai-products-catalog.s3.amazonaws.com/unified-products-master.json"
+    product_catalog_url: str = "https://tubbyai-products-catalog.s3.amazonaws.com/unified-products-master.json"  # or a local path / file:// URL
     product_media_base_url: str = "https://tubbyai-products-catalog.s3.amazonaws.com/"
+    product_synonyms_url: str = ""  # defaults to the bundled app/data/product_synonyms.json
+    product_snapshot_url: str = ""  # prebuilt binary catalog (URL or local path); JSON is the fallback
+    product_snapshot_cache_path: str = ""  # snapshot file shared by workers on one host, e.g. /tmp/tubby-catalog.snapshot
+    search_cache_size: int = 512  # cached tool search results (per catalog version)
+    
+    # Shopping carts
+    cart_store: str = "sqlite"  # sqlite | memory (local stand-in for DynamoDB/Redis)
+    cart_db_path: str = ""  # defaults to <tempdir>/tubbyai-carts.db
+    cart_cache_size: int = 1024
+    cart_flush_interval_seconds: float = 0.5  # 0 writes through on every update (use on Lambda)
+    cart_flush_batch_size: int = 100
+    
+    # Response cache (off by default): reuse answers to repeated self-contained questions
+    response_cache_enabled: bool = False
+    response_cache_size: int = 1024
+    response_cache_ttls: Dict[str, float] = {}  # per-tool TTL overrides in seconds, e.g. {"search_products": 600}
+    response_cache_embedding_model: str = ""  # sentence-transformers model for near-duplicate matching
+    response_cache_similarity: float = 0.92
+    
+    # Conversation memory
+    conversation_store: str = "sqlite"  # sqlite | memory
+    conversation_db_path: str = ""  # defaults to <tempdir>/tubbyai-conversations.db
+    conversation_cache_size: int = 256
+    conversation_recent_messages: int = 6  # kept verbatim; older ones are summarized
+    conversation_summary_batch: int = 6  # messages folded into the summary at a time
+    conversation_summary_max_tokens: int = 300
     
     # Server Configuration
     backend_host: str = "0.0.0.0"
@@ -68,6 +100,8 @@ class Settings(BaseSettings):
             self.openai_api_key = self.openai_api_key.strip()
         if self.openai_project_id:
             self.openai_project_id = self.openai_project_id.strip()
+        if self.openai_base_url:
+            self.openai_base_url = self.openai_base_url.strip()
         if self.anthropic_api_key:
             self.anthropic_api_key = self.anthropic_api_key.strip()
         if self.anthropic_model:
@@ -92,6 +126,22 @@ class Settings(BaseSettings):
             self.product_catalog_url = self.product_catalog_url.strip()
         if self.product_media_base_url:
             self.product_media_base_url = self.product_media_base_url.strip()
+        if self.product_synonyms_url:
+            self.product_synonyms_url = self.product_synonyms_url.strip()
+        if self.product_snapshot_url:
+            self.product_snapshot_url = self.product_snapshot_url.strip()
+        if self.product_snapshot_cache_path:
+            self.product_snapshot_cache_path = self.product_snapshot_cache_path.strip()
+        if self.cart_store:
+            self.cart_store = self.cart_store.strip().lower()
+        if self.cart_db_path:
+            self.cart_db_path = self.cart_db_path.strip()
+        if self.conversation_store:
+            self.conversation_store = self.conversation_store.strip().lower()
+        if self.conversation_db_path:
+            self.conversation_db_path = self.conversation_db_path.strip()
+        if self.response_cache_embedding_model:
+            self.response_cache_embedding_model = self.response_cache_embedding_model.strip()
 
 
 settings = Settings()
@@ -1,16 +1,21 @@
 """FastAPI application entry point."""
+import asyncio
 import logging
 import tempfile
 import os
 import base64
+import json
+import uuid
+from typing import List, Optional
 
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import BackgroundTasks, FastAPI, UploadFile, File, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import Response, JSONResponse
+from fastapi.responses import Response, JSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
 from mangum import Mangum
 
 from app.config import settings
-from app.models.request import TTSRequest, ChatRequest
+from app.models.request import TTSRequest, ChatRequest, ProductLookupRequest
 from app.models.response import STTResponse, TTSResponse, ChatResponse
 from app.mcp.client import execute_mcp_command
 from app.services.llm import llm_service
@@ -19,7 +24,26 @@ from app.services.stt_fallback import transcribe_with_openai
 from app.services.tts_fallback import synthesize_with_elevenlabs
 from app.services.tts_fallback_gtts import synthesize_with_gtts
 from app.services.api_key_manager import api_key_manager
-from app.tools.product_search import search_products, add_to_cart
+from app.services.metrics import metrics
+from app.services.http_client import close_async_client
+from app.services.cart import cart_service, current_cart_id
+from app.services.conversation import conversation_service
+from app.services.response_cache import response_cache
+from app.services.product_catalog import product_catalog
+from app.tools.product_search import (
+    DEFAULT_PAGE_SIZE,
+    DEFAULT_SUGGEST_LIMIT,
+    MAX_SUGGEST_LIMIT,
+    search_products,
+    search_products_page,
+    iter_search_results,
+    add_to_cart,
+    product_facets,
+    suggest_products,
+    get_product,
+    lookup_products,
+    get_cart,
+)
 from app.tools.grokipedia import grokipedia_search
 from app.tools.alpha_vantage import alpha_vantage_market_data
 from app.tools.polymarket import polymarket_market_data
@@ -62,6 +86,43 @@ tool_executor.register_tool("alpha_vantage_market_data", alpha_vantage_market_da
 tool_executor.register_tool("polymarket_market_data", polymarket_market_data)
 
 
+@app.on_event("startup")
+async def start_catalog_refresher():
+    """Load the product catalog in the background and keep it fresh."""
+    product_catalog.start_background_refresh()
+
+
+@app.on_event("startup")
+async def load_tokenizer():
+    """Load the tokenizer vocabulary now rather than on the first chat."""
+    await asyncio.to_thread(lambda: llm_service.token_counter.exact)
+
+
+@app.on_event("shutdown")
+async def stop_catalog_refresher():
+    """Stop the background catalog refresher."""
+    await product_catalog.stop_background_refresh()
+
+
+@app.on_event("shutdown")
+def flush_carts():
+    """Write carts still waiting in the write-back cache."""
+    cart_service.close()
+
+
+@app.on_event("shutdown")
+def close_conversations():
+    """Close the conversation store."""
+    conversation_service.close()
+
+
+@app.on_event("shutdown")
+async def close_http_clients():
+    """Close pooled connections to the LLM and tool APIs."""
+    await llm_service.aclose()
+    await close_async_client()
+
+
 @app.get("/")
 async def root():
     """Root endpoint with API information."""
@@ -72,9 +133,16 @@ async def root():
         "endpoints": {
             "health": "/health or /api/health",
             "chat": "POST /api/chat",
+            "chat_stream": "POST /api/chat/stream (Server-Sent Events)",
             "stt": "POST /api/stt/transcribe",
             "tts": "POST /api/tts/synthesize",
-            "products": "GET /api/products/search?query=..."
+            "products": "GET /api/products/search?query=...&limit=...&cursor=...",
+            "facets": "GET /api/products/facets",
+            "suggest": "GET /api/products/suggest?prefix=...",
+            "product": "GET /api/products/{product_id}",
+            "lookup": "POST /api/products/lookup",
+            "cart": "GET /api/cart/{cart_id}",
+            "metrics": "GET /api/metrics"
         },
         "docs": "/docs (Swagger UI)"
     }
@@ -91,6 +159,12 @@ async def health_check():
     }
 
 
+@app.get("/api/metrics")
+async def metrics_endpoint():
+    """Service metrics: counters, timings and catalog freshness."""
+    return metrics.snapshot()
+
+
 @app.post("/api/stt/transcribe", response_model=STTResponse)
 async def transcribe_audio(audio_file: UploadFile = File(...)):
     """
@@ -289,91 +363,160 @@ async def synthesize_speech(request: TTSRequest):
         raise HTTPException(500, f"Speech synthesis error: {str(e)}")
 
 
-@app.post("/api/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest):
+async def _handle_settings_intents(request: ChatRequest) -> Optional[ChatResponse]:
     """
-    Chat endpoint with LLM and tool calling.
-    Includes smart API key detection and management.
-    
-    Args:
-        request: Chat request with message and optional conversation history
+    Answer chat messages that manage API keys or the LLM provider.
     
     Returns:
-        LLM response with optional tool usage info
+        The reply, or None if the message is a regular chat message
     """
-    try:
-        # Check if user wants to switch LLM provider
-        provider_intent = api_key_manager.detect_provider_intent(request.message)
-        if provider_intent:
-            success, message = api_key_manager.update_provider(provider_intent)
-            if success:
-                return ChatResponse(
-                    text=f"✅ {message}",
-                    conversation_id=request.conversation_id,
-                    tools_used=[]
-                )
+    # Check if user wants to switch LLM provider
+    provider_intent = api_key_manager.detect_provider_intent(request.message)
+    if provider_intent:
+        # .env writes happen off the event loop
+        success, message = await asyncio.to_thread(api_key_manager.update_provider, provider_intent)
+        if success:
             return ChatResponse(
-                text=f"❌ {message}",
+                text=f"✅ {message}",
                 conversation_id=request.conversation_id,
                 tools_used=[]
             )
+        return ChatResponse(
+            text=f"❌ {message}",
+            conversation_id=request.conversation_id,
+            tools_used=[]
+        )
 
-        # Check if user wants to set an API key
-        key_intent = api_key_manager.detect_key_intent(request.message)
+    # Check if user wants to set an API key
+    key_intent = api_key_manager.detect_key_intent(request.message)
+    
+    if key_intent:
+        # User wants to set an API key
+        service = key_intent['service']
+        key = key_intent['key']
         
-        if key_intent:
-            # User wants to set an API key
-            service = key_intent['service']
-            key = key_intent['key']
-            
-            success, message = api_key_manager.update_env_key(service, key)
-            
-            if success:
-                return ChatResponse(
-                    text=f"✅ {message}\n\nI've updated your {service} API key. "
-                         f"Please restart the backend server (stop with CTRL+C and run 'python -m app.main' again) "
-                         f"for the changes to take effect.",
-                    conversation_id=request.conversation_id,
-                    tools_used=[]
-                )
-            else:
-                return ChatResponse(
-                    text=f"❌ {message}\n\nPlease check the key format and try again. "
-                         f"Example: 'Set my OpenAI key to sk-proj-...'",
-                    conversation_id=request.conversation_id,
-                    tools_used=[]
-                )
+        success, message = await asyncio.to_thread(api_key_manager.update_env_key, service, key)
         
-        # Check API key status if user asks
-        if any(word in request.message.lower() for word in ['api key', 'key status', 'configured keys', 'what keys']):
-            status = api_key_manager.get_key_status()
-            configured = [k for k, v in status.items() if v]
-            missing = [k for k, v in status.items() if not v]
-            
-            status_text = "**API Key Status:**\n\n"
-            if configured:
-                status_text += f"✅ Configured: {', '.join(configured)}\n"
-            if missing:
-                status_text += f"❌ Missing: {', '.join(missing)}\n"
-            status_text += f"\nCurrent LLM provider: **{status.get('provider', 'openai')}**\n"
-            status_text += "\nTo set a key, say: 'Set my OpenAI key to sk-proj-...'."
-            status_text += "\nTo switch providers, say: 'Use Anthropic provider'."
-            
+        if success:
+            return ChatResponse(
+                text=f"✅ {message}\n\nI've updated your {service} API key. "
+                     f"Please restart the backend server (stop with CTRL+C and run 'python -m app.main' again) "
+                     f"for the changes to take effect.",
+                conversation_id=request.conversation_id,
+                tools_used=[]
+            )
+        else:
             return ChatResponse(
-                text=status_text,
+                text=f"❌ {message}\n\nPlease check the key format and try again. "
+                     f"Example: 'Set my OpenAI key to sk-proj-...'",
                 conversation_id=request.conversation_id,
                 tools_used=[]
             )
+    
+    # Check API key status if user asks
+    if any(word in request.message.lower() for word in ['api key', 'key status', 'configured keys', 'what keys']):
+        status = api_key_manager.get_key_status()
+        configured = [k for k, v in status.items() if v]
+        missing = [k for k, v in status.items() if not v]
         
-        # Get conversation history (or empty)
-        history = request.history or []
+        status_text = "**API Key Status:**\n\n"
+        if configured:
+            status_text += f"✅ Configured: {', '.join(configured)}\n"
+        if missing:
+            status_text += f"❌ Missing: {', '.join(missing)}\n"
+        status_text += f"\nCurrent LLM provider: **{status.get('provider', 'openai')}**\n"
+        status_text += "\nTo set a key, say: 'Set my OpenAI key to sk-proj-...'."
+        status_text += "\nTo switch providers, say: 'Use Anthropic provider'."
         
-        # Process with LLM and tools
-        result = llm_service.process_with_tools(
-            user_message=request.message,
-            conversation_history=history,
-            tools=TOOLS_SCHEMA,
-            tool_executor=tool_executor
+        return ChatResponse(
+            text=status_text,
+            conversation_id=request.conversation_id,
+            tools_used=[]
+        )
+
+    return None
+
+
+def _ensure_conversation_id(request: ChatRequest) -> None:
+    """
+    Give a new chat its own conversation id, and so its own cart and history.
+
+    Clients adopt the id returned with the first answer and send it back.
+    """
+    if not request.conversation_id:
+        request.conversation_id = uuid.uuid4().hex
+
+
+async def _conversation_history(request: ChatRequest) -> List[dict]:
+    """
+    History to send with this turn, from the conversation store.
+
+    The client's ``history`` fills in turns the server has not stored.
+    """
+    return await asyncio.to_thread(
+        conversation_service.context, request.conversation_id, request.history
+    )
+
+
+async def _remember_turn(request: ChatRequest, answer: str) -> None:
+    await asyncio.to_thread(
+        conversation_service.append_turn, request.conversation_id, request.message, answer or ""
+    )
+
+
+async def _cache_lookup(request: ChatRequest, history: List[dict]) -> Optional[dict]:
+    """The response cache's answer to ``request``, or None (also when the cache is off)."""
+    if response_cache is None:
+        return None
+    return await response_cache.lookup(
+        request.message, tool_executor, history, render=llm_service.render_tool_response
+    )
+
+
+@app.post("/api/chat", response_model=ChatResponse)
+async def chat(request: ChatRequest, background_tasks: BackgroundTasks):
+    """
+    Chat endpoint with LLM and tool calling.
+    Includes smart API key detection and management.
+    
+    Args:
+        request: Chat request with message and optional conversation history
+    
+    Returns:
+        LLM response with optional tool usage info
+    """
+    try:
+        _ensure_conversation_id(request)
+        settings_reply = await _handle_settings_intents(request)
+        if settings_reply is not None:
+            return settings_reply
+        
+        history = await _conversation_history(request)
+
+        # Cart tools act on this conversation's cart (tool threads inherit it)
+        current_cart_id.set(request.conversation_id)
+        
+        # Repeated questions are answered from the response cache (if enabled)
+        result = await _cache_lookup(request, history)
+        if result is None:
+            # Process with LLM and tools
+            result = await llm_service.process_with_tools(
+                user_message=request.message,
+                conversation_history=history,
+                tools=TOOLS_SCHEMA,
+                tool_executor=tool_executor,
+                trim_history=False,
+            )
+            if response_cache:
+                await response_cache.store(
+                    request.message, result["text"], result.get("tool_calls", []), history,
+                    templated=result.get("templated", False),
+                )
+
+        await _remember_turn(request, result["text"])
+        # Summarize older turns after the response is sent
+        background_tasks.add_task(
+            conversation_service.compact, request.conversation_id, llm_service.summarize
         )
         
         return ChatResponse(
@@ -389,34 +532,246 @@ async def chat(request: ChatRequest):
         raise HTTPException(500, f"Chat error: {str(e)}")
 
 
+def _sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def _cached_events(result: dict):
+    """The events of a streamed turn, for an answer from the response cache."""
+    yield {"type": "token", "text": result["text"]}
+    if result["tools_used"]:
+        yield {"type": "tool_result", "tools_used": result["tools_used"], "products": result["products"]}
+    yield {"type": "done", **result}
+
+
+async def _chat_events(request: ChatRequest):
+    """Server-sent events for one chat turn; errors end the stream with an ``error`` event."""
+    try:
+        settings_reply = await _handle_settings_intents(request)
+        if settings_reply is not None:
+            yield _sse_event("token", {"text": settings_reply.text})
+            yield _sse_event("done", settings_reply.model_dump())
+            return
+
+        history = await _conversation_history(request)
+
+        current_cart_id.set(request.conversation_id)
+        cached = await _cache_lookup(request, history)
+        if cached is not None:
+            events = _cached_events(cached)
+        else:
+            events = llm_service.stream_with_tools(
+                user_message=request.message,
+                conversation_history=history,
+                tools=TOOLS_SCHEMA,
+                tool_executor=tool_executor,
+                trim_history=False,
+            )
+        async for event in events:
+            event_type = event.pop("type")
+            if event_type == "done":
+                event["conversation_id"] = request.conversation_id
+                tool_calls = event.pop("tool_calls", [])
+                templated = event.pop("templated", False)
+                if response_cache and cached is None:
+                    await response_cache.store(request.message, event["text"], tool_calls, history, templated=templated)
+                await _remember_turn(request, event["text"])
+            yield _sse_event(event_type, event)
+    except Exception as e:
+        # Headers are already sent, so the failure is reported in-band
+        logger.exception("Chat stream error")
+        yield _sse_event("error", {"detail": f"Chat error: {str(e)}"})
+
+
+@app.post("/api/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """
+    Streaming chat: the answer is sent token by token as Server-Sent Events.
+    
+    Events: ``token`` (``text``), ``tool_call`` (``name``, ``arguments``),
+    ``tool_result`` (``tools_used``, ``products``), then ``done`` with the
+    same fields as ``POST /api/chat``, or ``error`` (``detail``). Voice
+    clients can start speaking at the first complete sentence.
+    
+    Args:
+        request: Chat request with message and optional conversation history
+    
+    Returns:
+        A ``text/event-stream`` response
+    """
+    _ensure_conversation_id(request)
+    return StreamingResponse(
+        _chat_events(request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        # Summarize older turns once the stream has closed
+        background=BackgroundTask(
+            conversation_service.compact, request.conversation_id, llm_service.summarize
+        ),
+    )
+
+
 @app.get("/api/products/search")
 async def search_products_endpoint(
-    query: str,
+    query: str = "",
     max_price: float = None,
-    category: str = None
+    category: str = None,
+    ranked: bool = True,
+    limit: Optional[int] = Query(None, ge=1),
+    cursor: Optional[str] = None,
+    format: str = Query("json", pattern="^(json|ndjson)$"),
 ):
     """
-    Direct product search endpoint (for testing/debugging).
+    Product search and listing endpoint, with cursor pagination.
     
     Args:
-        query: Search query
+        query: Search query (empty lists the whole catalog)
         max_price: Optional max price
         category: Optional category
+        ranked: Rank by relevance (default) or return catalog order
+        limit: Page size (default 5, max 100); with ndjson, caps the stream
+        cursor: ``next_cursor`` from the previous page
+        format: ``json`` for one page, ``ndjson`` to stream every result
+            (one product per line) for bulk consumers
     
     Returns:
-        List of matching products
+        A page of matching products with ``total`` and ``next_cursor``,
+        or an NDJSON stream
     """
     try:
-        products = search_products(query, max_price, category)
-        return {
-            "products": products,
-            "count": len(products)
-        }
+        # Catalog reads run on a worker thread: until the first load completes they wait for it
+        if format == "ndjson":
+            total, products = await asyncio.to_thread(
+                iter_search_results, query, max_price, category, ranked=ranked, cursor=cursor, limit=limit
+            )
+            return StreamingResponse(
+                _ndjson_lines(products),
+                media_type="application/x-ndjson",
+                headers={"X-Total-Count": str(total)},
+            )
+        return await asyncio.to_thread(
+            search_products_page,
+            query,
+            max_price,
+            category,
+            ranked=ranked,
+            limit=limit or DEFAULT_PAGE_SIZE,
+            cursor=cursor,
+        )
+    except ValueError as e:
+        raise HTTPException(400, str(e))
     except Exception as e:
         logger.exception("Product search error")
         raise HTTPException(500, f"Product search error: {str(e)}")
 
 
+def _ndjson_lines(products, batch_size: int = 256):
+    """Serialize products as NDJSON, a batch of lines per chunk."""
+    lines = []
+    for product in products:
+        lines.append(json.dumps(product, ensure_ascii=False))
+        if len(lines) >= batch_size:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+@app.get("/api/products/facets")
+async def product_facets_endpoint():
+    """
+    Product facets for filter UIs.
+    
+    Returns:
+        Per-category counts and price histograms for the current catalog
+    """
+    try:
+        return await asyncio.to_thread(product_facets)
+    except Exception as e:
+        logger.exception("Product facets error")
+        raise HTTPException(500, f"Product facets error: {str(e)}")
+
+
+@app.get("/api/products/suggest")
+async def suggest_products_endpoint(
+    prefix: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(DEFAULT_SUGGEST_LIMIT, ge=1, le=MAX_SUGGEST_LIMIT),
+):
+    """
+    Autocomplete product names for a search box.
+    
+    Args:
+        prefix: Text typed so far
+        limit: Maximum number of suggestions
+    
+    Returns:
+        Product names completing the prefix, most popular first
+    """
+    try:
+        return await asyncio.to_thread(suggest_products, prefix, limit)
+    except Exception as e:
+        logger.exception("Product suggest error")
+        raise HTTPException(500, f"Product suggest error: {str(e)}")
+
+
+@app.post("/api/products/lookup")
+async def lookup_products_endpoint(request: ProductLookupRequest):
+    """
+    Resolve many product IDs in one call.
+    
+    Args:
+        request: Product IDs or ASINs (up to 100)
+    
+    Returns:
+        Found products keyed by requested ID, plus the IDs that were not found
+    """
+    try:
+        return await asyncio.to_thread(lookup_products, request.product_ids)
+    except Exception as e:
+        logger.exception("Product lookup error")
+        raise HTTPException(500, f"Product lookup error: {str(e)}")
+
+
+# Declared after the fixed /api/products/... routes so it does not shadow them
+@app.get("/api/products/{product_id}")
+async def get_product_endpoint(product_id: str):
+    """
+    Product details by ID.
+    
+    Args:
+        product_id: Product ID or ASIN
+    
+    Returns:
+        The product
+    """
+    try:
+        product = await asyncio.to_thread(get_product, product_id)
+    except Exception as e:
+        logger.exception("Product lookup error")
+        raise HTTPException(500, f"Product lookup error: {str(e)}")
+    if product is None:
+        raise HTTPException(404, f"Product not found: {product_id}")
+    return product
+
+
+@app.get("/api/cart/{cart_id}")
+async def get_cart_endpoint(cart_id: str):
+    """
+    Cart contents for a conversation.
+    
+    Args:
+        cart_id: Cart ID (the chat conversation_id)
+    
+    Returns:
+        Items with quantities and product details
+    """
+    try:
+        return await asyncio.to_thread(get_cart, cart_id)
+    except Exception as e:
+        logger.exception("Cart error")
+        raise HTTPException(500, f"Cart error: {str(e)}")
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
@@ -1,5 +1,5 @@
 """Request models for API endpoints."""
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, List
 
 
@@ -13,7 +13,7 @@ class ChatRequest(BaseModel):
     """Chat request."""
     message: str
     conversation_id: Optional[str] = None
-    history: Optional[List[dict]] = None
+    history: Optional[List[dict]] = None  # fills in turns the server has not stored (new here, or answered elsewhere)
 
 
 class ProductSearchRequest(BaseModel):
@@ -22,3 +22,7 @@ class ProductSearchRequest(BaseModel):
     max_price: Optional[float] = None
     category: Optional[str] = None
 
+
+class ProductLookupRequest(BaseModel):
+    """Batch product lookup request."""
+    product_ids: List[str] = Field(..., min_length=1, max_length=100)
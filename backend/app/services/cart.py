@@ -0,0 +1,358 @@
+"""Shopping carts: write-back LRU cache over a pluggable persistent store."""
+import json
+import logging
+import sqlite3
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from app.config import settings
+from app.services.lru_cache import LRUCache
+from app.services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Cart for tool calls made outside a chat request (scripts, tests); the chat
+# endpoints give every conversation an id and so its own cart
+DEFAULT_CART_ID = "default"
+
+# The cart that tool calls in the current request operate on. Set by the chat
+# endpoint (one cart per conversation) so add_to_cart keeps its LLM-facing
+# signature.
+current_cart_id: ContextVar[str] = ContextVar("current_cart_id", default=DEFAULT_CART_ID)
+
+# A cart is ``product_id -> quantity``
+Items = Dict[str, int]
+
+
+class CartStore(ABC):
+    """Persistent cart storage. Carts are read and written whole."""
+
+    name = "store"
+
+    @abstractmethod
+    def load(self, cart_id: str) -> Optional[Items]:
+        """Return a stored cart, or None if it does not exist."""
+
+    @abstractmethod
+    def save_many(self, carts: Dict[str, Items]) -> None:
+        """
+        Persist several carts in as few round trips as the backend allows.
+
+        An empty cart deletes the stored one.
+        """
+
+    def close(self) -> None:
+        """Release connections."""
+
+
+class SQLiteCartStore(CartStore):
+    """Local default: one row per cart in a SQLite database (WAL mode)."""
+
+    name = "sqlite"
+
+    def __init__(self, path: str):
+        self.path = path
+        self._connection: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        # Opened on first use so importing the app never touches the filesystem
+        if self._connection is None:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(self.path, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS carts ("
+                "cart_id TEXT PRIMARY KEY, items TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._connection = connection
+        return self._connection
+
+    def load(self, cart_id: str) -> Optional[Items]:
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT items FROM carts WHERE cart_id = ?", (cart_id,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save_many(self, carts: Dict[str, Items]) -> None:
+        now = time.time()
+        upserts = [(cart_id, json.dumps(items), now) for cart_id, items in carts.items() if items]
+        deletes = [(cart_id,) for cart_id, items in carts.items() if not items]
+        with self._lock:
+            connection = self._connect()
+            with connection:  # one transaction per batch
+                if upserts:
+                    connection.executemany(
+                        "INSERT OR REPLACE INTO carts (cart_id, items, updated_at) VALUES (?, ?, ?)",
+                        upserts,
+                    )
+                if deletes:
+                    connection.executemany("DELETE FROM carts WHERE cart_id = ?", deletes)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+class InMemoryCartStore(CartStore):
+    """
+    Local stand-in for a remote key-value store such as DynamoDB or Redis.
+
+    Carts are kept serialized, writes are split into batches of at most
+    ``max_batch_items`` (25 matches DynamoDB BatchWriteItem) and every round
+    trip sleeps for ``latency`` seconds. That makes batching behaviour
+    measurable without a network service.
+    """
+
+    name = "memory"
+
+    def __init__(self, latency: float = 0.0, max_batch_items: int = 25):
+        self.latency = latency
+        self.max_batch_items = max_batch_items
+        self.round_trips = 0
+        self._data: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def _round_trip(self) -> None:
+        with self._lock:
+            self.round_trips += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def load(self, cart_id: str) -> Optional[Items]:
+        self._round_trip()
+        with self._lock:
+            raw = self._data.get(cart_id)
+        return json.loads(raw) if raw is not None else None
+
+    def save_many(self, carts: Dict[str, Items]) -> None:
+        entries = list(carts.items())
+        for start in range(0, len(entries), self.max_batch_items):
+            self._round_trip()
+            with self._lock:
+                for cart_id, items in entries[start:start + self.max_batch_items]:
+                    if items:
+                        self._data[cart_id] = json.dumps(items)
+                    else:
+                        self._data.pop(cart_id, None)
+
+
+def create_cart_store() -> CartStore:
+    """Build the store selected by ``CART_STORE`` (``sqlite`` or ``memory``)."""
+    if settings.cart_store == "memory":
+        return InMemoryCartStore()
+    if settings.cart_store != "sqlite":
+        logger.warning(f"Unknown CART_STORE {settings.cart_store!r}, using sqlite")
+    path = settings.cart_db_path or str(Path(tempfile.gettempdir()) / "tubbyai-carts.db")
+    return SQLiteCartStore(path)
+
+
+class CartService:
+    """
+    Cart operations served from an LRU cache, with write-back persistence.
+
+    Updates go to the cache and mark the cart dirty. A background thread
+    flushes the dirty carts to the store in batches, every
+    ``flush_interval`` seconds or as soon as ``batch_size`` carts are dirty.
+    A burst of add-to-cart calls therefore costs one batched write instead
+    of one synchronous write each. Carts awaiting (or in the middle of) a
+    flush stay readable even if the cache evicts them.
+
+    With ``flush_interval <= 0`` every update is written through before
+    returning; use that where background threads may be frozen between
+    requests, as on AWS Lambda.
+    """
+
+    def __init__(
+        self,
+        store: CartStore,
+        cache_size: int = 1024,
+        flush_interval: float = 0.5,
+        batch_size: int = 100,
+    ):
+        self.store = store
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._cache: LRUCache[str, Items] = LRUCache(cache_size)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._dirty: Dict[str, Items] = {}
+        self._inflight: Dict[str, Items] = {}
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._flusher: Optional[threading.Thread] = None
+
+    # ------------------------------------------------------------------ reading
+    def _cached(self, cart_id: str) -> Optional[Items]:
+        """Newest unpersisted or cached copy of a cart (call with ``_lock`` held)."""
+        items = self._cache.get(cart_id)
+        if items is None:
+            items = self._dirty.get(cart_id)
+            if items is None:
+                items = self._inflight.get(cart_id)
+            if items is not None:
+                self._cache.put(cart_id, items)
+        return items
+
+    def _items(self, cart_id: str) -> Items:
+        """Return the live cart dict, loading it from the store on a miss."""
+        with self._lock:
+            items = self._cached(cart_id)
+        if items is not None:
+            metrics.increment("cart.cache_hits")
+            return items
+
+        metrics.increment("cart.cache_misses")
+        loaded = self.store.load(cart_id) or {}
+        with self._lock:
+            # Another caller may have loaded or updated it meanwhile
+            items = self._cached(cart_id)
+            if items is None:
+                items = loaded
+                self._cache.put(cart_id, items)
+        return items
+
+    def get_cart(self, cart_id: str) -> Items:
+        """Return a copy of the cart's ``product_id -> quantity`` map."""
+        items = self._items(cart_id)
+        with self._lock:
+            return dict(items)
+
+    # ------------------------------------------------------------------ writing
+    def _update(self, cart_id: str, product_id: str, delta: Optional[int]) -> Items:
+        """Apply a quantity change (None removes the product) and schedule the write."""
+        while True:
+            self._items(cart_id)
+            with self._lock:
+                current = self._cached(cart_id)
+                if current is None:
+                    # Evicted and flushed since it was loaded; load it again
+                    continue
+                # Copy-on-write: a flush may be serializing the previous dict
+                items = dict(current)
+                if delta is None:
+                    items.pop(product_id, None)
+                else:
+                    quantity = items.get(product_id, 0) + delta
+                    if quantity > 0:
+                        items[product_id] = quantity
+                    else:
+                        items.pop(product_id, None)
+                self._cache.put(cart_id, items)
+                self._dirty[cart_id] = items
+                dirty_count = len(self._dirty)
+                break
+        metrics.increment("cart.updates")
+
+        if self.flush_interval <= 0:
+            self.flush()
+        else:
+            self._ensure_flusher()
+            if dirty_count >= self.batch_size:
+                self._wakeup.set()
+        return dict(items)
+
+    def add_item(self, cart_id: str, product_id: str, quantity: int = 1) -> Items:
+        """Add ``quantity`` units of a product; returns the updated cart."""
+        if quantity < 1:
+            raise ValueError("quantity must be at least 1")
+        return self._update(cart_id, product_id, quantity)
+
+    def remove_item(self, cart_id: str, product_id: str) -> Items:
+        """Remove a product from the cart; returns the updated cart."""
+        return self._update(cart_id, product_id, None)
+
+    # ----------------------------------------------------------------- flushing
+    def flush(self) -> int:
+        """
+        Write every dirty cart to the store in one batch.
+
+        Returns:
+            Number of carts written
+        """
+        with self._flush_lock:
+            with self._lock:
+                if not self._dirty:
+                    return 0
+                batch, self._dirty = self._dirty, {}
+                self._inflight = batch
+
+            start = time.perf_counter()
+            try:
+                self.store.save_many(batch)
+            except Exception:
+                with self._lock:
+                    # Keep newer updates; re-queue the rest for the next flush
+                    for cart_id, items in batch.items():
+                        self._dirty.setdefault(cart_id, items)
+                    self._inflight = {}
+                metrics.increment("cart.flush_failures")
+                raise
+
+            with self._lock:
+                self._inflight = {}
+            metrics.observe("cart.flush_seconds", time.perf_counter() - start)
+            metrics.increment("cart.flushes")
+            metrics.increment("cart.flushed_carts", len(batch))
+            return len(batch)
+
+    def _ensure_flusher(self) -> None:
+        if self._flusher is None or not self._flusher.is_alive():
+            with self._lock:
+                if self._closed or (self._flusher is not None and self._flusher.is_alive()):
+                    return
+                self._flusher = threading.Thread(target=self._flush_loop, name="cart-flush", daemon=True)
+                self._flusher.start()
+
+    def _flush_loop(self) -> None:
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Cart flush failed, will retry: {e}")
+
+    def close(self) -> None:
+        """Stop the flusher, write outstanding carts and close the store."""
+        self._closed = True
+        self._wakeup.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        self.flush()
+        self.store.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Cart metrics: cache occupancy and writes awaiting a flush."""
+        with self._lock:
+            pending = len(self._dirty) + len(self._inflight)
+        return {
+            "store": self.store.name,
+            "cache": self._cache.stats(),
+            "pending_writes": pending,
+            "flush_interval": self.flush_interval,
+        }
+
+
+def _create_cart_service() -> CartService:
+    service = CartService(
+        create_cart_store(),
+        cache_size=settings.cart_cache_size,
+        flush_interval=settings.cart_flush_interval_seconds,
+        batch_size=settings.cart_flush_batch_size,
+    )
+    metrics.register_collector("cart", service.stats)
+    return service
+
+
+# Singleton instance
+cart_service = _create_cart_service()
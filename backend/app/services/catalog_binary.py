@@ -0,0 +1,490 @@
+"""Versioned binary catalog snapshots: normalized products plus the prebuilt index."""
+import bisect
+import json
+import logging
+import os
+import struct
+import sys
+import time
+import zlib
+from array import array
+from collections.abc import Mapping, Sequence
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from app.services.fuzzy_index import TrigramIndex
+from app.services.product_facets import FacetIndex
+from app.services.product_index import BM25_B, BM25_K1, FIELD_WEIGHTS, ProductIndex
+from app.services.suggest_index import SuggestIndex
+
+logger = logging.getLogger(__name__)
+
+# File layout:
+#   preamble   magic, format version, header length (little-endian)
+#   header     UTF-8 JSON: catalog metadata plus the section table
+#   sections   raw arrays, each 8-byte aligned, addressed relative to the
+#              first aligned offset after the header
+# Sections hold native-endian machine values so they can be used in place;
+# the header records the byte order they were written with.
+MAGIC = b"TUBCAT\r\n"
+FORMAT_VERSION = 4
+_PREAMBLE = struct.Struct("<8sII")
+_ALIGNMENT = 8
+
+# Decoded posting lists kept per loaded snapshot; common query terms are
+# decoded once instead of on every search
+POSTINGS_CACHE_SIZE = 4096
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+
+def _align(offset: int) -> int:
+    return offset + (-offset % _ALIGNMENT)
+
+
+def _index_params() -> Dict[str, Any]:
+    """Ranking parameters baked into the stored scores; a mismatch forces a rebuild."""
+    return {"field_weights": FIELD_WEIGHTS, "bm25_k1": BM25_K1, "bm25_b": BM25_B}
+
+
+def _find(keys: Sequence, key: str) -> int:
+    """Position of ``key`` in a sorted sequence, or -1."""
+    position = bisect.bisect_left(keys, key)
+    if position < len(keys) and keys[position] == key:
+        return position
+    return -1
+
+
+class PackedStrings(Sequence):
+    """Read-only sequence of strings decoded on access from an offset table and UTF-8 blob."""
+
+    __slots__ = ("_offsets", "_data")
+
+    def __init__(self, offsets: Sequence[int], data: Buffer):
+        self._offsets = offsets
+        self._data = data
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def _raw(self, position: int) -> Buffer:
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError("packed index out of range")
+        return self._data[self._offsets[position]:self._offsets[position + 1]]
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self[i] for i in range(*position.indices(len(self)))]
+        return str(self._raw(position), "utf-8")
+
+
+class PackedRecords(PackedStrings):
+    """Read-only sequence of JSON objects, each decoded into a fresh dict on access."""
+
+    __slots__ = ()
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self[i] for i in range(*position.indices(len(self)))]
+        return json.loads(str(self._raw(position), "utf-8"))
+
+
+class PackedBitmaps(PackedStrings):
+    """Read-only sequence of integer bitmaps, converted from little-endian bytes on access."""
+
+    __slots__ = ()
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self[i] for i in range(*position.indices(len(self)))]
+        return int.from_bytes(self._raw(position), "little")
+
+
+class PackedLists(Mapping):
+    """Read-only mapping of sorted string keys to slices of one packed value array."""
+
+    def __init__(self, keys: PackedStrings, offsets: Sequence[int], values: Sequence):
+        self._keys = keys
+        self._offsets = offsets
+        self._values = values
+
+    def __getitem__(self, key: str) -> Sequence:
+        position = _find(self._keys, key)
+        if position < 0:
+            raise KeyError(key)
+        return self._values[self._offsets[position]:self._offsets[position + 1]]
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._keys)
+
+
+class PackedPostings(Mapping):
+    """
+    Posting lists stored as parallel doc-id and score arrays, keyed by vocabulary term.
+
+    Behaves like the ``term -> {doc_id: score}`` dict built by
+    :class:`ProductIndex`; each list is decoded on first use and cached, so
+    the returned dicts are shared and must be treated as read-only.
+    """
+
+    def __init__(
+        self,
+        vocabulary: PackedStrings,
+        offsets: Sequence[int],
+        doc_ids: Sequence[int],
+        scores: Sequence[float],
+        cache_size: int = POSTINGS_CACHE_SIZE,
+    ):
+        self._vocabulary = vocabulary
+        self._offsets = offsets
+        self._doc_ids = doc_ids
+        self._scores = scores
+        self._decode = lru_cache(maxsize=cache_size)(self._decode_position)
+
+    def _decode_position(self, position: int) -> Dict[int, float]:
+        start, end = self._offsets[position], self._offsets[position + 1]
+        return dict(zip(self._doc_ids[start:end], self._scores[start:end]))
+
+    def __getitem__(self, term: str) -> Dict[int, float]:
+        position = _find(self._vocabulary, term)
+        if position < 0:
+            raise KeyError(term)
+        return self._decode(position)
+
+    def __len__(self) -> int:
+        return len(self._vocabulary)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._vocabulary)
+
+
+def _id_slot(key: str, mask: int) -> int:
+    # crc32 rather than hash(): str hashes are randomized per process
+    return zlib.crc32(key.encode("utf-8")) & mask
+
+
+class PackedIdTable(Mapping):
+    """
+    Read-only ``product id -> position`` map stored as an open-addressing hash table.
+
+    ``slots`` holds ``entry + 1`` (0 marks an empty slot) and is probed
+    linearly from the key's crc32, so a lookup decodes one or two keys
+    instead of building a per-process dict.
+    """
+
+    def __init__(self, keys: PackedStrings, positions: Sequence[int], slots: Sequence[int]):
+        self._keys = keys
+        self._positions = positions
+        self._slots = slots
+        self._mask = len(slots) - 1
+
+    @staticmethod
+    def build_slots(keys: Sequence[str]) -> array:
+        """Hash table slots for ``keys`` at a load factor of at most 1/2."""
+        size = 1
+        while size < 2 * len(keys):
+            size <<= 1
+        slots = array("I", bytes(4 * size))
+        mask = size - 1
+        for entry, key in enumerate(keys):
+            slot = _id_slot(key, mask)
+            while slots[slot]:
+                slot = (slot + 1) & mask
+            slots[slot] = entry + 1
+        return slots
+
+    def __getitem__(self, key: str) -> int:
+        if self._keys:
+            slot = _id_slot(key, self._mask)
+            while True:
+                entry = self._slots[slot]
+                if not entry:
+                    break
+                if self._keys[entry - 1] == key:
+                    return self._positions[entry - 1]
+                slot = (slot + 1) & self._mask
+        raise KeyError(key)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._keys)
+
+
+class _SectionWriter:
+    """Accumulates aligned sections and their ``name -> [offset, length, typecode]`` table."""
+
+    def __init__(self):
+        self.table: Dict[str, List[Any]] = {}
+        self.chunks: List[bytes] = []
+        self.size = 0
+
+    def add(self, name: str, data: Union[array, bytes]) -> None:
+        typecode = data.typecode if isinstance(data, array) else "B"
+        raw = data.tobytes() if isinstance(data, array) else bytes(data)
+        padding = _align(self.size) - self.size
+        if padding:
+            self.chunks.append(b"\0" * padding)
+            self.size += padding
+        self.table[name] = [self.size, len(raw), typecode]
+        self.chunks.append(raw)
+        self.size += len(raw)
+
+    def add_strings(self, name: str, strings: Iterable[str]) -> None:
+        self.add_blobs(name, (string.encode("utf-8") for string in strings))
+
+    def add_blobs(self, name: str, blobs: Iterable[bytes]) -> None:
+        offsets = array("Q", [0])
+        data = bytearray()
+        for blob in blobs:
+            data += blob
+            offsets.append(len(data))
+        self.add(f"{name}.offsets", offsets)
+        self.add(f"{name}.data", data)
+
+    def add_lists(self, name: str, lists: Iterable[Iterable], typecode: str) -> None:
+        offsets = array("Q", [0])
+        values = array(typecode)
+        for items in lists:
+            values.extend(items)
+            offsets.append(len(values))
+        self.add(f"{name}.offsets", offsets)
+        self.add(f"{name}.values", values)
+
+
+def write_catalog_binary(
+    path: Union[str, Path],
+    products: Sequence[Dict[str, Any]],
+    index: ProductIndex,
+    synonyms: Dict[str, List[str]],
+    media_base_url: str,
+    etag: Optional[str] = None,
+    last_modified: Optional[str] = None,
+) -> int:
+    """
+    Write normalized products and their search index as a binary snapshot.
+
+    The file is written next to ``path`` and renamed into place, so readers
+    never see a partial snapshot and processes that still map the previous
+    file keep a consistent view of it.
+
+    Args:
+        path: Destination file
+        products: Normalized, available products (as in ``CatalogSnapshot``)
+        index: The index built from ``products``
+        synonyms: Synonym table the index was built with
+        media_base_url: ``PRODUCT_MEDIA_BASE_URL`` the products were normalized with
+        etag: Validator of the JSON catalog the snapshot was built from
+        last_modified: Last-Modified of that JSON catalog
+
+    Returns:
+        Size of the written file in bytes
+    """
+    sections = _SectionWriter()
+
+    sections.add_blobs(
+        "products",
+        (
+            json.dumps(product, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            for product in products
+        ),
+    )
+
+    sections.add("index.boosts", array("d", index.boosts))
+    id_keys = list(index.id_positions)
+    sections.add_strings("index.ids", id_keys)
+    sections.add("index.ids.positions", array("I", (index.id_positions[key] for key in id_keys)))
+    sections.add("index.ids.slots", PackedIdTable.build_slots(id_keys))
+    sections.add_strings("index.vocabulary", index.vocabulary)
+    sections.add_lists("index.postings.docs", (index.postings[term].keys() for term in index.vocabulary), "I")
+    sections.add("index.postings.scores", array(
+        "d", (score for term in index.vocabulary for score in index.postings[term].values())
+    ))
+
+    facets = index.facets
+    bitmap_bytes = (facets.size + 7) // 8
+    sections.add("facets.price_order", array("I", facets.price_order))
+    sections.add("facets.sorted_prices", array("d", facets.sorted_prices))
+    sections.add_lists("facets.category_prices", facets.category_prices, "d")
+    sections.add_blobs("facets.category_bitmaps", (
+        bitmap.to_bytes(bitmap_bytes, "little") for bitmap in facets.category_bitmaps
+    ))
+    sections.add_blobs("facets.price_checkpoints", (
+        bitmap.to_bytes(bitmap_bytes, "little") for bitmap in facets.price_checkpoints
+    ))
+
+    gram_keys = sorted(index.fuzzy.grams)
+    sections.add_strings("fuzzy.terms", index.fuzzy.terms)
+    sections.add_strings("fuzzy.gram_keys", gram_keys)
+    sections.add_lists("fuzzy.gram_terms", (index.fuzzy.grams[gram] for gram in gram_keys), "I")
+
+    suggestions = index.suggestions
+    sections.add_strings("suggest.phrases", suggestions.phrases)
+    sections.add_strings("suggest.texts", suggestions.texts)
+    sections.add("suggest.weights", array("d", suggestions.weights))
+    sections.add("suggest.entry_phrases", array("I", suggestions.entry_phrases))
+    sections.add("suggest.entry_offsets", array("I", suggestions.entry_offsets))
+    sections.add("suggest.tree", array("I", suggestions.tree))
+
+    header = json.dumps({
+        "byteorder": sys.byteorder,
+        "built_at": time.time(),
+        "product_count": len(products),
+        "media_base_url": media_base_url.rstrip("/"),
+        "etag": etag,
+        "last_modified": last_modified,
+        "index_params": _index_params(),
+        "synonyms": synonyms,
+        "expansions": index.expansions,
+        "category_ids": index.category_ids,
+        "category_names": facets.category_names,
+        "price_step": facets.price_step,
+        "sections": sections.table,
+    }).encode("utf-8")
+
+    preamble = _PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header))
+    data_start = _align(len(preamble) + len(header))
+
+    path = Path(path)
+    partial = path.with_name(f"{path.name}.{os.getpid()}.partial")
+    with open(partial, "wb") as f:
+        f.write(preamble)
+        f.write(header)
+        f.write(b"\0" * (data_start - len(preamble) - len(header)))
+        for chunk in sections.chunks:
+            f.write(chunk)
+    os.replace(partial, path)
+    return data_start + sections.size
+
+
+def _read_header(view: memoryview) -> Tuple[Dict[str, Any], int]:
+    if len(view) < _PREAMBLE.size:
+        raise ValueError("Not a catalog snapshot: file too short")
+    magic, version, header_length = _PREAMBLE.unpack_from(view)
+    if magic != MAGIC:
+        raise ValueError("Not a catalog snapshot")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported catalog snapshot format {version} (expected {FORMAT_VERSION})")
+    header = json.loads(str(view[_PREAMBLE.size:_PREAMBLE.size + header_length], "utf-8"))
+    return header, header_length
+
+
+def read_catalog_header(buffer: Buffer) -> Dict[str, Any]:
+    """
+    Parse only the metadata header of a snapshot (validators, build time, counts).
+
+    Raises:
+        ValueError: If the buffer is not a snapshot of this format version
+    """
+    header, _ = _read_header(memoryview(buffer))
+    header.pop("sections", None)
+    return header
+
+
+def read_catalog_binary(buffer: Buffer) -> Tuple[PackedRecords, ProductIndex, Dict[str, Any]]:
+    """
+    Attach to a binary snapshot without rebuilding anything.
+
+    Arrays are used in place through memoryviews over ``buffer`` and products
+    are decoded only when accessed, so loading costs a header parse however
+    large the catalog is. Passing an ``mmap`` makes the whole catalog
+    zero-copy: every process mapping the same file shares its pages. The
+    memoryviews keep ``buffer`` alive; its contents must not change while
+    the returned objects are in use (replace snapshot files, never rewrite
+    them in place).
+
+    Returns:
+        ``(products, index, header)``
+
+    Raises:
+        ValueError: If the buffer is not a snapshot this build can use
+    """
+    view = memoryview(buffer)
+    header, header_length = _read_header(view)
+    if header["byteorder"] != sys.byteorder:
+        raise ValueError(f"Catalog snapshot is {header['byteorder']}-endian, this machine is {sys.byteorder}")
+    if header["index_params"] != _index_params():
+        raise ValueError("Catalog snapshot was built with different ranking parameters")
+
+    data_start = _align(_PREAMBLE.size + header_length)
+    table = header["sections"]
+
+    def section(name: str) -> memoryview:
+        offset, length, typecode = table[name]
+        start = data_start + offset
+        if start + length > len(view):
+            raise ValueError(f"Truncated catalog snapshot (section {name})")
+        chunk = view[start:start + length]
+        return chunk if typecode == "B" else chunk.cast(typecode)
+
+    def strings(name: str, cls=PackedStrings) -> PackedStrings:
+        return cls(section(f"{name}.offsets"), section(f"{name}.data"))
+
+    def bitmaps(name: str) -> PackedBitmaps:
+        return strings(name, PackedBitmaps)
+
+    products = strings("products", PackedRecords)
+    size = header["product_count"]
+    if len(products) != size:
+        raise ValueError("Catalog snapshot product table does not match its header")
+
+    category_price_offsets = section("facets.category_prices.offsets")
+    category_price_values = section("facets.category_prices.values")
+    facets = FacetIndex.from_parts(
+        size=size,
+        category_names=header["category_names"],
+        category_bitmaps=bitmaps("facets.category_bitmaps"),
+        price_order=section("facets.price_order"),
+        sorted_prices=section("facets.sorted_prices"),
+        category_prices=[
+            category_price_values[category_price_offsets[i]:category_price_offsets[i + 1]]
+            for i in range(len(category_price_offsets) - 1)
+        ],
+        price_step=header["price_step"],
+        price_checkpoints=bitmaps("facets.price_checkpoints"),
+    )
+
+    vocabulary = strings("index.vocabulary")
+    fuzzy = TrigramIndex.from_parts(
+        terms=strings("fuzzy.terms"),
+        grams=PackedLists(
+            strings("fuzzy.gram_keys"),
+            section("fuzzy.gram_terms.offsets"),
+            section("fuzzy.gram_terms.values"),
+        ),
+    )
+    suggestions = SuggestIndex.from_parts(
+        phrases=strings("suggest.phrases"),
+        texts=strings("suggest.texts"),
+        weights=section("suggest.weights"),
+        entry_phrases=section("suggest.entry_phrases"),
+        entry_offsets=section("suggest.entry_offsets"),
+        tree=section("suggest.tree"),
+    )
+    index = ProductIndex.from_parts(
+        products=products,
+        boosts=section("index.boosts"),
+        id_positions=PackedIdTable(
+            strings("index.ids"), section("index.ids.positions"), section("index.ids.slots")
+        ),
+        category_ids=header["category_ids"],
+        facets=facets,
+        postings=PackedPostings(
+            vocabulary,
+            section("index.postings.docs.offsets"),
+            section("index.postings.docs.values"),
+            section("index.postings.scores"),
+        ),
+        vocabulary=vocabulary,
+        expansions={token: tuple(targets) for token, targets in header["expansions"].items()},
+        fuzzy=fuzzy,
+        suggestions=suggestions,
+    )
+    return products, index, header
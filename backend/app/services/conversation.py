@@ -0,0 +1,427 @@
+"""Server-side conversation memory: recent turns plus a rolling summary."""
+import asyncio
+import json
+import logging
+import sqlite3
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.services.lru_cache import LRUCache
+from app.services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# ``summarize(previous_summary, messages) -> new_summary``
+Summarizer = Callable[[str, List[Dict[str, Any]]], Awaitable[str]]
+
+SUMMARY_PREFIX = "Summary of the earlier conversation: "
+
+
+@dataclass
+class Conversation:
+    """
+    A conversation as the model sees it.
+
+    Messages are numbered from 0 in the order they were said. ``summary``
+    covers messages ``0 .. summarized - 1``; ``messages`` holds the ones
+    after that, verbatim.
+    """
+
+    summary: str = ""
+    summarized: int = 0
+    messages: List[Dict[str, Any]] = field(default_factory=list)
+    prefix: Optional[List[Dict[str, Any]]] = None  # built on first use, dropped on change
+
+    @property
+    def next_seq(self) -> int:
+        return self.summarized + len(self.messages)
+
+
+class ConversationStore(ABC):
+    """Persistent conversation storage. Messages are appended, never rewritten."""
+
+    name = "store"
+
+    @abstractmethod
+    def load(self, conversation_id: str) -> Optional[Conversation]:
+        """Return the stored summary and unsummarized messages, or None."""
+
+    @abstractmethod
+    def head(self, conversation_id: str) -> Tuple[int, int]:
+        """``(summarized, next_seq)`` of the stored conversation; ``(0, 0)`` if there is none."""
+
+    @abstractmethod
+    def append(self, conversation_id: str, first_seq: int, messages: List[Dict[str, Any]]) -> bool:
+        """
+        Store new messages, numbered from ``first_seq``.
+
+        Returns:
+            False, storing nothing, if ``first_seq`` is not the stored
+            conversation's next position (another writer got there first)
+        """
+
+    @abstractmethod
+    def save_summary(self, conversation_id: str, summary: str, summarized: int) -> None:
+        """Store a summary of messages before ``summarized`` and drop those messages."""
+
+    def close(self) -> None:
+        """Release connections."""
+
+
+class SQLiteConversationStore(ConversationStore):
+    """Local default: one row per message and one per summary (WAL mode)."""
+
+    name = "sqlite"
+
+    def __init__(self, path: str):
+        self.path = path
+        self._connection: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        # Opened on first use so importing the app never touches the filesystem
+        if self._connection is None:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(self.path, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS conversation_messages ("
+                "conversation_id TEXT NOT NULL, seq INTEGER NOT NULL, message TEXT NOT NULL, "
+                "PRIMARY KEY (conversation_id, seq))"
+            )
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS conversation_summaries ("
+                "conversation_id TEXT PRIMARY KEY, summary TEXT NOT NULL, "
+                "summarized INTEGER NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._connection = connection
+        return self._connection
+
+    def load(self, conversation_id: str) -> Optional[Conversation]:
+        with self._lock:
+            connection = self._connect()
+            summary = connection.execute(
+                "SELECT summary, summarized FROM conversation_summaries WHERE conversation_id = ?",
+                (conversation_id,),
+            ).fetchone()
+            rows = connection.execute(
+                "SELECT message FROM conversation_messages WHERE conversation_id = ? ORDER BY seq",
+                (conversation_id,),
+            ).fetchall()
+        if summary is None and not rows:
+            return None
+        text, summarized = summary or ("", 0)
+        return Conversation(text, summarized, [json.loads(row[0]) for row in rows])
+
+    @staticmethod
+    def _head(connection: sqlite3.Connection, conversation_id: str) -> Tuple[int, int]:
+        summarized, last_seq = connection.execute(
+            "SELECT (SELECT summarized FROM conversation_summaries WHERE conversation_id = ?), "
+            "(SELECT MAX(seq) FROM conversation_messages WHERE conversation_id = ?)",
+            (conversation_id, conversation_id),
+        ).fetchone()
+        summarized = summarized or 0
+        return summarized, max(summarized, last_seq + 1 if last_seq is not None else 0)
+
+    def head(self, conversation_id: str) -> Tuple[int, int]:
+        with self._lock:
+            return self._head(self._connect(), conversation_id)
+
+    def append(self, conversation_id: str, first_seq: int, messages: List[Dict[str, Any]]) -> bool:
+        rows = [
+            (conversation_id, first_seq + offset, json.dumps(message))
+            for offset, message in enumerate(messages)
+        ]
+        with self._lock:
+            connection = self._connect()
+            try:
+                with connection:
+                    # Take the write lock before reading, so no other process appends in between
+                    connection.execute("BEGIN IMMEDIATE")
+                    if self._head(connection, conversation_id)[1] != first_seq:
+                        return False
+                    connection.executemany(
+                        "INSERT INTO conversation_messages (conversation_id, seq, message) VALUES (?, ?, ?)",
+                        rows,
+                    )
+            except sqlite3.IntegrityError:
+                return False
+        return True
+
+    def save_summary(self, conversation_id: str, summary: str, summarized: int) -> None:
+        with self._lock:
+            connection = self._connect()
+            with connection:  # summary and pruning commit together
+                # A summary from a worker that is behind never replaces a newer one
+                connection.execute(
+                    "INSERT INTO conversation_summaries (conversation_id, summary, summarized, updated_at) "
+                    "VALUES (?, ?, ?, ?) ON CONFLICT (conversation_id) DO UPDATE SET "
+                    "summary = excluded.summary, summarized = excluded.summarized, updated_at = excluded.updated_at "
+                    "WHERE excluded.summarized > conversation_summaries.summarized",
+                    (conversation_id, summary, summarized, time.time()),
+                )
+                connection.execute(
+                    "DELETE FROM conversation_messages WHERE conversation_id = ? AND seq < ?",
+                    (conversation_id, summarized),
+                )
+
+    def close(self) -> None:
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+class InMemoryConversationStore(ConversationStore):
+    """Process-local store, for development and benchmarks."""
+
+    name = "memory"
+
+    def __init__(self):
+        self._data: Dict[str, Conversation] = {}
+        self._lock = threading.Lock()
+
+    def load(self, conversation_id: str) -> Optional[Conversation]:
+        with self._lock:
+            stored = self._data.get(conversation_id)
+            if stored is None:
+                return None
+            return Conversation(stored.summary, stored.summarized, list(stored.messages))
+
+    def head(self, conversation_id: str) -> Tuple[int, int]:
+        with self._lock:
+            stored = self._data.get(conversation_id)
+            return (stored.summarized, stored.next_seq) if stored is not None else (0, 0)
+
+    def append(self, conversation_id: str, first_seq: int, messages: List[Dict[str, Any]]) -> bool:
+        with self._lock:
+            stored = self._data.setdefault(conversation_id, Conversation())
+            if stored.next_seq != first_seq:
+                return False
+            stored.messages.extend(messages)
+            return True
+
+    def save_summary(self, conversation_id: str, summary: str, summarized: int) -> None:
+        with self._lock:
+            stored = self._data.setdefault(conversation_id, Conversation())
+            if summarized <= stored.summarized:
+                return
+            stored.messages = stored.messages[summarized - stored.summarized:]
+            stored.summary = summary
+            stored.summarized = summarized
+
+
+def create_conversation_store() -> ConversationStore:
+    """Build the store selected by ``CONVERSATION_STORE`` (``sqlite`` or ``memory``)."""
+    if settings.conversation_store == "memory":
+        return InMemoryConversationStore()
+    if settings.conversation_store != "sqlite":
+        logger.warning(f"Unknown CONVERSATION_STORE {settings.conversation_store!r}, using sqlite")
+    path = settings.conversation_db_path or str(Path(tempfile.gettempdir()) / "tubbyai-conversations.db")
+    return SQLiteConversationStore(path)
+
+
+class ConversationService:
+    """
+    Conversation history kept on the server, keyed by conversation id.
+
+    Each turn appends the user message and the answer; nothing already
+    stored is rewritten. Several workers (or Lambda containers) may serve
+    one conversation: an append that finds the store ahead of the cached
+    copy reloads it and retries, and :meth:`context` checks the store's
+    head before using the cached copy. Once ``recent_messages + summary_batch`` messages
+    are unsummarized, all but the newest ``recent_messages`` are folded
+    into the rolling summary with one LLM call. The summary is stored and
+    reused by every later turn until the next batch rolls over.
+
+    :meth:`context` returns the summary plus the unsummarized messages, so
+    the prompt stays bounded however long the session runs. It is built
+    once per change and cached with the conversation.
+    """
+
+    append_attempts = 3
+
+    def __init__(
+        self,
+        store: ConversationStore,
+        cache_size: int = 256,
+        recent_messages: int = 6,
+        summary_batch: int = 6,
+    ):
+        self.store = store
+        self.recent_messages = recent_messages
+        self.summary_batch = summary_batch
+        self._cache: LRUCache[str, Conversation] = LRUCache(cache_size)
+        self._lock = threading.Lock()
+        self._append_lock = threading.Lock()  # appends in this process, one at a time
+        self._compacting: set = set()
+
+    def _load(self, conversation_id: str) -> Conversation:
+        conversation = self.store.load(conversation_id) or Conversation()
+        with self._lock:
+            self._cache.put(conversation_id, conversation)
+        return conversation
+
+    def _get(self, conversation_id: str, check_store: bool = False) -> Conversation:
+        """
+        The cached copy of a conversation, loaded on a miss. With
+        ``check_store``, a copy that is behind the store (another worker
+        added turns or a summary) is reloaded.
+        """
+        with self._lock:
+            conversation = self._cache.get(conversation_id)
+            head = (conversation.summarized, conversation.next_seq) if conversation is not None else None
+        if conversation is None:
+            return self._load(conversation_id)
+        if check_store and self.store.head(conversation_id) != head:
+            metrics.increment("conversation.reloads")
+            return self._load(conversation_id)
+        return conversation
+
+    def _append(self, conversation_id: str, messages: List[Dict[str, Any]]) -> Conversation:
+        with self._append_lock:
+            conversation = self._get(conversation_id)
+            for _ in range(self.append_attempts):
+                with self._lock:
+                    first_seq = conversation.next_seq
+                if self.store.append(conversation_id, first_seq, messages):
+                    break
+                # Another worker stored turns this copy has not seen
+                metrics.increment("conversation.append_conflicts")
+                conversation = self._load(conversation_id)
+            else:
+                raise RuntimeError(f"Conversation {conversation_id} kept changing while appending")
+            with self._lock:
+                conversation.messages = conversation.messages + messages
+                conversation.prefix = None
+        metrics.increment("conversation.messages", len(messages))
+        return conversation
+
+    def context(
+        self,
+        conversation_id: str,
+        seed: Optional[List[Dict[str, Any]]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Messages to send before the next user message.
+
+        Args:
+            conversation_id: The conversation
+            seed: Client-side history. When it holds more messages than the
+                server has stored, the extra ones (the newest) are appended:
+                the conversation is new here, or other instances with their
+                own store answered some of its turns
+
+        Returns:
+            A summary message (once there is one), then the recent messages
+        """
+        conversation = self._get(conversation_id, check_store=True)
+        if seed:
+            messages = [
+                {"role": message["role"], "content": message["content"]}
+                for message in seed
+                if message.get("role") in ("user", "assistant") and message.get("content")
+            ]
+            with self._lock:
+                known = conversation.next_seq
+            if len(messages) > known:
+                metrics.increment("conversation.seeded_messages", len(messages) - known)
+                conversation = self._append(conversation_id, messages[known:])
+
+        with self._lock:
+            if conversation.prefix is None:
+                prefix = []
+                if conversation.summary:
+                    prefix.append({"role": "system", "content": SUMMARY_PREFIX + conversation.summary})
+                # Bounded even while a summary is late or failing
+                limit = self.recent_messages + self.summary_batch
+                prefix.extend(conversation.messages[-limit:])
+                conversation.prefix = prefix
+                metrics.increment("conversation.prefix_builds")
+            return list(conversation.prefix)
+
+    def append_turn(self, conversation_id: str, user_message: str, answer: str) -> None:
+        """Store one turn's user message and answer."""
+        messages = [{"role": "user", "content": user_message}]
+        if answer:
+            messages.append({"role": "assistant", "content": answer})
+        self._append(conversation_id, messages)
+
+    async def compact(self, conversation_id: str, summarize: Summarizer) -> bool:
+        """
+        Fold older messages into the summary if a full batch is waiting.
+
+        Runs after the answer is delivered. On failure the messages stay
+        unsummarized and the next turn tries again.
+
+        Returns:
+            True if a new summary was stored
+        """
+        conversation = self._get(conversation_id)
+        with self._lock:
+            waiting = len(conversation.messages) - self.recent_messages
+            if waiting < self.summary_batch or conversation_id in self._compacting:
+                return False
+            self._compacting.add(conversation_id)
+            previous = conversation.summary
+            batch = conversation.messages[:waiting]
+            summarized = conversation.summarized + waiting
+
+        start = time.perf_counter()
+        try:
+            summary = (await summarize(previous, batch)).strip()
+            if not summary:
+                raise ValueError("empty summary")
+            await asyncio.to_thread(self.store.save_summary, conversation_id, summary, summarized)
+        except Exception as e:
+            metrics.increment("conversation.summary_failures")
+            logger.warning(f"Summarizing conversation {conversation_id} failed: {e}")
+            return False
+        finally:
+            with self._lock:
+                self._compacting.discard(conversation_id)
+
+        with self._lock:
+            conversation.messages = conversation.messages[summarized - conversation.summarized:]
+            conversation.summary = summary
+            conversation.summarized = summarized
+            conversation.prefix = None
+        metrics.observe("conversation.summary_seconds", time.perf_counter() - start)
+        metrics.increment("conversation.summaries")
+        return True
+
+    def close(self) -> None:
+        """Close the store."""
+        self.store.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Conversation metrics: cache occupancy and summaries in progress."""
+        with self._lock:
+            compacting = len(self._compacting)
+        return {
+            "store": self.store.name,
+            "cache": self._cache.stats(),
+            "summarizing": compacting,
+        }
+
+
+def _create_conversation_service() -> ConversationService:
+    service = ConversationService(
+        create_conversation_store(),
+        cache_size=settings.conversation_cache_size,
+        recent_messages=settings.conversation_recent_messages,
+        summary_batch=settings.conversation_summary_batch,
+    )
+    metrics.register_collector("conversations", service.stats)
+    return service
+
+
+# Singleton instance
+conversation_service = _create_conversation_service()
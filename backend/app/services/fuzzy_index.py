@@ -0,0 +1,144 @@
+"""Character-trigram index for typo-tolerant term lookup."""
+import logging
+from collections import Counter
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def max_edits(term: str) -> int:
+    """Edit-distance budget for a query term: short words must match exactly."""
+    if len(term) <= 3:
+        return 0
+    if len(term) <= 6:
+        return 1
+    return 2
+
+
+def trigrams(term: str) -> List[str]:
+    """Return the padded character trigrams of ``term`` (``"cat"`` -> ``$ca, cat, at$``)."""
+    padded = f"${term}$"
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+def bounded_levenshtein(a: str, b: str, limit: int) -> Optional[int]:
+    """
+    Levenshtein distance between ``a`` and ``b`` if it is at most ``limit``.
+
+    Only the diagonal band of width ``2 * limit + 1`` is computed and the scan
+    stops as soon as every cell in a row exceeds the limit.
+
+    Returns:
+        The distance, or None when it exceeds ``limit``
+    """
+    if abs(len(a) - len(b)) > limit:
+        return None
+    if a == b:
+        return 0
+
+    too_far = limit + 1
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        low = max(1, i - limit)
+        high = min(len(b), i + limit)
+        current = [too_far] * (len(b) + 1)
+        current[0] = i if i <= limit else too_far
+        row_min = current[0]
+        for j in range(low, high + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            current[j] = value if value <= limit else too_far
+            if current[j] < row_min:
+                row_min = current[j]
+        if row_min > limit:
+            return None
+        previous = current
+
+    distance = previous[len(b)]
+    return distance if distance <= limit else None
+
+
+class TrigramIndex:
+    """
+    Maps character trigrams to the vocabulary terms containing them.
+
+    A misspelled query term only needs to be compared against terms sharing
+    enough trigrams with it (the q-gram lemma bounds how many a term within
+    ``k`` edits can lose), so lookups stay sublinear in the vocabulary size.
+    """
+
+    def __init__(self, terms: Iterable[str]):
+        self.terms: List[str] = sorted(set(terms))
+        self.grams: Dict[str, List[int]] = {}
+        for term_id, term in enumerate(self.terms):
+            for gram in set(trigrams(term)):
+                self.grams.setdefault(gram, []).append(term_id)
+
+        logger.debug(
+            "Built trigram index: %s terms, %s trigrams", len(self.terms), len(self.grams)
+        )
+
+    @classmethod
+    def from_parts(cls, terms: Sequence[str], grams: Mapping[str, Sequence[int]]) -> "TrigramIndex":
+        """Reassemble an index from previously built structures (see catalog_binary)."""
+        index = cls.__new__(cls)
+        index.terms = terms
+        index.grams = grams
+        return index
+
+    def containing(self, term: str) -> List[str]:
+        """
+        Indexed terms that contain ``term`` ("pods" -> "airpods").
+
+        Candidates are the terms holding every unpadded trigram of ``term``,
+        found by intersecting their posting lists (rarest first); each is
+        then checked with a substring test.
+
+        Args:
+            term: Lowercased query term of at least three characters
+        """
+        inner = set(trigrams(term)[1:-1])
+        if not inner:
+            return []
+        postings = sorted((self.grams.get(gram, ()) for gram in inner), key=len)
+        term_ids = set(postings[0])
+        for posting in postings[1:]:
+            if not term_ids:
+                break
+            term_ids.intersection_update(posting)
+        candidates = (self.terms[term_id] for term_id in sorted(term_ids))
+        return [candidate for candidate in candidates if term in candidate]
+
+    def lookup(self, term: str, limit: Optional[int] = None) -> List[Tuple[str, int]]:
+        """
+        Find vocabulary terms within the edit budget of ``term``.
+
+        Args:
+            term: Lowercased query term
+            limit: Maximum edit distance (defaults to :func:`max_edits`)
+
+        Returns:
+            ``(term, distance)`` pairs, closest first
+        """
+        if limit is None:
+            limit = max_edits(term)
+
+        query_grams = set(trigrams(term))
+        # Each edit destroys at most three trigrams
+        required = max(1, len(query_grams) - 3 * limit)
+
+        overlap: Counter = Counter()
+        for gram in query_grams:
+            overlap.update(self.grams.get(gram, ()))
+
+        matches = []
+        for term_id, shared in overlap.items():
+            if shared < required:
+                continue
+            candidate = self.terms[term_id]
+            distance = bounded_levenshtein(term, candidate, limit)
+            if distance is not None:
+                matches.append((candidate, distance))
+
+        matches.sort(key=lambda match: (match[1], match[0]))
+        return matches
@@ -0,0 +1,42 @@
+"""Shared async HTTP client for outbound tool calls."""
+import asyncio
+import weakref
+
+import httpx
+
+# Connection pool per event loop; keep-alive connections are reused across tool calls
+MAX_CONNECTIONS = 100
+MAX_KEEPALIVE_CONNECTIONS = 20
+
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """
+    Pooled ``httpx.AsyncClient`` for the running event loop.
+
+    An httpx client cannot be used from more than one event loop, so there is
+    one per loop: normally just the server's, plus short-lived ones for sync
+    callers that run a tool through ``asyncio.run``.
+    """
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            follow_redirects=True,
+            limits=httpx.Limits(
+                max_connections=MAX_CONNECTIONS,
+                max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+            ),
+        )
+        _clients[loop] = client
+    return client
+
+
+async def close_async_client() -> None:
+    """Close the running loop's client, if one was created."""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
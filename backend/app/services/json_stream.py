@@ -0,0 +1,114 @@
+"""Incremental parsing of large top-level JSON arrays."""
+import codecs
+import json
+import logging
+from typing import Any, Iterable, Iterator, Union
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = " \t\n\r"
+
+# How far before the end of the buffer a chunk boundary can make the decoder
+# fail: a cut literal ("fals"), number ("1e") or escape ("\u00e")
+_PARTIAL_TOKEN_CHARS = 6
+
+
+def iter_json_array(chunks: Iterable[Union[bytes, str]]) -> Iterator[Any]:
+    """
+    Yield the elements of a top-level JSON array one at a time.
+
+    Only the current element and the unread tail of the latest chunk are held
+    in memory, so peak usage is bounded by the largest element rather than
+    the whole document. A malformed element fails as soon as the data
+    around the error has arrived, without buffering the rest.
+
+    Args:
+        chunks: The document as a stream of UTF-8 ``bytes`` (e.g.
+            ``response.iter_content()``) or ``str`` pieces
+
+    Raises:
+        ValueError: If the document is not a well-formed JSON array
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    pieces = iter(chunks)
+
+    buffer = ""
+    position = 0
+    exhausted = False
+
+    def read_more() -> bool:
+        """Append the next chunk to the buffer, dropping what was consumed."""
+        nonlocal buffer, position, exhausted
+        if exhausted:
+            return False
+        try:
+            piece = next(pieces)
+        except StopIteration:
+            exhausted = True
+            piece = utf8.decode(b"", final=True)
+        else:
+            if isinstance(piece, bytes):
+                piece = utf8.decode(piece)
+        buffer = buffer[position:] + piece
+        position = 0
+        return True
+
+    def skip_whitespace() -> bool:
+        """Advance past whitespace; False if the document ended first."""
+        nonlocal position
+        while True:
+            while position < len(buffer) and buffer[position] in _WHITESPACE:
+                position += 1
+            if position < len(buffer):
+                return True
+            if not read_more():
+                return False
+
+    if not skip_whitespace() or buffer[position] != "[":
+        raise ValueError("Expected a JSON array")
+    position += 1
+
+    if not skip_whitespace():
+        raise ValueError("Unterminated JSON array")
+    if buffer[position] == "]":
+        return
+
+    while True:
+        try:
+            element, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError as exc:
+            # The element may continue in the next chunk, but only if the
+            # decoder failed at the end of the buffer or inside a string
+            # running up to it; an error earlier on is there to stay
+            truncated = (
+                len(buffer) - exc.pos <= _PARTIAL_TOKEN_CHARS
+                or exc.msg.startswith("Unterminated string")
+            )
+            if truncated and read_more():
+                continue
+            raise ValueError(f"Malformed JSON array element: {exc}") from exc
+
+        # A scalar cut at a chunk boundary can decode early ("4" of "4.5"),
+        # so only accept an element once its delimiter has arrived
+        delimiter = end
+        while delimiter < len(buffer) and buffer[delimiter] in _WHITESPACE:
+            delimiter += 1
+        cut = delimiter == len(buffer) or (
+            buffer[delimiter] not in ",]" and len(buffer) - delimiter <= _PARTIAL_TOKEN_CHARS
+        )
+        if cut and read_more():
+            continue
+
+        position = end
+        yield element
+
+        if not skip_whitespace():
+            raise ValueError("Unterminated JSON array")
+        if buffer[position] == "]":
+            return
+        if buffer[position] != ",":
+            raise ValueError(f"Expected ',' or ']' in JSON array, got {buffer[position]!r}")
+        position += 1
+        if not skip_whitespace():
+            raise ValueError("Unterminated JSON array")
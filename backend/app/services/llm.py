@@ -1,9 +1,11 @@
 """LLM service for chat and function calling."""
 import json
 import logging
-from typing import List, Dict, Any, Optional
+import threading
+import time
+from typing import AsyncIterator, List, Dict, Any, Optional
 
-from openai import OpenAI
+from openai import AsyncOpenAI
 
 try:
     import google.generativeai as genai
@@ -11,16 +13,35 @@ except ImportError:  # pragma: no cover - optional dependency
     genai = None
 
 from app.config import settings
+from app.services.metrics import metrics
+from app.services.token_counter import REPLY_PRIMING_TOKENS, create_token_counter
+from app.tools.schemas import TOOL_RESPONSE_TEMPLATES
 
 logger = logging.getLogger(__name__)
 
 
 class LLMService:
-    """Service for interacting with LLM APIs."""
+    """
+    Service for interacting with LLM APIs.
+
+    Fully async: completions go through the async OpenAI client and tools
+    through :meth:`ToolExecutor.execute_async`, so a worker keeps serving
+    other requests while one chat waits on the model or a tool.
+
+    Requests are assembled so consecutive ones share as long a prefix as
+    possible, which providers serve from their prompt cache: the system
+    prompt, then the same tools schema on every call of a turn, then
+    history that only changes at its start every few turns.
+
+    When every tool called in a turn has a template in
+    :data:`TOOL_RESPONSE_TEMPLATES` (adding to the cart, a search with one or
+    no match), the reply is rendered from the tool results and the second
+    completion is skipped.
+    """
     
     def __init__(self):
         self.provider = (settings.llm_provider or "openai").lower()
-        self._client: Optional[OpenAI] = None
+        self._client: Optional[AsyncOpenAI] = None
         self._gemini_model = None
         self.model = settings.llm_model
         self.system_prompt = (
@@ -31,12 +52,20 @@ class LLMService:
             "research. Keep responses brief and natural for spoken conversation. Mention sources when possible "
             "and include product images when showing shopping results."
         )
-        # Conversation management
-        # GPT-4 has 8192 token limit. Reserve ~2500 for system prompt + tools, leaving ~5500 for messages
-        # Be conservative to account for token estimation inaccuracy
-        self.max_history_messages = 6  # keep last N messages (including tool messages)
-        self.max_message_tokens = 5000  # target max tokens for all messages (excluding system + tools) - conservative
+        # Conversation management: messages are counted with the model's own
+        # tokenizer and trimmed to what the context window has left after the
+        # system prompt, the tools schema and the space kept for the answer
+        self.token_counter = create_token_counter(self.model)
+        metrics.register_collector("tokenizer", self.token_counter.stats)
+        self.max_history_messages = 6  # keep at least the last N messages of client history
+        self.history_trim_step = 6  # drop old client history N messages at a time
+        self.reserved_output_tokens = settings.llm_reserved_output_tokens
         self.max_tool_response_chars = 1500  # truncate tool responses more aggressively
+        self.max_summary_message_chars = 2000  # per message sent for summarizing
+        self.response_templates = TOOL_RESPONSE_TEMPLATES if settings.tool_response_templates else {}
+        self._usage_lock = threading.Lock()
+        self._usage = {"completions": 0, "prompt_tokens": 0, "cached_prompt_tokens": 0, "completion_tokens": 0}
+        metrics.register_collector("llm_usage", self.usage_stats)
 
         if self.provider == "gemini":
             if genai is None:
@@ -70,8 +99,8 @@ class LLMService:
             self.provider = "openai"
     
     @property
-    def client(self):
-        """Lazy initialization of OpenAI client."""
+    def client(self) -> AsyncOpenAI:
+        """Lazy initialization of the async OpenAI client."""
         if self.provider != "openai":
             raise RuntimeError("OpenAI client requested while provider is not set to OpenAI.")
 
@@ -86,21 +115,28 @@ class LLMService:
                 raise ValueError("Invalid API key format. Key appears to be empty or too short.")
 
             client_kwargs = {"api_key": api_key}
+            if settings.openai_base_url:
+                client_kwargs["base_url"] = settings.openai_base_url
             if settings.openai_project_id:
                 client_kwargs["default_headers"] = {
                     "OpenAI-Project": settings.openai_project_id
                 }
 
-            self._client = OpenAI(**client_kwargs)
+            self._client = AsyncOpenAI(**client_kwargs)
         return self._client
+
+    async def aclose(self) -> None:
+        """Close the OpenAI client's connection pool."""
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
     
-    def chat_completion(
+    def _completion_payload(
         self,
-        messages: List[Dict[str, str]],
+        messages: List[Dict[str, Any]],
         tools: Optional[List[Dict]] = None,
-        tool_choice: str = "auto"
+        tool_choice: str = "auto",
     ) -> Dict[str, Any]:
-        """Send chat completion request with optional tools."""
         payload = {
             "model": self.model,
             "messages": [
@@ -113,46 +149,224 @@ class LLMService:
         if tools:
             payload["tools"] = tools
             payload["tool_choice"] = tool_choice
+        return payload
+
+    def _record_usage(self, usage, seconds: float) -> None:
+        """Count tokens and the share the provider served from its prompt cache."""
+        if usage is None:
+            return
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached = (getattr(details, "cached_tokens", None) or 0) if details else 0
+        with self._usage_lock:
+            self._usage["completions"] += 1
+            self._usage["prompt_tokens"] += usage.prompt_tokens or 0
+            self._usage["cached_prompt_tokens"] += cached
+            self._usage["completion_tokens"] += usage.completion_tokens or 0
+        metrics.observe(
+            "llm.completion_seconds_cache_hit" if cached else "llm.completion_seconds_cache_miss", seconds
+        )
+
+    def usage_stats(self) -> Dict[str, Any]:
+        """Token totals since startup and the prompt cache hit rate."""
+        with self._usage_lock:
+            usage = dict(self._usage)
+        prompt_tokens = usage["prompt_tokens"]
+        usage["cached_ratio"] = round(usage["cached_prompt_tokens"] / prompt_tokens, 4) if prompt_tokens else 0.0
+        return usage
+
+    async def chat_completion(
+        self,
+        messages: List[Dict[str, str]],
+        tools: Optional[List[Dict]] = None,
+        tool_choice: str = "auto"
+    ) -> Dict[str, Any]:
+        """Send chat completion request with optional tools."""
+        payload = self._completion_payload(messages, tools, tool_choice)
         
         try:
-            response = self.client.chat.completions.create(**payload)
+            start = time.perf_counter()
+            response = await self.client.chat.completions.create(**payload)
+            self._record_usage(response.usage, time.perf_counter() - start)
             return {
                 "message": response.choices[0].message,
                 "usage": response.usage,
             }
         except Exception as e:
-            error_str = str(e)
-            # Check if it's a context length error
-            if "context_length" in error_str.lower() or "maximum context length" in error_str.lower():
-                logger.warning(f"Context length exceeded. Attempting to trim messages more aggressively.")
-                # Try with just the last few messages
-                if len(payload["messages"]) > 3:  # system + at least 2 user/assistant messages
-                    # Keep system prompt and last 2-3 messages only
-                    trimmed_payload = payload.copy()
-                    trimmed_payload["messages"] = [
-                        payload["messages"][0],  # system prompt
-                        *payload["messages"][-3:]  # last 3 messages
-                    ]
-                    try:
-                        response = self.client.chat.completions.create(**trimmed_payload)
-                        logger.info("Successfully retried with aggressively trimmed context")
-                        return {
-                            "message": response.choices[0].message,
-                            "usage": response.usage,
-                        }
-                    except Exception as retry_e:
-                        logger.error(f"Retry with trimmed context also failed: {retry_e}")
-                        raise
+            # Messages were trimmed to an exact token budget, so this means the
+            # context window setting is wrong for the model; retrying won't help
+            if self._is_context_length_error(e):
+                metrics.increment("llm.context_length_errors")
             logger.error(f"LLM API error: {e}")
             raise
+
+    async def stream_completion(
+        self,
+        messages: List[Dict[str, Any]],
+        tools: Optional[List[Dict]] = None,
+        tool_choice: str = "auto",
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream a chat completion.
+
+        Yields ``{"type": "token", "text": ...}`` for each content delta as it
+        arrives, then one ``{"type": "message", "message": ...}`` with the
+        assembled assistant message (including any tool calls) in the dict
+        format used for conversation messages.
+        """
+        payload = self._completion_payload(messages, tools, tool_choice)
+        payload["stream"] = True
+        # Usage (with cached tokens) arrives in a final chunk without choices
+        payload["stream_options"] = {"include_usage": True}
+
+        content: List[str] = []
+        tool_calls: Dict[int, Dict[str, Any]] = {}
+        try:
+            start = time.perf_counter()
+            stream = await self.client.chat.completions.create(**payload)
+            async for chunk in stream:
+                if getattr(chunk, "usage", None):
+                    self._record_usage(chunk.usage, time.perf_counter() - start)
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta
+                if delta.content:
+                    content.append(delta.content)
+                    yield {"type": "token", "text": delta.content}
+                # Tool calls arrive in fragments keyed by their index in the message
+                for call in delta.tool_calls or []:
+                    entry = tool_calls.setdefault(
+                        call.index,
+                        {"id": None, "type": "function", "function": {"name": "", "arguments": ""}},
+                    )
+                    if call.id:
+                        entry["id"] = call.id
+                    if call.function and call.function.name:
+                        entry["function"]["name"] += call.function.name
+                    if call.function and call.function.arguments:
+                        entry["function"]["arguments"] += call.function.arguments
+        except Exception as e:
+            if self._is_context_length_error(e):
+                metrics.increment("llm.context_length_errors")
+            logger.error(f"LLM API error: {e}")
+            raise
+
+        message: Dict[str, Any] = {"role": "assistant", "content": "".join(content) or None}
+        if tool_calls:
+            message["tool_calls"] = [tool_calls[index] for index in sorted(tool_calls)]
+        yield {"type": "message", "message": message}
+
+    def _initial_messages(
+        self,
+        user_message: str,
+        conversation_history: List[Dict[str, str]],
+        tools: Optional[List[Dict]],
+        trim_history: bool = True,
+    ) -> List[Dict[str, Any]]:
+        history = self._prepare_history(conversation_history) if trim_history else list(conversation_history)
+        messages = [
+            *history,
+            {"role": "user", "content": user_message}
+        ]
+        return self._enforce_context_limits(messages, tools)
+
+    async def _run_tool_calls(
+        self,
+        tool_calls: List[Dict[str, Any]],
+        messages: List[Dict[str, Any]],
+        tool_executor,
+    ) -> Dict[str, Any]:
+        """
+        Execute one turn's tool calls and append their results to ``messages``.
+
+        Returns:
+            ``tools_used``, ``products`` (last product search), ``tool_outputs``,
+            ``tool_calls`` (``(name, args)`` pairs in call order) and
+            ``tool_results`` (in the same order, for the caller to pop)
+        """
+        tools_used = []
+        products_found = []
+        tool_outputs: Dict[str, Any] = {}
+
+        # Execute tools: calls in one turn are independent, so run them
+        # concurrently and handle the results in the order they were requested
+        calls = []
+        for tool_call in tool_calls:
+            function_name = tool_call["function"]["name"]
+            function_args = json.loads(tool_call["function"]["arguments"] or "{}")
+            logger.info(f"Executing tool: {function_name} with args: {function_args}")
+            calls.append((function_name, function_args))
+
+        tool_results = await tool_executor.execute_many_async(calls)
+
+        for tool_call, (function_name, _), tool_result in zip(tool_calls, calls, tool_results):
+            tools_used.append(function_name)
+            tool_outputs[function_name] = tool_result
+            
+            # Capture product search results
+            if function_name == "search_products" and isinstance(tool_result, list):
+                products_found = tool_result
+            
+            # Add tool result to messages (truncate if too large)
+            tool_content = json.dumps(tool_result) if not isinstance(tool_result, str) else tool_result
+            original_length = len(tool_content)
+            if original_length > self.max_tool_response_chars:
+                tool_content = tool_content[:self.max_tool_response_chars] + f"\n... (truncated, original length: {original_length} chars)"
+                logger.debug(f"Truncated tool response for {function_name} from {original_length} to {self.max_tool_response_chars} chars")
+            
+            messages.append({
+                "role": "tool",
+                "tool_call_id": tool_call["id"],
+                "name": function_name,
+                "content": tool_content
+            })
+
+        return {
+            "tools_used": tools_used,
+            "products": products_found if products_found else None,
+            "tool_outputs": tool_outputs or None,
+            "tool_calls": calls,
+            "tool_results": tool_results,
+        }
+
+    def render_tool_response(self, calls: List[Any], results: List[Any], user_message: str) -> Optional[str]:
+        """
+        Reply for a turn's tool results from the per-tool templates.
+
+        Args:
+            calls: The turn's ``(name, arguments)`` tool calls
+            results: Their results, in the same order
+            user_message: The user's message the tools were called for
+
+        Returns:
+            The spoken reply, or None if any call has no template or its
+            result needs the model's wording
+        """
+        parts = []
+        for (name, args), result in zip(calls, results):
+            template = self.response_templates.get(name)
+            if template is None:
+                return None
+            try:
+                text = template(args, result, user_message)
+            except Exception:
+                logger.exception(f"Response template for {name} failed")
+                return None
+            if not text:
+                return None
+            parts.append(text)
+        if not parts:
+            return None
+        metrics.increment("llm.template_responses")
+        return " ".join(parts)
     
-    def process_with_tools(
+    async def process_with_tools(
         self,
         user_message: str,
         conversation_history: List[Dict[str, str]],
         tools: List[Dict],
-        tool_executor
-    ) -> str:
+        tool_executor,
+        trim_history: bool = True,
+    ) -> Dict[str, Any]:
         """
         Process chat request with tool calling support.
         
@@ -161,26 +375,22 @@ class LLMService:
             conversation_history: Previous conversation messages
             tools: List of tool definitions for LLM
             tool_executor: Tool executor instance
+            trim_history: Keep only the last ``max_history_messages`` of the
+                history; False for history the conversation store already bounds
         
         Returns:
-            Final response text
+            Dict with the final response ``text``, ``tools_used``,
+            ``products`` and ``tool_outputs``, plus ``tool_calls`` when
+            tools ran and ``templated`` when the text was rendered from
+            their results
         """
         if self.provider == "gemini":
-            return self._process_with_tools_gemini(user_message, conversation_history)
+            return await self._process_with_tools_gemini(user_message, conversation_history)
 
-        history = self._prepare_history(conversation_history)
-        messages = [
-            *history,
-            {"role": "user", "content": user_message}
-        ]
-        # Apply context limits before first call (tools present, so reserve space)
-        messages = self._enforce_context_limits(messages, tools_present=bool(tools))
-        
-        tool_outputs: Dict[str, Any] = {}
+        messages = self._initial_messages(user_message, conversation_history, tools, trim_history)
 
         # First LLM call (with tools)
-        # Note: tools schema adds significant tokens, so be extra conservative
-        response = self.chat_completion(messages, tools=tools)
+        response = await self.chat_completion(messages, tools=tools)
         response_message = response["message"]
         
         # Convert message to dict format
@@ -207,49 +417,18 @@ class LLMService:
         
         # Check for tool calls
         if response_message.tool_calls:
-            tools_used = []
-            products_found = []
-            
-            # Execute tools
-            for tool_call in response_message.tool_calls:
-                function_name = tool_call.function.name
-                function_args = json.loads(tool_call.function.arguments)
-                
-                logger.info(f"Executing tool: {function_name} with args: {function_args}")
-                
-                # Execute tool
-                tool_result = tool_executor.execute(function_name, function_args)
-                tools_used.append(function_name)
-                tool_outputs[function_name] = tool_result
-                
-                # Capture product search results
-                if function_name == "search_products" and isinstance(tool_result, list):
-                    products_found = tool_result
-                
-                # Add tool result to messages (truncate if too large)
-                tool_content = json.dumps(tool_result) if not isinstance(tool_result, str) else tool_result
-                original_length = len(tool_content)
-                if original_length > self.max_tool_response_chars:
-                    tool_content = tool_content[:self.max_tool_response_chars] + f"\n... (truncated, original length: {original_length} chars)"
-                    logger.debug(f"Truncated tool response for {function_name} from {original_length} to {self.max_tool_response_chars} chars")
-                
-                messages.append({
-                    "role": "tool",
-                    "tool_call_id": tool_call.id,
-                    "name": function_name,
-                    "content": tool_content
-                })
+            tool_summary = await self._run_tool_calls(message_dict["tool_calls"], messages, tool_executor)
+            reply = self.render_tool_response(
+                tool_summary["tool_calls"], tool_summary.pop("tool_results"), user_message
+            )
+            if reply is not None:
+                return {"text": reply, "templated": True, **tool_summary}
             
-            # Second LLM call (with tool results)
-            # No tools in second call (just messages), but tool responses are large
-            constrained_messages = self._enforce_context_limits(messages, tools_present=False)
-            final_response = self.chat_completion(constrained_messages)
-            return {
-                "text": final_response["message"].content,
-                "tools_used": tools_used,
-                "products": products_found if products_found else None,
-                "tool_outputs": tool_outputs or None,
-            }
+            # Second LLM call (with tool results). The tools schema is sent
+            # again, unusable, so the request extends the first one's prefix
+            constrained_messages = self._enforce_context_limits(messages, tools)
+            final_response = await self.chat_completion(constrained_messages, tools=tools, tool_choice="none")
+            return {"text": final_response["message"].content, **tool_summary}
         
         # No tools called, return direct response
         # No need to constrain again since we already did before the first call
@@ -260,8 +439,131 @@ class LLMService:
             "tool_outputs": None,
         }
 
+    async def stream_with_tools(
+        self,
+        user_message: str,
+        conversation_history: List[Dict[str, str]],
+        tools: List[Dict],
+        tool_executor,
+        trim_history: bool = True,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streaming variant of :meth:`process_with_tools`.
+
+        Yields events as the turn progresses:
+
+        - ``token``: a piece of the answer text, forwarded as the model writes it
+        - ``tool_call``: the model asked for a tool (``name``, ``arguments``)
+        - ``tool_result``: the tool calls finished (``tools_used``, ``products``)
+        - ``done``: the full ``text`` plus ``tools_used``, ``products`` and
+          ``tool_outputs``, as returned by :meth:`process_with_tools`
+
+        Answers that need no tools stream straight from the first completion;
+        otherwise the tokens come from the completion after the tool calls,
+        or arrive as one piece when the reply is rendered from a template.
+        """
+        if self.provider == "gemini":
+            # No streaming path for Gemini; deliver the answer as one piece
+            result = await self._process_with_tools_gemini(user_message, conversation_history)
+            yield {"type": "token", "text": result["text"]}
+            yield {"type": "done", **result}
+            return
+
+        messages = self._initial_messages(user_message, conversation_history, tools, trim_history)
+
+        message_dict: Dict[str, Any] = {}
+        async for event in self.stream_completion(messages, tools=tools):
+            if event["type"] == "message":
+                message_dict = event["message"]
+            else:
+                yield event
+        messages.append(message_dict)
+
+        if not message_dict.get("tool_calls"):
+            yield {
+                "type": "done",
+                "text": message_dict.get("content") or "",
+                "tools_used": [],
+                "products": None,
+                "tool_outputs": None,
+            }
+            return
+
+        for tool_call in message_dict["tool_calls"]:
+            yield {
+                "type": "tool_call",
+                "name": tool_call["function"]["name"],
+                "arguments": tool_call["function"]["arguments"],
+            }
+        tool_summary = await self._run_tool_calls(message_dict["tool_calls"], messages, tool_executor)
+        reply = self.render_tool_response(
+            tool_summary["tool_calls"], tool_summary.pop("tool_results"), user_message
+        )
+        yield {
+            "type": "tool_result",
+            "tools_used": tool_summary["tools_used"],
+            "products": tool_summary["products"],
+        }
+        if reply is not None:
+            yield {"type": "token", "text": reply}
+            yield {"type": "done", "text": reply, "templated": True, **tool_summary}
+            return
+
+        constrained_messages = self._enforce_context_limits(messages, tools)
+        final_message: Dict[str, Any] = {}
+        async for event in self.stream_completion(constrained_messages, tools=tools, tool_choice="none"):
+            if event["type"] == "message":
+                final_message = event["message"]
+            else:
+                yield event
+        yield {"type": "done", "text": final_message.get("content") or "", **tool_summary}
+
+    async def summarize(self, previous_summary: str, messages: List[Dict[str, Any]]) -> str:
+        """
+        Fold conversation messages into a running summary.
+
+        Args:
+            previous_summary: Summary of the messages before these ("" at first)
+            messages: User and assistant messages to add to it
+
+        Returns:
+            The updated summary
+        """
+        transcript = "\n".join(
+            f"{message['role'].capitalize()}: {message.get('content') or ''}"[:self.max_summary_message_chars]
+            for message in messages
+        )
+        request = (
+            (f"Summary so far:\n{previous_summary}\n\n" if previous_summary else "")
+            + f"New messages:\n{transcript}"
+        )
+        instructions = (
+            "You keep the memory of tubbyAI, a voice shopping assistant. Update the summary of the "
+            "conversation with the new messages. Keep the user's preferences, budget, products discussed "
+            "or added to the cart, and open questions; drop small talk. Reply with the summary only, "
+            f"in plain prose of at most {settings.conversation_summary_max_tokens // 2} words."
+        )
+
+        if self.provider == "gemini":
+            response = await self._gemini_model.generate_content_async(f"{instructions}\n\n{request}")
+            # Not _extract_gemini_text: its apology fallback must not become the summary
+            return getattr(response, "text", "") or ""
+
+        start = time.perf_counter()
+        response = await self.client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": instructions},
+                {"role": "user", "content": request},
+            ],
+            temperature=0.2,
+            max_tokens=settings.conversation_summary_max_tokens,
+        )
+        self._record_usage(response.usage, time.perf_counter() - start)
+        return response.choices[0].message.content or ""
+
     # Gemini -----------------------------------------------------------------
-    def _process_with_tools_gemini(
+    async def _process_with_tools_gemini(
         self,
         user_message: str,
         conversation_history: List[Dict[str, str]],
@@ -275,7 +577,9 @@ class LLMService:
             content = message.get("content", "")
             if not content:
                 continue
-            if role == "assistant":
+            if role == "system":
+                prompt_parts.append(content)
+            elif role == "assistant":
                 prompt_parts.append(f"Assistant: {content}")
             elif role == "tool":
                 prompt_parts.append(f"Tool output: {content}")
@@ -287,7 +591,7 @@ class LLMService:
         prompt = "\n".join(prompt_parts)
 
         try:
-            response = self._gemini_model.generate_content(prompt)
+            response = await self._gemini_model.generate_content_async(prompt)
             text = self._extract_gemini_text(response)
             return {
                 "text": text,
@@ -326,7 +630,13 @@ class LLMService:
     # ------------------------------------------------------------------ helpers
     def _prepare_history(self, history: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
-        Trim conversation history to stay within configured limits.
+        Keep the most recent messages of the conversation history.
+
+        Old messages are dropped ``history_trim_step`` at a time, counted
+        from the start of the conversation, rather than one per turn. The
+        kept history then starts at the same message for several turns, so
+        the provider can reuse its cached prompt prefix. Token limits are
+        applied once to the full prompt by :meth:`_enforce_context_limits`.
 
         Args:
             history: Original conversation history (list of message dicts).
@@ -337,58 +647,69 @@ class LLMService:
         if not history:
             return []
 
-        # Keep only the most recent messages
-        trimmed = history[-self.max_history_messages :]
-        
-        # Estimate tokens and trim if needed
-        trimmed = self._trim_to_token_limit(trimmed, self.max_message_tokens)
-        
+        excess = max(len(history) - self.max_history_messages, 0)
+        trimmed = history[excess - excess % self.history_trim_step :]
         if len(trimmed) < len(history):
             logger.info(
-                "Trimmed conversation history from %s to %s messages to stay within context window.",
+                "Trimmed conversation history from %s to %s messages.",
                 len(history),
                 len(trimmed),
             )
-
         return trimmed
 
-    def _enforce_context_limits(self, messages: List[Dict[str, Any]], tools_present: bool = False) -> List[Dict[str, Any]]:
+    def message_token_budget(self, tools: Optional[List[Dict]] = None) -> int:
+        """
+        Tokens left for conversation messages in one completion request.
+
+        The model's context window minus the system prompt, the tools schema
+        and the tokens reserved for the answer.
+        """
+        fixed = (
+            self.token_counter.count_message({"role": "system", "content": self.system_prompt})
+            + self.token_counter.count_tools(tools)
+            + REPLY_PRIMING_TOKENS
+            + self.reserved_output_tokens
+        )
+        return self.token_counter.context_window - fixed
+
+    def _enforce_context_limits(
+        self,
+        messages: List[Dict[str, Any]],
+        tools: Optional[List[Dict]] = None,
+    ) -> List[Dict[str, Any]]:
         """
         Apply context limits to the message list before an LLM call.
-        Truncates tool responses and keeps only recent messages.
-        
+
+        Truncates tool responses, then keeps the most recent messages that fit
+        :meth:`message_token_budget`. Counts come from the model's tokenizer and
+        are cached per message, so re-checking a growing conversation only
+        encodes the new messages.
+
         Args:
             messages: List of messages to trim
-            tools_present: If True, reserve more space for tools schema (which can be 1000-2000 tokens)
+            tools: Tools schema sent with the request, if any
         """
         if not messages:
             return messages
 
         # Truncate large tool responses first
         messages = self._truncate_tool_responses(messages)
-        
-        # Keep only recent messages
-        trimmed = messages[-self.max_history_messages :]
-        
-        # Adjust token limit based on whether tools are present
-        # Tools schema can be 1000-2000 tokens, so be more conservative
-        effective_limit = self.max_message_tokens - (1500 if tools_present else 0)
-        effective_limit = max(effective_limit, 2000)  # Never go below 2000 tokens
-        
-        # Trim to token limit (more aggressive)
-        trimmed = self._trim_to_token_limit(trimmed, effective_limit)
+
+        budget = self.message_token_budget(tools)
+        trimmed = self._trim_to_token_limit(messages, budget)
 
         if not trimmed:
             # Fallback: keep the most recent message to avoid empty payload
-            return messages[-1:] if messages else []
+            return messages[-1:]
 
         if len(trimmed) < len(messages):
+            metrics.increment("llm.context_trims")
             logger.info(
                 "Trimmed messages from %s to %s to stay within token limit (limit: %s tokens, tools: %s).",
                 len(messages),
                 len(trimmed),
-                effective_limit,
-                tools_present,
+                budget,
+                bool(tools),
             )
 
         return trimmed
@@ -410,63 +731,27 @@ class LLMService:
 
     def _trim_to_token_limit(self, messages: List[Dict[str, Any]], max_tokens: int) -> List[Dict[str, Any]]:
         """Trim messages to stay within token limit, keeping the most recent."""
-        if not messages:
-            return messages
-        
-        # Estimate tokens for each message (rough: 1 token ≈ 4 chars for English, but JSON is more)
         total_tokens = 0
-        trimmed = []
-        
+        start = len(messages)
+
         # Work backwards from the end to keep most recent messages
-        for msg in reversed(messages):
-            msg_tokens = self._estimate_tokens(msg)
+        while start > 0:
+            msg_tokens = self.token_counter.count_message(messages[start - 1])
             if total_tokens + msg_tokens > max_tokens:
                 break
-            trimmed.insert(0, msg)
             total_tokens += msg_tokens
-        
-        return trimmed
+            start -= 1
+
+        # Tool results must follow the assistant message that requested them
+        while start < len(messages) and messages[start].get("role") == "tool":
+            start += 1
+
+        return messages[start:]
 
     @staticmethod
-    def _estimate_tokens(message: Dict[str, Any]) -> int:
-        """
-        Estimate token count for a message.
-        Conservative approximation: 1 token ≈ 3 chars for safety (accounts for JSON/structured data).
-        """
-        if not message:
-            return 0
-        
-        # Get content
-        content = message.get("content", "")
-        if isinstance(content, list):
-            content = " ".join(
-                part.get("text", "") if isinstance(part, dict) else str(part)
-                for part in content
-            )
-        elif not isinstance(content, str):
-            content = str(content)
-        
-        if not content:
-            # Tool calls without content still have overhead
-            if message.get("tool_calls"):
-                return 50  # Estimate for tool call structure
-            return 5  # Minimal overhead
-        
-        # Conservative token estimate: ~3 chars per token (accounts for JSON being more token-dense)
-        base_tokens = len(content) // 3
-        
-        # Adjust for JSON/structure (tool responses, function calls)
-        if message.get("role") == "tool":
-            # Tool responses (JSON) are very token-heavy
-            base_tokens = int(base_tokens * 1.5)
-        elif message.get("tool_calls"):
-            # Tool call definitions
-            base_tokens = int(base_tokens * 1.2)
-        
-        # Add overhead for message structure (role, name, tool_call_id, etc.)
-        overhead = 15 if message.get("tool_calls") or message.get("role") == "tool" else 10
-        
-        return base_tokens + overhead
+    def _is_context_length_error(error: Exception) -> bool:
+        message = str(error).lower()
+        return "context_length" in message or "maximum context length" in message
 
 
 # Singleton instance - lazy initialization
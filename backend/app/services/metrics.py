@@ -0,0 +1,80 @@
+"""In-process metrics registry exposed via the /api/metrics endpoint."""
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator
+
+logger = logging.getLogger(__name__)
+
+
+class MetricsRegistry:
+    """
+    Thread-safe counters and timings, plus pull-based collectors.
+
+    Counters and timings are recorded by the code doing the work. Collectors
+    are callables registered by long-lived services (e.g. the product catalog)
+    and are evaluated when a snapshot is taken, so derived values such as
+    staleness are always current.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, int] = {}
+        self._timings: Dict[str, Dict[str, float]] = {}
+        self._collectors: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+    def increment(self, name: str, value: int = 1) -> None:
+        """Add ``value`` to a counter."""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def observe(self, name: str, seconds: float) -> None:
+        """Record one duration sample in seconds."""
+        with self._lock:
+            timing = self._timings.get(name)
+            if timing is None:
+                timing = self._timings[name] = {"count": 0, "total": 0.0, "max": 0.0, "last": 0.0}
+            timing["count"] += 1
+            timing["total"] += seconds
+            timing["last"] = seconds
+            if seconds > timing["max"]:
+                timing["max"] = seconds
+
+    @contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        """Time the enclosed block and record it under ``name``."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def register_collector(self, name: str, collector: Callable[[], Dict[str, Any]]) -> None:
+        """Register a callable whose result is included in snapshots under ``name``."""
+        self._collectors[name] = collector
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return all counters, timing summaries and collector output."""
+        with self._lock:
+            counters = dict(self._counters)
+            timings = {
+                name: {
+                    **timing,
+                    "mean": timing["total"] / timing["count"] if timing["count"] else 0.0,
+                }
+                for name, timing in self._timings.items()
+            }
+
+        result: Dict[str, Any] = {"counters": counters, "timings": timings}
+        for name, collector in list(self._collectors.items()):
+            try:
+                result[name] = collector()
+            except Exception as exc:
+                logger.warning("Metrics collector %s failed: %s", name, exc)
+                result[name] = {"error": str(exc)}
+        return result
+
+
+# Singleton instance
+metrics = MetricsRegistry()
@@ -0,0 +1,639 @@
+"""Product catalog loading with stale-while-revalidate snapshots."""
+import asyncio
+import itertools
+import json
+import logging
+import mmap
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
+from datetime import timedelta
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+from urllib.parse import urljoin
+
+import requests
+
+try:
+    import fcntl
+except ImportError:  # Windows: workers share snapshot files without a build lock
+    fcntl = None
+
+from app.config import settings
+from app.services.catalog_binary import read_catalog_binary, read_catalog_header, write_catalog_binary
+from app.services.json_stream import iter_json_array
+from app.services.metrics import metrics
+from app.services.product_index import ProductIndex
+
+logger = logging.getLogger(__name__)
+
+# How long a snapshot is served before it counts as stale
+CACHE_DURATION = timedelta(minutes=5)
+
+# The background refresher reloads once a snapshot reaches this fraction of
+# CACHE_DURATION, so readers normally never see a stale catalog
+REFRESH_AHEAD_RATIO = 0.8
+
+# Delay before retrying after a failed background refresh
+REFRESH_RETRY_SECONDS = 30
+
+# Resolved media URLs are memoized across refreshes, so products whose media did
+# not change cost a cache lookup instead of a urljoin
+MEDIA_URL_CACHE_SIZE = 262_144
+
+# Bytes read per chunk while stream-parsing the catalog; peak memory is this
+# plus the largest single product, not the whole document
+CATALOG_CHUNK_SIZE = 64 * 1024
+
+# Snapshot sources whose validators belong to the JSON catalog
+JSON_SOURCES = ("json", "shared")
+
+# Synonym table bundled with the app; PRODUCT_SYNONYMS_URL can point at a hosted copy
+DEFAULT_SYNONYMS_PATH = Path(__file__).resolve().parent.parent / "data" / "product_synonyms.json"
+
+
+@lru_cache(maxsize=MEDIA_URL_CACHE_SIZE)
+def _join_media_url(base_url: str, path: str) -> str:
+    """Resolve one relative media path against the media base URL (memoized)."""
+    if path.startswith("http://") or path.startswith("https://"):
+        return path
+
+    clean_path = path.lstrip("/")
+    if not base_url:
+        # Nothing to resolve against – return normalized relative path
+        return clean_path
+
+    return urljoin(f"{base_url}/", clean_path)
+
+
+def _resolve_media_url(path: Optional[str]) -> Optional[str]:
+    """Convert relative media paths from the catalog into absolute S3 URLs."""
+    if not path:
+        return path
+
+    base_url = settings.product_media_base_url.rstrip("/") if settings.product_media_base_url else ""
+    return _join_media_url(base_url, path)
+
+
+def _normalize_product(product: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Ensure media fields in a product reference absolute URLs.
+
+    Only the media fields are rewritten, so a shallow copy is enough: the
+    remaining values are shared with the freshly parsed catalog entry.
+    """
+    normalized = dict(product)
+
+    normalized["image_url"] = _resolve_media_url(product.get("image_url"))
+
+    if isinstance(product.get("local_images"), list):
+        normalized["local_images"] = [
+            _resolve_media_url(image) for image in product["local_images"]
+        ]
+
+    if isinstance(product.get("local_videos"), list):
+        normalized["local_videos"] = [
+            _resolve_media_url(video) for video in product["local_videos"]
+        ]
+
+    # Some catalogs may provide a thumbnail field – normalize if present
+    if product.get("thumbnail_url"):
+        normalized["thumbnail_url"] = _resolve_media_url(product.get("thumbnail_url"))
+
+    return normalized
+
+
+def _map_file(path: Path) -> mmap.mmap:
+    """Map a snapshot file read-only; the pages are shared by every process mapping it."""
+    with open(path, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+@contextmanager
+def _file_lock(path: Path) -> Iterator[None]:
+    """Hold an exclusive advisory lock on ``<path>.lock`` (no-op without fcntl)."""
+    with open(path.with_name(path.name + ".lock"), "a") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    """
+    Immutable view of one catalog load: products plus the index built from them.
+
+    Snapshots are never modified after construction. A refresh builds a new
+    one and swaps the reference, so readers always see a consistent pair of
+    products and index without taking a lock.
+    """
+
+    products: Sequence[Dict[str, Any]]
+    index: ProductIndex
+    version: int
+    loaded_at: float
+    synonyms: Dict[str, List[str]]
+    # Validators from the catalog response, sent back on the next conditional GET
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    # "json" (parsed and indexed here), "binary" (prebuilt snapshot) or
+    # "shared" (snapshot file built from the JSON by this or another worker)
+    source: str = "json"
+
+    @property
+    def age_seconds(self) -> float:
+        return time.time() - self.loaded_at
+
+
+class ProductCatalog:
+    """
+    Serves the current catalog snapshot and refreshes it off the request path.
+
+    Only the very first load blocks a caller (callers arriving while it runs
+    wait for it too). After that, readers get the
+    current snapshot immediately: a background task reloads it ahead of
+    expiry, and a reader that finds it stale (e.g. when the background task
+    is not running, as between Lambda invocations) starts a refresh on a
+    worker thread instead of waiting for it.
+    """
+
+    def __init__(self):
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._versions = itertools.count(1)
+        self._refresh_lock = threading.Lock()
+        self._last_error: Optional[str] = None
+        self._background_task: Optional[asyncio.Task] = None
+        metrics.register_collector("catalog", self.stats)
+
+    # ------------------------------------------------------------------ loading
+    def _load_synonyms(self) -> Dict[str, List[str]]:
+        """Load the query expansion table that is compiled into the search index."""
+        try:
+            if settings.product_synonyms_url:
+                response = requests.get(settings.product_synonyms_url, timeout=10)
+                response.raise_for_status()
+                table = response.json()
+            else:
+                with open(DEFAULT_SYNONYMS_PATH, "r", encoding="utf-8") as f:
+                    table = json.load(f)
+            return table.get("expansions", {})
+        except Exception as e:
+            logger.error(f"Error loading product synonyms: {e}")
+            # Keep the previous table rather than silently dropping expansions
+            return self._snapshot.synonyms if self._snapshot else {}
+
+    @staticmethod
+    def _stream_response(response: requests.Response) -> Iterator[Dict[str, Any]]:
+        """Parse catalog entries off an HTTP response body as it arrives."""
+        with response:
+            yield from iter_json_array(response.iter_content(chunk_size=CATALOG_CHUNK_SIZE))
+
+    @staticmethod
+    def _stream_file(path: Path) -> Iterator[Dict[str, Any]]:
+        """Parse catalog entries from a local file without reading it whole."""
+        with open(path, "rb") as f:
+            yield from iter_json_array(iter(lambda: f.read(CATALOG_CHUNK_SIZE), b""))
+
+    @staticmethod
+    def _local_path(location: str) -> Optional[Path]:
+        """The file a catalog location refers to, or None for HTTP(S) URLs."""
+        if location.startswith(("http://", "https://")):
+            return None
+        return Path(location[len("file://"):] if location.startswith("file://") else location)
+
+    def _conditional_headers(self, sources: Tuple[str, ...]) -> Dict[str, str]:
+        """Validators of the current snapshot, if it was loaded from one of ``sources``."""
+        headers = {}
+        current = self._snapshot
+        if current is not None and current.source in sources:
+            if current.etag:
+                headers["If-None-Match"] = current.etag
+            if current.last_modified:
+                headers["If-Modified-Since"] = current.last_modified
+        return headers
+
+    def _file_validators(self, path: Path, sources: Tuple[str, ...]) -> Optional[Dict[str, Optional[str]]]:
+        """
+        Validators for a local file, or None if it is unchanged since the current snapshot.
+
+        The file's mtime and size stand in for an ETag, so an unchanged file
+        is treated like a 304 Not Modified.
+        """
+        stat = path.stat()
+        etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+        current = self._snapshot
+        if current is not None and current.source in sources and current.etag == etag:
+            return None
+        return {"etag": etag, "last_modified": None}
+
+    def _download(self) -> Tuple[Optional[Iterator[Dict[str, Any]]], Dict[str, Optional[str]]]:
+        """
+        Open the JSON catalog with a conditional GET and stream-parse its entries.
+
+        Products are decoded one at a time from the response body (or a local
+        path / ``file://`` URL), so the raw document and the full parsed list
+        never sit in memory together.
+
+        Returns:
+            ``(products, validators)`` where ``products`` is a lazy iterator
+            of raw catalog entries, or None when the server answered 304 Not
+            Modified, and ``validators`` holds the response's ``etag`` /
+            ``last_modified`` headers
+        """
+        location = settings.product_catalog_url
+        path = self._local_path(location)
+        if path is not None:
+            validators = self._file_validators(path, JSON_SOURCES)
+            if validators is None:
+                return None, {}
+            logger.info(f"Reading products from: {path}")
+            return self._stream_file(path), validators
+
+        logger.info(f"Fetching products from: {location}")
+        response = requests.get(
+            location, headers=self._conditional_headers(JSON_SOURCES), timeout=10, stream=True
+        )
+        if response.status_code == 304:
+            response.close()
+            return None, {}
+        try:
+            response.raise_for_status()
+        except requests.HTTPError:
+            response.close()
+            raise
+
+        validators = {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+        }
+        return self._stream_response(response), validators
+
+    def _download_binary(self) -> Tuple[Optional[Union[bytes, mmap.mmap]], Dict[str, Optional[str]]]:
+        """
+        Fetch the prebuilt binary snapshot, conditionally like :meth:`_download`.
+
+        A local snapshot file is memory-mapped rather than read, so workers
+        on one host share a single copy of the catalog.
+
+        Returns:
+            ``(data, validators)`` where ``data`` is None when the snapshot is
+            unchanged since the current one was loaded
+        """
+        location = settings.product_snapshot_url
+        path = self._local_path(location)
+        if path is not None:
+            validators = self._file_validators(path, ("binary",))
+            if validators is None:
+                return None, {}
+            logger.info(f"Mapping catalog snapshot: {path}")
+            return _map_file(path), validators
+
+        logger.info(f"Fetching catalog snapshot from: {location}")
+        response = requests.get(location, headers=self._conditional_headers(("binary",)), timeout=30)
+        if response.status_code == 304:
+            return None, {}
+        response.raise_for_status()
+
+        validators = {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+        }
+        return response.content, validators
+
+    def load(
+        self,
+        products: Iterable[Dict[str, Any]],
+        synonyms: Optional[Dict[str, List[str]]] = None,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+    ) -> CatalogSnapshot:
+        """
+        Build a snapshot from parsed catalog entries and make it current.
+
+        Unavailable products are dropped, media URLs normalized and the
+        search index built before the swap. ``products`` may be a lazy
+        iterator; each entry is filtered and normalized as it is consumed,
+        so only available products are retained.
+        """
+        if synonyms is None:
+            synonyms = self._load_synonyms()
+
+        normalized_products = tuple(
+            _normalize_product(product) for product in products if product.get("is_available", False)
+        )
+        snapshot = CatalogSnapshot(
+            products=normalized_products,
+            index=ProductIndex(normalized_products, expansions=synonyms),
+            version=next(self._versions),
+            loaded_at=time.time(),
+            synonyms=synonyms,
+            etag=etag,
+            last_modified=last_modified,
+        )
+        # Atomic reference swap: readers see either the old or the new snapshot
+        self._snapshot = snapshot
+        return snapshot
+
+    def load_binary(
+        self,
+        data: Union[bytes, mmap.mmap],
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+        source: str = "binary",
+        loaded_at: Optional[float] = None,
+    ) -> CatalogSnapshot:
+        """
+        Make a prebuilt binary snapshot (see ``scripts/build_catalog_snapshot.py``) current.
+
+        Nothing is parsed, normalized or indexed: products are decoded only
+        when accessed and the index is used as stored. With an ``mmap`` the
+        snapshot is zero-copy and shared with other processes mapping the file.
+
+        Raises:
+            ValueError: If the snapshot is malformed, from an incompatible
+                build, or normalized for a different media base URL
+        """
+        products, index, header = read_catalog_binary(data)
+
+        media_base_url = (settings.product_media_base_url or "").rstrip("/")
+        if header["media_base_url"] != media_base_url:
+            raise ValueError(
+                f"Catalog snapshot was normalized for media base {header['media_base_url']!r}, "
+                f"not {media_base_url!r}"
+            )
+
+        snapshot = CatalogSnapshot(
+            products=products,
+            index=index,
+            version=next(self._versions),
+            loaded_at=time.time() if loaded_at is None else loaded_at,
+            synonyms=header["synonyms"],
+            etag=etag,
+            last_modified=last_modified,
+            source=source,
+        )
+        self._snapshot = snapshot
+        return snapshot
+
+    def _refresh_binary(self) -> Optional[CatalogSnapshot]:
+        """Load the binary snapshot; None if it is unavailable or unusable."""
+        try:
+            data, validators = self._download_binary()
+            if data is None:
+                return replace(self._snapshot, loaded_at=time.time())
+            return self.load_binary(data, **validators)
+        except Exception as e:
+            metrics.increment("catalog.binary_failures")
+            logger.warning(f"Binary catalog snapshot unusable, falling back to JSON: {e}")
+            return None
+
+    def _attach_shared(self, path: Path) -> Optional[CatalogSnapshot]:
+        """
+        Use the shared snapshot file if another worker refreshed it recently.
+
+        Returns:
+            The current snapshot (renewed, or attached to the shared file), or
+            None if the file is missing, stale or unusable
+        """
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return None
+        if time.time() - stat.st_mtime >= CACHE_DURATION.total_seconds():
+            return None
+
+        try:
+            data = _map_file(path)
+            header = read_catalog_header(data)
+            current = self._snapshot
+            if (
+                current is not None
+                and current.source in JSON_SOURCES
+                and current.etag == header["etag"]
+                and current.last_modified == header["last_modified"]
+                and current.synonyms == header["synonyms"]
+            ):
+                # Same catalog; another worker just confirmed it is current
+                return replace(current, loaded_at=stat.st_mtime)
+            return self.load_binary(
+                data, header["etag"], header["last_modified"], source="shared", loaded_at=stat.st_mtime
+            )
+        except Exception as e:
+            logger.warning(f"Shared catalog snapshot unusable, rebuilding: {e}")
+            return None
+
+    def _refresh_json_shared(self, path: Path) -> CatalogSnapshot:
+        """
+        Refresh from JSON through a snapshot file shared by the workers on this host.
+
+        Under the file lock, a worker first attaches to a snapshot another
+        worker refreshed recently. Otherwise it refreshes from the JSON itself,
+        writes the result to the shared file and maps it, so every worker
+        serves the catalog from the same pages instead of a private copy.
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with _file_lock(path):
+            shared = self._attach_shared(path)
+            if shared is not None:
+                return shared
+
+            current = self._snapshot
+            snapshot = self._refresh_json_direct()
+            if current is not None and snapshot.version == current.version and snapshot.source == "shared":
+                # 304 for the catalog the shared file already holds: mark it fresh
+                try:
+                    header = read_catalog_header(_map_file(path))
+                    if (header["etag"], header["last_modified"]) == (snapshot.etag, snapshot.last_modified):
+                        os.utime(path)
+                        return snapshot
+                except (OSError, ValueError):
+                    pass
+
+            write_catalog_binary(
+                path,
+                snapshot.products,
+                snapshot.index,
+                snapshot.synonyms,
+                media_base_url=settings.product_media_base_url,
+                etag=snapshot.etag,
+                last_modified=snapshot.last_modified,
+            )
+            # Swap the private copy just built for the shared mapping
+            return self.load_binary(
+                _map_file(path), snapshot.etag, snapshot.last_modified, source="shared"
+            )
+
+    def _refresh_json(self) -> CatalogSnapshot:
+        """Load the JSON catalog, through the shared snapshot file when one is configured."""
+        if settings.product_snapshot_cache_path:
+            return self._refresh_json_shared(Path(settings.product_snapshot_cache_path))
+        return self._refresh_json_direct()
+
+    def _refresh_json_direct(self) -> CatalogSnapshot:
+        """
+        Load the JSON catalog, reusing the current snapshot on 304 Not Modified.
+
+        The synonym table is reloaded either way; if it changed while the
+        catalog did not, the current products are re-indexed with it.
+        """
+        products, validators = self._download()
+        if products is not None:
+            return self.load(products, **validators)
+        current = self._snapshot
+        if current is None:
+            raise ValueError("Catalog returned 304 Not Modified before any snapshot was loaded")
+
+        synonyms = self._load_synonyms()
+        if synonyms == current.synonyms:
+            return replace(current, loaded_at=time.time())
+        products = tuple(current.products)
+        snapshot = CatalogSnapshot(
+            products=products,
+            index=ProductIndex(products, expansions=synonyms),
+            version=next(self._versions),
+            loaded_at=time.time(),
+            synonyms=synonyms,
+            etag=current.etag,
+            last_modified=current.last_modified,
+        )
+        self._snapshot = snapshot
+        return snapshot
+
+    def refresh(self) -> Optional[CatalogSnapshot]:
+        """
+        Download the catalog and swap in a new snapshot.
+
+        Concurrent callers do not stack up: if a refresh is already running,
+        this returns the current snapshot immediately.
+
+        Returns:
+            The current snapshot, which stays the previous one if the
+            refresh failed (None if nothing has loaded yet)
+        """
+        if not self._refresh_lock.acquire(blocking=False):
+            return self._snapshot
+
+        try:
+            start = time.perf_counter()
+            previous = self._snapshot
+            snapshot = None
+            if settings.product_snapshot_url:
+                snapshot = self._refresh_binary()
+            if snapshot is None:
+                snapshot = self._refresh_json()
+            duration = time.perf_counter() - start
+            metrics.observe("catalog.refresh_seconds", duration)
+            self._last_error = None
+
+            if previous is not None and snapshot.version == previous.version:
+                # 304: the parsed, normalized and indexed data is still valid
+                self._snapshot = snapshot
+                metrics.increment("catalog.not_modified")
+                logger.info("Product catalog not modified (version %s)", snapshot.version)
+                return snapshot
+
+            metrics.increment("catalog.refreshes")
+            logger.info(
+                "Loaded %s available products from %s in %.3fs (version %s, media base: %s)",
+                len(snapshot.products),
+                snapshot.source,
+                duration,
+                snapshot.version,
+                settings.product_media_base_url,
+            )
+            return snapshot
+        except Exception as e:
+            metrics.increment("catalog.refresh_failures")
+            self._last_error = str(e)
+            logger.error(f"Error fetching products: {e}")
+            if self._snapshot:
+                logger.warning("Using stale cached products")
+            return self._snapshot
+        finally:
+            self._refresh_lock.release()
+
+    # ------------------------------------------------------------------ reading
+    def _is_stale(self, snapshot: CatalogSnapshot) -> bool:
+        return snapshot.age_seconds >= CACHE_DURATION.total_seconds()
+
+    def get_snapshot(self) -> Optional[CatalogSnapshot]:
+        """
+        Return the current snapshot without waiting on a refresh.
+
+        Blocks only when nothing has been loaded yet, until the first load
+        (this caller's or one already running) completes. A stale snapshot
+        is still returned, while a refresh starts on a worker thread.
+
+        Returns:
+            The snapshot, or None if the first load failed
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            snapshot = self.refresh()
+            if snapshot is None:
+                # refresh() returns at once while another caller runs the first
+                # load; wait for it rather than search an empty catalog
+                with self._refresh_lock:
+                    snapshot = self._snapshot
+            return snapshot
+
+        if self._is_stale(snapshot) and not self._refresh_lock.locked():
+            metrics.increment("catalog.stale_reads")
+            threading.Thread(target=self.refresh, name="catalog-refresh", daemon=True).start()
+        return snapshot
+
+    def stats(self) -> Dict[str, Any]:
+        """Catalog metrics: snapshot version, size and staleness."""
+        snapshot = self._snapshot
+        return {
+            "version": snapshot.version if snapshot else None,
+            "products": len(snapshot.products) if snapshot else 0,
+            "source": snapshot.source if snapshot else None,
+            "age_seconds": round(snapshot.age_seconds, 3) if snapshot else None,
+            "stale": self._is_stale(snapshot) if snapshot else None,
+            "refreshing": self._refresh_lock.locked(),
+            "last_error": self._last_error,
+        }
+
+    # --------------------------------------------------------------- background
+    async def _refresh_loop(self) -> None:
+        """Reload the catalog shortly before each snapshot would go stale."""
+        refresh_after = CACHE_DURATION.total_seconds() * REFRESH_AHEAD_RATIO
+        while True:
+            snapshot = self._snapshot
+            if snapshot is None:
+                delay = 0.0
+            else:
+                delay = max(0.0, refresh_after - snapshot.age_seconds)
+            await asyncio.sleep(delay)
+
+            refreshed = await asyncio.to_thread(self.refresh)
+            if refreshed is None or refreshed is snapshot:
+                # Failed (or another caller is refreshing); back off before retrying
+                await asyncio.sleep(REFRESH_RETRY_SECONDS)
+
+    def start_background_refresh(self) -> None:
+        """Start the refresh loop on the running event loop (idempotent)."""
+        if self._background_task is None or self._background_task.done():
+            self._background_task = asyncio.get_running_loop().create_task(self._refresh_loop())
+
+    async def stop_background_refresh(self) -> None:
+        """Cancel the refresh loop, if running."""
+        task, self._background_task = self._background_task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+
+# Singleton instance
+product_catalog = ProductCatalog()
@@ -0,0 +1,187 @@
+"""Category bitmaps and price-sorted arrays for filtering and facet counts."""
+import bisect
+import math
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+# Upper bounds (USD) of the price histogram buckets; the last bucket is open-ended
+PRICE_BUCKET_EDGES: List[float] = [25, 50, 100, 200, 500, 1000]
+
+# Number of cumulative price bitmaps kept, so a max_price filter only has to
+# add at most 1/PRICE_CHECKPOINTS of the catalog bit by bit
+PRICE_CHECKPOINTS = 64
+
+# Set bit positions for every byte value, used to decode bitmaps quickly
+_BYTE_BITS = [tuple(bit for bit in range(8) if value >> bit & 1) for value in range(256)]
+
+
+def _bitmap_from_positions(positions: Sequence[int], size: int) -> int:
+    """Build an integer bitmap with the given bit positions set."""
+    data = bytearray((size + 7) // 8)
+    for position in positions:
+        data[position >> 3] |= 1 << (position & 7)
+    return int.from_bytes(data, "little")
+
+
+class DocSet:
+    """
+    A set of product positions backed by an integer bitmap.
+
+    Supports O(1) membership tests and decodes members lazily, so filters can
+    be combined with bitwise AND before any product is looked at.
+    """
+
+    __slots__ = ("bitmap", "_bytes", "_count")
+
+    def __init__(self, bitmap: int, size: int):
+        self.bitmap = bitmap
+        self._bytes = bitmap.to_bytes((size + 7) // 8, "little")
+        self._count = bitmap.bit_count()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, doc_id: int) -> bool:
+        return bool(self._bytes[doc_id >> 3] >> (doc_id & 7) & 1)
+
+    def __iter__(self) -> Iterator[int]:
+        for byte_index, value in enumerate(self._bytes):
+            if value:
+                base = byte_index << 3
+                for bit in _BYTE_BITS[value]:
+                    yield base + bit
+
+
+class FacetIndex:
+    """
+    Filter and facet structures built alongside the search index.
+
+    Holds one bitmap per category and the catalog positions sorted by price
+    (with cumulative bitmaps at regular checkpoints), so price/category
+    filters resolve to a :class:`DocSet` without touching products, and
+    facet counts come from bisecting sorted price arrays.
+    """
+
+    def __init__(self, prices: Sequence[float], category_ids: Sequence[int], category_names: List[str]):
+        self.size = len(prices)
+        self.category_names = category_names
+
+        members: List[List[int]] = [[] for _ in category_names]
+        for doc_id, category_id in enumerate(category_ids):
+            members[category_id].append(doc_id)
+        self.category_bitmaps: List[int] = [
+            _bitmap_from_positions(positions, self.size) for positions in members
+        ]
+
+        self.price_order: List[int] = sorted(range(self.size), key=lambda doc_id: prices[doc_id])
+        self.sorted_prices: List[float] = [prices[doc_id] for doc_id in self.price_order]
+        self.category_prices: List[List[float]] = [
+            sorted(prices[doc_id] for doc_id in positions) for positions in members
+        ]
+
+        # price_checkpoints[i] has the bits of the first i * step products by price
+        self.price_step = max(1, math.ceil(self.size / PRICE_CHECKPOINTS))
+        data = bytearray((self.size + 7) // 8)
+        self.price_checkpoints: List[int] = [0]
+        for start in range(0, self.size, self.price_step):
+            for doc_id in self.price_order[start:start + self.price_step]:
+                data[doc_id >> 3] |= 1 << (doc_id & 7)
+            self.price_checkpoints.append(int.from_bytes(data, "little"))
+
+    @classmethod
+    def from_parts(
+        cls,
+        size: int,
+        category_names: List[str],
+        category_bitmaps: List[int],
+        price_order: Sequence[int],
+        sorted_prices: Sequence[float],
+        category_prices: List[Sequence[float]],
+        price_step: int,
+        price_checkpoints: List[int],
+    ) -> "FacetIndex":
+        """Reassemble a facet index from previously built structures (see catalog_binary)."""
+        facets = cls.__new__(cls)
+        facets.size = size
+        facets.category_names = category_names
+        facets.category_bitmaps = category_bitmaps
+        facets.price_order = price_order
+        facets.sorted_prices = sorted_prices
+        facets.category_prices = category_prices
+        facets.price_step = price_step
+        facets.price_checkpoints = price_checkpoints
+        return facets
+
+    def _price_bitmap(self, max_price: float) -> int:
+        """Bitmap of products priced at or below ``max_price``."""
+        cutoff = bisect.bisect_right(self.sorted_prices, max_price)
+        checkpoint = cutoff // self.price_step
+        bitmap = self.price_checkpoints[checkpoint]
+        remainder = self.price_order[checkpoint * self.price_step:cutoff]
+        if remainder:
+            bitmap |= _bitmap_from_positions(remainder, self.size)
+        return bitmap
+
+    def candidates(
+        self,
+        max_price: Optional[float] = None,
+        category_id: Optional[int] = None,
+    ) -> Optional[DocSet]:
+        """
+        Resolve price/category filters to the set of matching positions.
+
+        Args:
+            max_price: Optional maximum price (falsy values disable the filter)
+            category_id: Optional category id; unknown ids match nothing
+
+        Returns:
+            Matching positions, or None when no filter applies
+        """
+        if not max_price and category_id is None:
+            return None
+
+        bitmap = (1 << self.size) - 1
+        if category_id is not None:
+            if 0 <= category_id < len(self.category_bitmaps):
+                bitmap &= self.category_bitmaps[category_id]
+            else:
+                bitmap = 0
+        if max_price and bitmap:
+            bitmap &= self._price_bitmap(max_price)
+        return DocSet(bitmap, self.size)
+
+    @staticmethod
+    def _histogram(sorted_prices: List[float]) -> List[Dict[str, Any]]:
+        """Bucket counts for an ascending price list, via bisection."""
+        buckets = []
+        lower = 0.0
+        previous = 0
+        for edge in PRICE_BUCKET_EDGES + [math.inf]:
+            position = bisect.bisect_right(sorted_prices, edge)
+            buckets.append({
+                "min": lower,
+                "max": None if math.isinf(edge) else edge,
+                "count": position - previous,
+            })
+            lower, previous = edge, position
+        # Products without a usable price sort as infinity; leave them out of buckets
+        unpriced = len(sorted_prices) - bisect.bisect_left(sorted_prices, math.inf)
+        buckets[-1]["count"] -= unpriced
+        return buckets
+
+    def facets(self) -> Dict[str, Any]:
+        """Per-category counts and price histograms for the whole catalog."""
+        categories = [
+            {
+                "name": name,
+                "count": len(prices),
+                "price_histogram": self._histogram(prices),
+            }
+            for name, prices in zip(self.category_names, self.category_prices)
+            if prices
+        ]
+        categories.sort(key=lambda facet: (-facet["count"], facet["name"]))
+        return {
+            "total": self.size,
+            "categories": categories,
+            "price_histogram": self._histogram(self.sorted_prices),
+        }
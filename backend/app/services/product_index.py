@@ -0,0 +1,602 @@
+"""Inverted token index with BM25 ranking over the product catalog."""
+import bisect
+import heapq
+import logging
+import math
+import re
+from array import array
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence
+
+from app.services.fuzzy_index import TrigramIndex
+from app.services.product_facets import DocSet, FacetIndex
+from app.services.suggest_index import SuggestIndex
+
+logger = logging.getLogger(__name__)
+
+# Searchable fields and how much a term hit in each field counts towards relevance
+FIELD_WEIGHTS: Dict[str, float] = {
+    "name": 3.0,
+    "short_name": 2.5,
+    "voice_description": 1.0,
+    "description": 1.0,
+}
+
+# BM25 parameters: term frequency saturation and field length normalization
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+# Start of each letter/digit run after the first ("1000xm5" -> "xm5", "5")
+_RUN_BOUNDARY = re.compile(r"(?<=[0-9])(?=[a-z])|(?<=[a-z])(?=[0-9])")
+
+# Shorter query words are not matched inside longer terms: too many hits
+MIN_INFIX_LENGTH = 3
+
+# Filler words of spoken queries ("find me a ..."): the approximate fallback
+# does not require them to match
+QUERY_STOP_WORDS = frozenset(
+    "a an and any are can could do does find for get give have i im is looking me my need of "
+    "or please show some the to want with you"
+    .split()
+)
+
+# Spoken numbers as they come back from speech-to-text ("sony xm five")
+_NUMBER_WORDS = {
+    "zero": "0", "one": "1", "two": "2", "three": "3", "four": "4", "five": "5",
+    "six": "6", "seven": "7", "eight": "8", "nine": "9", "ten": "10",
+}
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Split free text into lowercase alphanumeric tokens."""
+    if not text:
+        return []
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+def subtokens(token: str) -> List[str]:
+    """
+    Suffixes of a mixed letter/digit token starting at each run boundary.
+
+    Indexed next to the token so a model number is found by any of its
+    trailing parts ("xm5" finds "1000xm5"); leading parts already match
+    the token as a prefix.
+    """
+    return [token[match.start():] for match in _RUN_BOUNDARY.finditer(token)]
+
+
+def _price_key(value: Any) -> float:
+    """Numeric price used for filtering; missing or malformed prices sort last."""
+    if value is None or isinstance(value, bool):
+        return math.inf
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.inf
+
+
+def compile_expansions(expansions: Optional[Dict[str, List[str]]]) -> Dict[str, tuple]:
+    """
+    Normalize a synonym table into ``query token -> expansion tokens``.
+
+    Keys and values go through the same tokenizer as the catalog text, so
+    ``"Ear Buds"``-style entries and stray casing still line up with the index.
+    Multi-word keys are skipped since expansion works per query token.
+    """
+    compiled: Dict[str, tuple] = {}
+    for key, values in (expansions or {}).items():
+        key_tokens = tokenize(key)
+        if len(key_tokens) != 1:
+            logger.warning("Ignoring multi-word synonym key: %r", key)
+            continue
+        token = key_tokens[0]
+        targets = [
+            target for value in values for target in tokenize(value) if target != token
+        ]
+        if targets:
+            compiled[token] = tuple(dict.fromkeys(compiled.get(token, ()) + tuple(targets)))
+    return compiled
+
+
+class SearchDoc:
+    """
+    Search-ready view of one product, compiled once per catalog refresh.
+
+    Holds pre-lowercased field text, pre-split name tokens and numeric
+    filter keys so queries never touch (or re-lowercase) the product dicts.
+    """
+
+    __slots__ = (
+        "name",
+        "short_name",
+        "description",
+        "voice_description",
+        "name_tokens",
+        "price",
+        "category_id",
+    )
+
+    def __init__(self, product: Dict[str, Any], category_id: int):
+        self.name: str = (product.get("name") or "").lower()
+        self.short_name: str = (product.get("short_name") or "").lower()
+        self.description: str = (product.get("description") or "").lower()
+        self.voice_description: str = (product.get("voice_description") or "").lower()
+        self.name_tokens: tuple = tuple(_TOKEN_PATTERN.findall(self.name))
+        self.price: float = _price_key(product.get("price"))
+        self.category_id: int = category_id
+
+    def field_tokens(self, field: str) -> List[str]:
+        """Tokenize a searchable field from its pre-lowercased text."""
+        if field == "name":
+            return list(self.name_tokens)
+        return _TOKEN_PATTERN.findall(getattr(self, field))
+
+
+def popularity_boost(product: Dict[str, Any]) -> float:
+    """
+    Multiplicative relevance boost from rating, review count and badge.
+
+    Kept deliberately small so popularity only reorders comparable text matches.
+    """
+    boost = 1.0
+
+    rating = product.get("rating")
+    if isinstance(rating, (int, float)) and 0 < rating <= 5:
+        boost += 0.1 * (rating / 5)
+
+    reviews = product.get("reviews")
+    if isinstance(reviews, (int, float)) and reviews > 0:
+        boost += 0.02 * math.log10(1 + reviews)
+
+    if product.get("badge"):
+        boost += 0.05
+
+    return boost
+
+
+class ProductIndex:
+    """
+    Inverted index mapping tokens to the products that contain them.
+
+    Built once per catalog refresh, together with a :class:`SearchDoc` for
+    every product. Each posting list maps a product position (its index in
+    the catalog list) to that term's precomputed BM25F score in the product,
+    already multiplied by the product's popularity boost. A query is resolved
+    by intersecting a handful of posting lists and summing scores, instead of
+    scanning every product.
+
+    Synonym expansions (e.g. ``bike -> motorcycle``) are compiled in at build
+    time, so an expanded query word costs a few extra posting lookups.
+    """
+
+    def __init__(
+        self,
+        products: List[Dict[str, Any]],
+        expansions: Optional[Dict[str, List[str]]] = None,
+    ):
+        self.products = products
+        self.boosts: List[float] = [popularity_boost(product) for product in products]
+
+        # product_id (and ASIN, when a catalog carries both) -> position;
+        # the first product wins if a catalog repeats an id
+        self.id_positions: Dict[str, int] = {}
+        for position, product in enumerate(products):
+            for key in (product.get("product_id"), product.get("asin")):
+                if key:
+                    self.id_positions.setdefault(str(key), position)
+
+        # Lowercased category name -> numeric id used by SearchDoc.category_id
+        self.category_ids: Dict[str, int] = {}
+        category_names: List[str] = []
+        # Only needed while building; queries run on postings and facets alone
+        docs: List[SearchDoc] = []
+        for product in products:
+            category = product.get("category") or ""
+            category_id = self.category_ids.get(category.lower())
+            if category_id is None:
+                category_id = self.category_ids[category.lower()] = len(category_names)
+                category_names.append(category)
+            docs.append(SearchDoc(product, category_id))
+
+        self.facets = FacetIndex(
+            [doc.price for doc in docs],
+            [doc.category_id for doc in docs],
+            category_names,
+        )
+
+        # Per-document term statistics: field term counts and field lengths.
+        # Sub-tokens count as terms but not towards the field length
+        doc_field_counts: List[Dict[str, Counter]] = []
+        doc_field_lengths: List[Dict[str, int]] = []
+        total_lengths = dict.fromkeys(FIELD_WEIGHTS, 0)
+        document_frequency: Counter = Counter()
+
+        for doc in docs:
+            field_counts = {}
+            field_lengths = {}
+            for field in FIELD_WEIGHTS:
+                tokens = doc.field_tokens(field)
+                counts = Counter(tokens)
+                counts.update(sub for token in tokens for sub in subtokens(token))
+                field_counts[field] = counts
+                field_lengths[field] = len(tokens)
+                total_lengths[field] += len(tokens)
+            doc_field_counts.append(field_counts)
+            doc_field_lengths.append(field_lengths)
+            document_frequency.update(
+                {term for counts in field_counts.values() for term in counts}
+            )
+
+        doc_count = len(products) or 1
+        average_lengths = {
+            field: (total / doc_count) or 1.0 for field, total in total_lengths.items()
+        }
+
+        self.postings: Dict[str, Dict[int, float]] = {}
+        for doc_id, (field_counts, field_lengths) in enumerate(zip(doc_field_counts, doc_field_lengths)):
+            # BM25F: length-normalized, weighted term frequency summed across fields
+            weighted_tf: Dict[str, float] = {}
+            for field, counts in field_counts.items():
+                if not counts:
+                    continue
+                length = field_lengths[field]
+                norm = 1 - BM25_B + BM25_B * length / average_lengths[field]
+                weight = FIELD_WEIGHTS[field]
+                for term, count in counts.items():
+                    weighted_tf[term] = weighted_tf.get(term, 0.0) + weight * count / norm
+
+            boost = self.boosts[doc_id]
+            for term, tf in weighted_tf.items():
+                df = document_frequency[term]
+                idf = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+                score = idf * tf * (BM25_K1 + 1) / (tf + BM25_K1)
+                self.postings.setdefault(term, {})[doc_id] = score * boost
+
+        # Sorted vocabulary lets a query token match every indexed term it prefixes
+        self.vocabulary: List[str] = sorted(self.postings)
+        self.expansions = compile_expansions(expansions)
+
+        # Typo-tolerant lookup is limited to the words people actually say: names
+        self.fuzzy = TrigramIndex(
+            token
+            for doc in docs
+            for token in doc.name_tokens + tuple(doc.field_tokens("short_name"))
+        )
+
+        # Autocomplete offers the names as written, most popular product first
+        self.suggestions = SuggestIndex(
+            (text, tokenize(text), boost)
+            for product, boost in zip(products, self.boosts)
+            for text in (product.get("name"), product.get("short_name"))
+            if text
+        )
+
+        logger.debug(
+            "Built product index: %s products, %s terms", len(products), len(self.vocabulary)
+        )
+
+    @classmethod
+    def from_parts(
+        cls,
+        products: Sequence[Dict[str, Any]],
+        boosts: Sequence[float],
+        id_positions: Mapping[str, int],
+        category_ids: Dict[str, int],
+        facets: FacetIndex,
+        postings: Mapping[str, Dict[int, float]],
+        vocabulary: Sequence[str],
+        expansions: Dict[str, tuple],
+        fuzzy: TrigramIndex,
+        suggestions: SuggestIndex,
+    ) -> "ProductIndex":
+        """
+        Reassemble an index from previously built structures without rebuilding.
+
+        Used by :mod:`app.services.catalog_binary` to serve a prebuilt
+        snapshot; any sequence or mapping with the same read interface as the
+        built lists and dicts will do.
+        """
+        index = cls.__new__(cls)
+        index.products = products
+        index.boosts = boosts
+        index.id_positions = id_positions
+        index.category_ids = category_ids
+        index.facets = facets
+        index.postings = postings
+        index.vocabulary = vocabulary
+        index.expansions = expansions
+        index.fuzzy = fuzzy
+        index.suggestions = suggestions
+        return index
+
+    def position(self, product_id: str) -> Optional[int]:
+        """Catalog position of the product with this ``product_id`` or ASIN, if any."""
+        if not product_id:
+            return None
+        return self.id_positions.get(product_id.strip())
+
+    def suggest(self, prefix: str, limit: int = 10) -> List[str]:
+        """
+        Product names completing a partially typed query.
+
+        Args:
+            prefix: What the user has typed so far; the last word may be partial
+            limit: Maximum number of suggestions
+
+        Returns:
+            Product names and short names, most popular first
+        """
+        return self.suggestions.suggest(tokenize(prefix), limit)
+
+    def _expand_prefix(self, token: str) -> Iterable[str]:
+        """Yield indexed terms that start with ``token``."""
+        start = bisect.bisect_left(self.vocabulary, token)
+        for position in range(start, len(self.vocabulary)):
+            term = self.vocabulary[position]
+            if not term.startswith(token):
+                break
+            yield term
+
+    def _match_token(self, token: str) -> Dict[int, float]:
+        """
+        Union the postings of every term matching a single query token.
+
+        A token matches the indexed terms it prefixes, plus the terms prefixed
+        by any of its synonym expansions. Returns the posting list itself when
+        only a single term matches, so the result must be treated as read-only.
+        """
+        terms = dict.fromkeys(self._expand_prefix(token))
+        for expansion in self.expansions.get(token, ()):
+            terms.update(dict.fromkeys(self._expand_prefix(expansion)))
+        return self._union_postings(list(terms))
+
+    def score(self, query: str, candidates: Optional[DocSet] = None) -> Dict[int, float]:
+        """
+        Score products containing every token of the query.
+
+        Args:
+            query: Free-text search query
+            candidates: Optional pre-filtered positions (see :meth:`candidates`);
+                text matching only considers these
+
+        Returns:
+            Read-only mapping of product position to relevance score. An
+            empty query matches every candidate, scored by popularity alone.
+        """
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens:
+            if candidates is None:
+                return dict(enumerate(self.boosts))
+            return {doc_id: self.boosts[doc_id] for doc_id in candidates}
+
+        token_matches = [self._match_token(token) for token in tokens]
+        # Intersect starting from the rarest token so the working set stays small
+        token_matches.sort(key=len)
+
+        if candidates is not None and len(candidates) < len(token_matches[0]):
+            # The filters are more selective than any query word: walk the candidates
+            scores = {}
+            for doc_id in candidates:
+                total = 0.0
+                for matches in token_matches:
+                    score = matches.get(doc_id)
+                    if score is None:
+                        break
+                    total += score
+                else:
+                    scores[doc_id] = total
+            return scores
+
+        scores = token_matches[0]
+        if candidates is not None:
+            scores = {doc_id: score for doc_id, score in scores.items() if doc_id in candidates}
+        for matches in token_matches[1:]:
+            if not scores:
+                break
+            scores = {
+                doc_id: score + matches[doc_id]
+                for doc_id, score in scores.items()
+                if doc_id in matches
+            }
+        return scores
+
+    def _has_prefix_match(self, token: str) -> bool:
+        """True if ``token`` prefixes an indexed term or has synonym expansions."""
+        position = bisect.bisect_left(self.vocabulary, token)
+        if position < len(self.vocabulary) and self.vocabulary[position].startswith(token):
+            return True
+        return token in self.expansions
+
+    def _infix_terms(self, token: str) -> List[str]:
+        """
+        Name terms containing ``token`` inside them ("pods" -> "airpods").
+
+        Found through the trigram index, like spelling corrections, so the
+        vocabulary is never scanned.
+        """
+        if len(token) < MIN_INFIX_LENGTH:
+            return []
+        return self.fuzzy.containing(token)
+
+    def _closest_terms(self, key: str, max_distance: Optional[int] = None) -> List[str]:
+        """
+        Name terms at the smallest edit distance from ``key`` within its budget.
+
+        ``max_distance`` rejects matches at that distance or more, on top of
+        the budget.
+        """
+        matches = self.fuzzy.lookup(key)
+        if not matches:
+            return []
+        closest = matches[0][1]
+        if max_distance is not None and closest >= max_distance:
+            return []
+        return [term for term, distance in matches if distance == closest]
+
+    def _union_postings(self, terms: List[str]) -> Dict[int, float]:
+        """Best score per product across the posting lists of ``terms``."""
+        if len(terms) == 1:
+            return self.postings[terms[0]]
+        matches: Dict[int, float] = {}
+        for term in terms:
+            for doc_id, score in self.postings[term].items():
+                if score > matches.get(doc_id, 0.0):
+                    matches[doc_id] = score
+        return matches
+
+    def fuzzy_score(self, query: str, candidates: Optional[DocSet] = None) -> Dict[int, float]:
+        """
+        Score products whose names approximately match the query.
+
+        Used when :meth:`score` finds nothing, typically for misspelled voice
+        transcripts. Spoken numbers are mapped to digits, then each query word
+        is corrected to the closest name terms in the trigram index (verified
+        with a bounded edit distance). Adjacent words are first tried joined
+        together, so "air pods" resolves to "airpods". Words that match the
+        index as typed are kept as they are, and a word found inside indexed
+        terms matches those terms ("pods" -> "airpods", "phone" ->
+        "headphones") before any spelling correction.
+
+        Every word except filler (:data:`QUERY_STOP_WORDS`) must resolve to
+        some term, and the words are intersected like a normal query: a
+        word that matches nothing, or no product the other words match,
+        means no result rather than a looser one.
+
+        Args:
+            query: Free-text search query
+            candidates: Optional pre-filtered positions to restrict matches to
+
+        Returns:
+            Mapping of product position to relevance score
+        """
+        tokens = [_NUMBER_WORDS.get(token, token) for token in tokenize(query)]
+
+        token_matches: List[Dict[int, float]] = []
+        position = 0
+        while position < len(tokens):
+            token = tokens[position]
+            if token in QUERY_STOP_WORDS:
+                position += 1
+                continue
+            if position + 1 < len(tokens):
+                # A join that only drops the second word ("samsung tv" ->
+                # "samsung") is not a match for it
+                following = tokens[position + 1]
+                joined = self._closest_terms(token + following, max_distance=len(following))
+                if joined:
+                    token_matches.append(self._union_postings(joined))
+                    position += 2
+                    continue
+
+            if self._has_prefix_match(token):
+                token_matches.append(self._match_token(token))
+            else:
+                terms = self._infix_terms(token) or self._closest_terms(token)
+                if not terms:
+                    return {}
+                token_matches.append(self._union_postings(terms))
+            position += 1
+
+        if not token_matches:
+            return {}
+
+        if candidates is not None:
+            token_matches = [
+                {doc_id: score for doc_id, score in matches.items() if doc_id in candidates}
+                for matches in token_matches
+            ]
+
+        token_matches.sort(key=len)
+        scores = token_matches[0]
+        for matches in token_matches[1:]:
+            if not scores:
+                break
+            scores = {
+                doc_id: score + matches[doc_id]
+                for doc_id, score in scores.items()
+                if doc_id in matches
+            }
+        return scores
+
+    @staticmethod
+    def top(scores: Dict[int, float], limit: int, ranked: bool = True) -> List[int]:
+        """
+        Select the best ``limit`` product positions without sorting every match.
+
+        Args:
+            scores: Output of :meth:`score`
+            limit: Maximum number of positions to return
+            ranked: Order by relevance (default) or by catalog position
+
+        Returns:
+            Product positions, best first
+        """
+        if not ranked:
+            return heapq.nsmallest(limit, scores)
+        # Ties break towards catalog order
+        return heapq.nsmallest(limit, scores, key=lambda doc_id: (-scores[doc_id], doc_id))
+
+    def candidates(
+        self,
+        max_price: Optional[float] = None,
+        category: Optional[str] = None,
+    ) -> Optional[DocSet]:
+        """
+        Resolve price/category filters to candidate positions before text matching.
+
+        Returns None when no filter applies. Unknown categories match nothing.
+        """
+        category_id = None
+        if category:
+            category_id = self.category_ids.get(category.strip().lower(), -1)
+        return self.facets.candidates(max_price=max_price, category_id=category_id)
+
+    def matches(
+        self,
+        query: str,
+        max_price: Optional[float] = None,
+        category: Optional[str] = None,
+    ) -> Dict[int, float]:
+        """
+        Score every product matching a filtered query.
+
+        Filters narrow the candidates first; if no product matches the query
+        text, approximate name matching is tried before giving up.
+
+        Returns:
+            Read-only mapping of product position to relevance score
+        """
+        candidates = self.candidates(max_price=max_price, category=category)
+        if candidates is not None and not candidates:
+            return {}
+
+        # Synonyms (e.g. "bike" -> "motorcycle") are expanded inside the index
+        scores = self.score(query, candidates)
+        if not scores:
+            # Likely a misspelled voice transcript; fall back to approximate name matches
+            scores = self.fuzzy_score(query, candidates)
+        return scores
+
+    @staticmethod
+    def order(scores: Dict[int, float], ranked: bool = True) -> array:
+        """
+        Every matching position in result order, as :meth:`top` would return them.
+
+        Used to page deep into a result set: the full order is computed once
+        and later pages are slices of it. Stored as a compact ``array``.
+        """
+        if ranked:
+            return array("I", sorted(scores, key=lambda doc_id: (-scores[doc_id], doc_id)))
+        return array("I", sorted(scores))
+
+    def search(
+        self,
+        query: str,
+        limit: int,
+        max_price: Optional[float] = None,
+        category: Optional[str] = None,
+        ranked: bool = True,
+    ) -> List[int]:
+        """Return the top ``limit`` product positions for a filtered query (see :meth:`matches`)."""
+        return self.top(self.matches(query, max_price=max_price, category=category), limit, ranked=ranked)
@@ -0,0 +1,297 @@
+"""Opt-in cache of chat answers for repeated, self-contained questions."""
+import asyncio
+import logging
+import math
+import re
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from app.config import settings
+from app.services.lru_cache import LRUCache
+from app.services.metrics import metrics
+from app.services.product_index import tokenize
+
+logger = logging.getLogger(__name__)
+
+# Seconds an answer stays valid, by the tools it used; the shortest applies.
+# Tools missing here (or with 0) make an answer uncacheable: add_to_cart
+# must run on every request, and unknown tools may have side effects too.
+DEFAULT_TOOL_TTLS: Dict[str, float] = {
+    "": 0,  # answers that used no tools; opt in with RESPONSE_CACHE_TTLS
+    "search_products": 3600,
+    "grokipedia_search": 86400,
+    "polymarket_market_data": 300,
+    "alpha_vantage_market_data": 60,
+    "add_to_cart": 0,
+}
+
+STOP_WORDS = frozenset(
+    "a an and any are can could do does find for from get give have in is looking need of "
+    "on or please s show some tell the to want what whats which with would you"
+    .split()
+)
+
+# A question using these depends on earlier turns ("how much is that one")
+# or on the user ("what's in my cart"), so its answer is not reused across
+# conversations
+REFERENCE_WORDS = frozenset(
+    "it its that this these those them they one ones he she him her his there again else "
+    "another other more previous last same "
+    "i me my mine myself we us our ours"
+    .split()
+)
+
+# "show me ..." is phrasing, not a reference to the user
+REQUEST_VERBS = frozenset("show find give get tell send".split())
+
+# Words that shape how a question is asked but not what is looked up, so
+# they never end up in tool arguments ("how much are AirPods" searches the
+# same as "AirPods price")
+QUESTION_WORDS = frozenset(
+    "about cost costs detail details how info information know much price prices tell".split()
+)
+
+# Plural endings intent_fingerprint leaves behind ("watches" -> "watche")
+_PLURAL_REMAINDER = re.compile(r"(?<=ch|sh|ss)e$|(?<=x)e$")
+
+ToolCalls = List[Tuple[str, Dict[str, Any]]]
+Embedder = Callable[[str], Sequence[float]]
+Renderer = Callable[[ToolCalls, List[Any], str], Optional[str]]
+
+
+def intent_fingerprint(message: str) -> Optional[str]:
+    """
+    Normalized form of a question: lowercased, tokenized, stop words and
+    plural endings removed, sorted. None if the question refers to earlier
+    turns or to the user, or has nothing left to key on.
+    """
+    tokens = tokenize(message)
+    tokens = [
+        token for position, token in enumerate(tokens)
+        if not (token == "me" and position and tokens[position - 1] in REQUEST_VERBS)
+    ]
+    if not tokens or REFERENCE_WORDS.intersection(tokens):
+        return None
+    terms = {
+        token[:-1] if len(token) > 3 and token.endswith("s") and not token.endswith("ss") else token
+        for token in tokens
+        if token not in STOP_WORDS
+    }
+    return " ".join(sorted(terms)) or None
+
+
+def argument_terms(fingerprint: str) -> frozenset:
+    """
+    The terms of a fingerprint that can reach tool arguments: question
+    words dropped and plural forms folded. Two questions with the same
+    argument terms make the same tool calls.
+    """
+    terms = set()
+    for term in fingerprint.split():
+        if term in QUESTION_WORDS:
+            continue
+        if term.endswith("ie") and len(term) > 3:
+            term = term[:-2] + "y"
+        terms.add(_PLURAL_REMAINDER.sub("", term))
+    return frozenset(terms)
+
+
+def _cosine(a: Sequence[float], b: Sequence[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    text: str
+    tool_calls: ToolCalls
+    expires_at: float
+    embedding: Optional[Tuple[float, ...]] = None
+    templated: bool = False
+    fingerprint: str = ""
+
+
+class ResponseCache:
+    """
+    Answers to repeated questions, served without calling the LLM.
+
+    Entries are keyed by :func:`intent_fingerprint`, so "What's the price of
+    AirPods?" and "airpods price" share one. With an ``embed`` function, a
+    question whose fingerprint misses can still match a cached one whose
+    embedding is at least ``similarity`` close, as long as both have the
+    same :func:`argument_terms`. The entry's tool calls are reused, so
+    "sony headphones" must not be answered with a search for "bose
+    headphones", nor "under 200" with one for "under 300".
+
+    An entry keeps the answer text and the tool calls that produced it. On
+    a hit the tools run again, so products and quotes in the response are
+    current while the text is reused; the entry's TTL (per tool, see
+    :data:`DEFAULT_TOOL_TTLS`) bounds how stale the text may get. Text that
+    was rendered from the tool results by a template (see
+    ``TOOL_RESPONSE_TEMPLATES``) is rendered again from the fresh ones.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        tool_ttls: Optional[Dict[str, float]] = None,
+        embed: Optional[Embedder] = None,
+        similarity: float = 0.92,
+    ):
+        self.tool_ttls = {**DEFAULT_TOOL_TTLS, **(tool_ttls or {})}
+        self.embed = embed
+        self.similarity = similarity
+        self._entries: LRUCache[str, CachedResponse] = LRUCache(maxsize)
+
+    def ttl(self, tool_calls: ToolCalls) -> float:
+        """Seconds an answer that made these tool calls may be reused (0: never)."""
+        names = {name for name, _ in tool_calls} or {""}
+        return min(self.tool_ttls.get(name, 0) for name in names)
+
+    def _find(self, key: str, message: str) -> Optional[CachedResponse]:
+        now = time.time()
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry.expires_at > now:
+                return entry
+            self._entries.pop(key)
+        if self.embed is None:
+            return None
+
+        vector = self.embed(message)
+        terms = argument_terms(key)
+        best, best_score = None, self.similarity
+        for candidate in self._entries.values():
+            if candidate.embedding is None or candidate.expires_at <= now:
+                continue
+            if argument_terms(candidate.fingerprint) != terms:
+                continue
+            score = _cosine(vector, candidate.embedding)
+            if score >= best_score:
+                best, best_score = candidate, score
+        return best
+
+    async def lookup(
+        self,
+        message: str,
+        tool_executor,
+        history: Optional[List[Dict[str, Any]]] = None,
+        render: Optional[Renderer] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Answer ``message`` from the cache, re-running its tools for fresh data.
+
+        Args:
+            message: The user's question
+            tool_executor: Runs the cached answer's tool calls
+            history: The conversation so far (summary and messages); only
+                the opening question of a conversation is answered
+            render: Renders the reply of a templated entry from its tool
+                calls, fresh results and ``message``; without it those
+                entries miss
+
+        Returns:
+            A result shaped like :meth:`LLMService.process_with_tools`, or None
+        """
+        key = intent_fingerprint(message)
+        if key is None or history:
+            return None
+        if self.embed is not None:
+            entry = await asyncio.to_thread(self._find, key, message)
+        else:
+            entry = self._find(key, message)
+        if entry is None or (entry.templated and render is None):
+            metrics.increment("response_cache.misses")
+            return None
+
+        results = await tool_executor.execute_many_async(entry.tool_calls) if entry.tool_calls else []
+        text = entry.text
+        if entry.templated:
+            text = render(entry.tool_calls, results, message)
+            if text is None:
+                # The fresh results need the model's wording now (say a
+                # search that matched one product matches several)
+                metrics.increment("response_cache.misses")
+                return None
+        metrics.increment("response_cache.hits")
+        products = None
+        tool_outputs: Dict[str, Any] = {}
+        for (name, _), result in zip(entry.tool_calls, results):
+            tool_outputs[name] = result
+            if name == "search_products" and isinstance(result, list):
+                products = result or None
+        return {
+            "text": text,
+            "tools_used": [name for name, _ in entry.tool_calls],
+            "products": products,
+            "tool_outputs": tool_outputs or None,
+        }
+
+    async def store(
+        self,
+        message: str,
+        text: Optional[str],
+        tool_calls: ToolCalls,
+        history: Optional[List[Dict[str, Any]]] = None,
+        templated: bool = False,
+    ) -> bool:
+        """
+        Remember an answer if the question and its tools allow reuse.
+
+        Answers given with earlier turns or a summary in the prompt may
+        depend on them, so only a conversation's opening question is stored.
+        A ``templated`` answer is re-rendered from fresh tool results on a hit.
+
+        Returns:
+            True if an entry was stored
+        """
+        key = intent_fingerprint(message)
+        ttl = self.ttl(tool_calls)
+        if key is None or history or not text or ttl <= 0:
+            return False
+        embedding = None
+        if self.embed is not None:
+            embedding = tuple(await asyncio.to_thread(self.embed, message))
+        self._entries.put(
+            key,
+            CachedResponse(text, list(tool_calls), time.time() + ttl, embedding, templated, fingerprint=key),
+        )
+        metrics.increment("response_cache.stores")
+        return True
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Entry count and hit rate."""
+        return {"embedding": self.embed is not None, **self._entries.stats()}
+
+
+def _load_embedder(model_name: str) -> Optional[Embedder]:
+    try:
+        from sentence_transformers import SentenceTransformer
+    except ImportError:
+        logger.warning("sentence-transformers is not installed; the response cache matches fingerprints only")
+        return None
+    model = SentenceTransformer(model_name)
+    return lambda text: model.encode(text).tolist()
+
+
+def _create_response_cache() -> Optional[ResponseCache]:
+    if not settings.response_cache_enabled:
+        return None
+    embed = _load_embedder(settings.response_cache_embedding_model) if settings.response_cache_embedding_model else None
+    cache = ResponseCache(
+        maxsize=settings.response_cache_size,
+        tool_ttls=settings.response_cache_ttls,
+        embed=embed,
+        similarity=settings.response_cache_similarity,
+    )
+    metrics.register_collector("response_cache", cache.stats)
+    return cache
+
+
+# Singleton instance; None unless RESPONSE_CACHE_ENABLED
+response_cache = _create_response_cache()
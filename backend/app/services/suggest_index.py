@@ -0,0 +1,178 @@
+"""Prefix autocomplete over product names, ranked by popularity."""
+import bisect
+import heapq
+import logging
+from array import array
+from collections.abc import Sequence as SequenceABC
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Sorts after every character the tokenizer keeps, closing a prefix range
+_PREFIX_END = "￿"
+
+
+class _SuffixKeys(SequenceABC):
+    """
+    The sorted completion keys, materialized on access.
+
+    Entry ``i`` is the normalized phrase ``entry_phrases[i]`` from character
+    ``entry_offsets[i]`` on. Keeping (phrase, offset) pairs instead of the
+    suffix strings keeps the index a few bytes per entry.
+    """
+
+    __slots__ = ("_phrases", "_entry_phrases", "_entry_offsets")
+
+    def __init__(self, phrases: Sequence[str], entry_phrases: Sequence[int], entry_offsets: Sequence[int]):
+        self._phrases = phrases
+        self._entry_phrases = entry_phrases
+        self._entry_offsets = entry_offsets
+
+    def __len__(self) -> int:
+        return len(self._entry_phrases)
+
+    def __getitem__(self, position: int) -> str:
+        return self._phrases[self._entry_phrases[position]][self._entry_offsets[position]:]
+
+
+class SuggestIndex:
+    """
+    Completions for partially typed queries (search box, partial voice transcripts).
+
+    Every distinct product ``name`` / ``short_name`` is a suggestion. It is
+    indexed under each of its word-start suffixes, so "head" completes to
+    "Sony WH-1000XM5 Headphones". The suffix entries are kept in one sorted
+    array and a prefix maps to a contiguous range of it. A segment tree of
+    per-range argmax over suggestion popularity then yields the top ``k``
+    of the range in O(k log n), however many names share the prefix.
+    """
+
+    def __init__(self, phrases: Iterable[Tuple[str, List[str], float]]):
+        """
+        Args:
+            phrases: ``(display text, normalized words, popularity)`` triples;
+                repeated texts keep their highest popularity
+        """
+        best: Dict[str, Tuple[float, str]] = {}
+        for text, words, weight in phrases:
+            if not words:
+                continue
+            normalized = " ".join(words)
+            current = best.get(normalized)
+            if current is None or weight > current[0]:
+                best[normalized] = (weight, current[1] if current else text)
+
+        self.phrases: List[str] = list(best)
+        self.texts: List[str] = [best[phrase][1] for phrase in self.phrases]
+        self.weights = array("d", (best[phrase][0] for phrase in self.phrases))
+
+        entries = []
+        for phrase_id, phrase in enumerate(self.phrases):
+            offset = 0
+            for word in phrase.split(" "):
+                entries.append((phrase_id, offset))
+                offset += len(word) + 1
+        entries.sort(key=lambda entry: self.phrases[entry[0]][entry[1]:])
+        self.entry_phrases = array("I", (phrase_id for phrase_id, _ in entries))
+        self.entry_offsets = array("I", (offset for _, offset in entries))
+        self.tree = self._build_tree()
+        self._bind()
+
+        logger.debug("Built suggest index: %s phrases, %s entries", len(self.phrases), len(entries))
+
+    @classmethod
+    def from_parts(
+        cls,
+        phrases: Sequence[str],
+        texts: Sequence[str],
+        weights: Sequence[float],
+        entry_phrases: Sequence[int],
+        entry_offsets: Sequence[int],
+        tree: Sequence[int],
+    ) -> "SuggestIndex":
+        """Reassemble an index from previously built structures (see catalog_binary)."""
+        index = cls.__new__(cls)
+        index.phrases = phrases
+        index.texts = texts
+        index.weights = weights
+        index.entry_phrases = entry_phrases
+        index.entry_offsets = entry_offsets
+        index.tree = tree
+        index._bind()
+        return index
+
+    def _bind(self) -> None:
+        self._keys = _SuffixKeys(self.phrases, self.entry_phrases, self.entry_offsets)
+
+    def _entry_weight(self, entry: int) -> float:
+        return self.weights[self.entry_phrases[entry]]
+
+    def _better(self, a: int, b: int) -> int:
+        """The entry ranked first: higher popularity, then earlier in key order."""
+        weight_a, weight_b = self._entry_weight(a), self._entry_weight(b)
+        if weight_a != weight_b:
+            return a if weight_a > weight_b else b
+        return a if a < b else b
+
+    def _build_tree(self) -> array:
+        """Bottom-up segment tree; node ``i`` holds the best entry of its range."""
+        size = len(self.entry_phrases)
+        tree = array("I", bytes(4 * 2 * size))
+        for entry in range(size):
+            tree[size + entry] = entry
+        for node in range(size - 1, 0, -1):
+            tree[node] = self._better(tree[2 * node], tree[2 * node + 1])
+        return tree
+
+    def _best_in(self, low: int, high: int) -> int:
+        """Best entry in ``[low, high)`` (non-empty)."""
+        size = len(self.entry_phrases)
+        best = -1
+        low += size
+        high += size
+        while low < high:
+            if low & 1:
+                best = self.tree[low] if best < 0 else self._better(best, self.tree[low])
+                low += 1
+            if high & 1:
+                high -= 1
+                best = self.tree[high] if best < 0 else self._better(best, self.tree[high])
+            low >>= 1
+            high >>= 1
+        return best
+
+    def suggest(self, words: List[str], limit: int) -> List[str]:
+        """
+        Most popular suggestions containing the typed words at a word start.
+
+        Args:
+            words: Tokenized input; the last word may be partial
+            limit: Maximum number of suggestions
+
+        Returns:
+            Suggestion texts, most popular first
+        """
+        if not words or limit < 1:
+            return []
+        prefix = " ".join(words)
+        low = bisect.bisect_left(self._keys, prefix)
+        high = bisect.bisect_left(self._keys, prefix + _PREFIX_END, low)
+        if low >= high:
+            return []
+
+        # Repeatedly take the best entry of a range and split the range around it
+        best = self._best_in(low, high)
+        heap = [(-self._entry_weight(best), best, low, high)]
+        seen = set()
+        results: List[str] = []
+        while heap and len(results) < limit:
+            _, entry, range_low, range_high = heapq.heappop(heap)
+            phrase_id = self.entry_phrases[entry]
+            if phrase_id not in seen:
+                seen.add(phrase_id)
+                results.append(self.texts[phrase_id])
+            for part_low, part_high in ((range_low, entry), (entry + 1, range_high)):
+                if part_low < part_high:
+                    part_best = self._best_in(part_low, part_high)
+                    heapq.heappush(heap, (-self._entry_weight(part_best), part_best, part_low, part_high))
+        return results
@@ -0,0 +1,211 @@
+"""Token counting for chat messages with the model's own BPE vocabulary."""
+import base64
+import hashlib
+import json
+import logging
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - optional dependency
+    tiktoken = None
+
+from app.config import settings
+from app.services.lru_cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+# Vendored vocabularies (cl100k_base, o200k_base): <name>.tiktoken BPE files
+# plus a manifest with each encoding's split pattern, special tokens and file
+# hash. Encodings are built from these directly, never through tiktoken's
+# download cache, so TIKTOKEN_CACHE_DIR and the network play no part.
+# scripts/vendor_tokenizer_vocab.py refreshes them.
+VOCAB_DIR = Path(__file__).resolve().parent.parent / "data" / "tiktoken"
+VOCAB_MANIFEST = "encodings.json"
+
+# Vocabulary for model names tiktoken does not know
+DEFAULT_ENCODING = "cl100k_base"
+
+# Chat format overhead, as in OpenAI's token counting guide
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_NAME = 1
+TOKENS_PER_TOOL_CALL = 3
+REPLY_PRIMING_TOKENS = 3
+
+# Context window by model name prefix; the longest matching prefix wins
+MODEL_CONTEXT_WINDOWS = {
+    "gpt-4": 8192,
+    "gpt-4-32k": 32768,
+    "gpt-4-turbo": 128000,
+    "gpt-4-1106": 128000,
+    "gpt-4-0125": 128000,
+    "gpt-4o": 128000,
+    "gpt-4.1": 1047576,
+    "gpt-3.5-turbo": 16385,
+    "o1": 200000,
+    "o3": 200000,
+    "o4-mini": 200000,
+}
+DEFAULT_CONTEXT_WINDOW = 8192
+
+
+def context_window(model: str) -> int:
+    """Context window in tokens for a model name (8192 if unknown)."""
+    matches = [prefix for prefix in MODEL_CONTEXT_WINDOWS if model.startswith(prefix)]
+    if not matches:
+        return DEFAULT_CONTEXT_WINDOW
+    return MODEL_CONTEXT_WINDOWS[max(matches, key=len)]
+
+
+def load_vendored_encoding(name: str):
+    """
+    Build the tiktoken encoding ``name`` from the vendored files.
+
+    Raises:
+        KeyError: If the encoding is not vendored
+        ValueError: If its BPE file does not match the recorded hash
+    """
+    spec = json.loads((VOCAB_DIR / VOCAB_MANIFEST).read_text(encoding="utf-8"))[name]
+    data = (VOCAB_DIR / spec["file"]).read_bytes()
+    if hashlib.sha256(data).hexdigest() != spec["sha256"]:
+        raise ValueError(f"Vendored vocabulary {spec['file']} does not match its hash")
+    ranks = {}
+    for line in data.splitlines():
+        if line:
+            token, rank = line.split()
+            ranks[base64.b64decode(token)] = int(rank)
+    return tiktoken.Encoding(
+        name=name,
+        pat_str=spec["pat_str"],
+        mergeable_ranks=ranks,
+        special_tokens=spec["special_tokens"],
+    )
+
+
+def _message_text(content: Any) -> str:
+    if isinstance(content, list):
+        return " ".join(
+            part.get("text", "") if isinstance(part, dict) else str(part)
+            for part in content
+        )
+    if content is None:
+        return ""
+    return content if isinstance(content, str) else str(content)
+
+
+class TokenCounter:
+    """
+    Counts prompt tokens the way the model will see them.
+
+    Text is encoded with the model's tiktoken vocabulary (loaded lazily from
+    the vendored files), plus the fixed per-message framing of the chat
+    format. Per-message counts are cached by content: clients resend the
+    whole history on every turn, so each message is encoded once.
+
+    Without tiktoken or a vocabulary it falls back to an estimate of one
+    token per 3 UTF-8 bytes, logging a warning once.
+    """
+
+    def __init__(self, model: str, cache_size: int = 4096):
+        self.model = model
+        self.context_window = context_window(model)
+        self._cache: LRUCache[tuple, int] = LRUCache(cache_size)
+        self._encoding = None
+        self._loaded = False
+
+    @property
+    def exact(self) -> bool:
+        """True when counts come from the real vocabulary rather than the estimate."""
+        return self._load() is not None
+
+    def _load(self):
+        if self._loaded:
+            return self._encoding
+        self._loaded = True
+        if tiktoken is None:
+            logger.warning("tiktoken is not installed; token counts are estimated")
+            return None
+        try:
+            try:
+                name = tiktoken.model.encoding_name_for_model(self.model)
+            except KeyError:
+                name = DEFAULT_ENCODING
+            self._encoding = load_vendored_encoding(name)
+        except Exception as exc:
+            logger.warning(f"Tokenizer vocabulary for {self.model} unavailable, token counts are estimated: {exc}")
+        return self._encoding
+
+    def count_text(self, text: str) -> int:
+        """Tokens in a piece of text."""
+        if not text:
+            return 0
+        encoding = self._load()
+        if encoding is None:
+            return len(text.encode("utf-8")) // 3 + 1
+        # Special-token markers in user text are encoded as plain text
+        return len(encoding.encode(text, disallowed_special=()))
+
+    def count_message(self, message: Dict[str, Any]) -> int:
+        """Tokens one chat message adds to the prompt (cached by content)."""
+        if not message:
+            return 0
+        tool_calls = message.get("tool_calls")
+        key = (
+            message.get("role"),
+            message.get("name"),
+            _message_text(message.get("content")),
+            json.dumps(tool_calls, sort_keys=True) if tool_calls else None,
+        )
+        tokens = self._cache.get(key)
+        if tokens is None:
+            role, name, text, _ = key
+            tokens = TOKENS_PER_MESSAGE + self.count_text(role or "") + self.count_text(text)
+            if name:
+                tokens += TOKENS_PER_NAME + self.count_text(name)
+            for call in tool_calls or []:
+                function = call.get("function") or {}
+                tokens += (
+                    TOKENS_PER_TOOL_CALL
+                    + self.count_text(function.get("name") or "")
+                    + self.count_text(function.get("arguments") or "")
+                )
+            self._cache.put(key, tokens)
+        return tokens
+
+    def count_messages(self, messages: List[Dict[str, Any]]) -> int:
+        """Prompt tokens for a message list, including the reply priming."""
+        return sum(self.count_message(message) for message in messages) + REPLY_PRIMING_TOKENS
+
+    def count_tools(self, tools: Optional[List[Dict[str, Any]]]) -> int:
+        """
+        Upper bound for the tokens a tool schema adds to the prompt.
+
+        The API renders schemas in a more compact form than JSON, so the
+        JSON token count is used as a safe overestimate.
+        """
+        if not tools:
+            return 0
+        key = ("tools", json.dumps(tools, sort_keys=True))
+        tokens = self._cache.get(key)
+        if tokens is None:
+            tokens = self.count_text(key[1])
+            self._cache.put(key, tokens)
+        return tokens
+
+    def stats(self) -> Dict[str, Any]:
+        """Tokenizer in use and cache hit rate."""
+        return {
+            "model": self.model,
+            "exact": self._encoding is not None,
+            "context_window": self.context_window,
+            "cache": self._cache.stats(),
+        }
+
+
+def create_token_counter(model: Optional[str] = None) -> TokenCounter:
+    """Token counter for ``model`` (default ``LLM_MODEL``) using the configured limits."""
+    counter = TokenCounter(model or settings.llm_model, cache_size=settings.token_cache_size)
+    if settings.llm_context_window > 0:
+        counter.context_window = settings.llm_context_window
+    return counter
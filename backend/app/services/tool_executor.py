@@ -1,40 +1,102 @@
 """Tool executor for LLM function calling."""
+import asyncio
+import inspect
 import logging
-from typing import Dict, Any, Callable
+import time
+from typing import Dict, Any, Callable, List, Optional, Sequence, Tuple
+
+from app.config import settings
+from app.services.http_client import close_async_client
+from app.services.metrics import metrics
 
 logger = logging.getLogger(__name__)
 
 
 class ToolExecutor:
-    """Executes tools called by LLM."""
-    
+    """
+    Executes tools called by LLM.
+
+    Tools may be plain functions or coroutine functions. The async chat
+    pipeline awaits coroutine tools on the event loop and runs plain ones in
+    a worker thread, so a tool never blocks other requests. Threads and
+    tasks inherit the caller's context variables (such as the current cart).
+    """
+
     def __init__(self):
         self.tools: Dict[str, Callable] = {}
-    
-    def register_tool(self, name: str, func: Callable):
-        """Register a tool function."""
+        self.timeouts: Dict[str, float] = {}
+
+    def register_tool(self, name: str, func: Callable, timeout: Optional[float] = None):
+        """
+        Register a tool function (sync or async).
+
+        Args:
+            name: Name the LLM calls the tool by
+            func: The tool implementation
+            timeout: Seconds a call may take; defaults to ``TOOL_TIMEOUT_SECONDS``
+        """
         self.tools[name] = func
+        if timeout is not None:
+            self.timeouts[name] = timeout
         logger.info(f"Registered tool: {name}")
-    
+
+    def _lookup(self, tool_name: str):
+        if tool_name not in self.tools:
+            error_msg = f"Tool '{tool_name}' not found. Available: {list(self.tools.keys())}"
+            logger.error(error_msg)
+            return None, {"error": error_msg}
+        return self.tools[tool_name], None
+
     def execute(self, tool_name: str, args: Dict[str, Any]) -> Any:
         """
-        Execute a tool with given arguments.
-        
+        Execute a tool with given arguments from synchronous code.
+
+        Coroutine tools get a private event loop for the call; use
+        :meth:`execute_async` from async code.
+
         Args:
             tool_name: Name of the tool to execute
             args: Arguments for the tool
-        
+
         Returns:
             Tool execution result
         """
-        if tool_name not in self.tools:
-            error_msg = f"Tool '{tool_name}' not found. Available: {list(self.tools.keys())}"
-            logger.error(error_msg)
+        tool_func, error = self._lookup(tool_name)
+        if error:
+            return error
+
+        try:
+            if inspect.iscoroutinefunction(tool_func):
+                result = asyncio.run(self._run_detached(tool_func(**args)))
+            else:
+                result = tool_func(**args)
+            logger.info(f"Tool {tool_name} executed successfully")
+            return result
+        except Exception as e:
+            error_msg = f"Tool {tool_name} execution failed: {str(e)}"
+            logger.exception(error_msg)
             return {"error": error_msg}
-        
+
+    async def execute_async(self, tool_name: str, args: Dict[str, Any]) -> Any:
+        """
+        Execute a tool without blocking the event loop.
+
+        Args:
+            tool_name: Name of the tool to execute
+            args: Arguments for the tool
+
+        Returns:
+            Tool execution result
+        """
+        tool_func, error = self._lookup(tool_name)
+        if error:
+            return error
+
         try:
-            tool_func = self.tools[tool_name]
-            result = tool_func(**args)
+            if inspect.iscoroutinefunction(tool_func):
+                result = await tool_func(**args)
+            else:
+                result = await asyncio.to_thread(tool_func, **args)
             logger.info(f"Tool {tool_name} executed successfully")
             return result
         except Exception as e:
@@ -42,7 +104,45 @@ class ToolExecutor:
             logger.exception(error_msg)
             return {"error": error_msg}
 
+    async def _execute_with_timeout(self, tool_name: str, args: Dict[str, Any]) -> Any:
+        timeout = self.timeouts.get(tool_name, settings.tool_timeout_seconds)
+        start = time.perf_counter()
+        try:
+            return await asyncio.wait_for(self.execute_async(tool_name, args), timeout)
+        except asyncio.TimeoutError:
+            # A sync tool's thread cannot be interrupted; its late result is discarded
+            metrics.increment("tools.timeouts")
+            logger.warning(f"Tool {tool_name} timed out after {timeout:g}s")
+            return {"error": f"Tool {tool_name} timed out after {timeout:g} seconds"}
+        finally:
+            if tool_name in self.tools:
+                metrics.observe(f"tools.{tool_name}_seconds", time.perf_counter() - start)
+
+    async def execute_many_async(self, calls: Sequence[Tuple[str, Dict[str, Any]]]) -> List[Any]:
+        """
+        Execute independent tool calls concurrently.
+
+        Each call runs under its own timeout, so a slow tool costs only its
+        own result: it is reported as an error while the others complete.
+
+        Args:
+            calls: ``(tool_name, args)`` pairs, e.g. the tool calls of one LLM turn
+
+        Returns:
+            Results in the order of ``calls``
+        """
+        return list(await asyncio.gather(
+            *(self._execute_with_timeout(tool_name, args) for tool_name, args in calls)
+        ))
+
+    @staticmethod
+    async def _run_detached(coroutine):
+        # The loop ends with the call, so its HTTP client must not outlive it
+        try:
+            return await coroutine
+        finally:
+            await close_async_client()
+
 
 # Singleton instance
 tool_executor = ToolExecutor()
-
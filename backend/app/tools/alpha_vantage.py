@@ -3,11 +3,10 @@ from __future__ import annotations
 
 import logging
 import time
-from typing import Any, Dict, List, Optional, Tuple
-
-import requests
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
 
 from app.config import settings
+from app.services.http_client import get_async_client
 
 logger = logging.getLogger(__name__)
 
@@ -19,7 +18,7 @@ INTRADAY_CACHE_TTL = 60  # seconds
 _cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}
 
 
-def _call_alpha_vantage_http(function: str, params: Dict[str, Any]) -> Dict[str, Any]:
+async def _call_alpha_vantage_http(function: str, params: Dict[str, Any]) -> Dict[str, Any]:
     """Call the Alpha Vantage REST API directly."""
     api_key = settings.alpha_vantage_api_key or "demo"
     query_params = {
@@ -31,7 +30,7 @@ def _call_alpha_vantage_http(function: str, params: Dict[str, Any]) -> Dict[str,
     timeout = getattr(settings, "alpha_vantage_timeout", DEFAULT_TIMEOUT)
 
     try:
-        response = requests.get(ALPHA_VANTAGE_BASE_URL, params=query_params, timeout=timeout)
+        response = await get_async_client().get(ALPHA_VANTAGE_BASE_URL, params=query_params, timeout=timeout)
         response.raise_for_status()
         payload = response.json()
         if "Error Message" in payload:
@@ -107,7 +106,9 @@ def _normalize_intraday(payload: Dict[str, Any], interval: str) -> Optional[Dict
     }
 
 
-def _cached_fetch(cache_key: str, ttl: int, fetcher) -> Tuple[Dict[str, Any], bool]:
+async def _cached_fetch(
+    cache_key: str, ttl: int, fetcher: Callable[[], Awaitable[Dict[str, Any]]]
+) -> Tuple[Dict[str, Any], bool]:
     """Fetch data with a simple in-memory cache."""
     now = time.time()
     cached = _cache.get(cache_key)
@@ -117,13 +118,13 @@ def _cached_fetch(cache_key: str, ttl: int, fetcher) -> Tuple[Dict[str, Any], bo
         if now - timestamp < ttl:
             return payload, True
 
-    payload = fetcher()
+    payload = await fetcher()
     if isinstance(payload, dict) and "error" not in payload:
         _cache[cache_key] = (now, payload)
     return payload, False
 
 
-def alpha_vantage_market_data(
+async def alpha_vantage_market_data(
     symbol: str,
     data_type: str = "quote",
     interval: str = "5min",
@@ -139,7 +140,7 @@ def alpha_vantage_market_data(
     if normalized_type == "quote":
         cache_key = f"quote:{symbol.upper()}"
         params: Dict[str, Any] = {"symbol": symbol.upper()}
-        result, cached = _cached_fetch(
+        result, cached = await _cached_fetch(
             cache_key,
             QUOTE_CACHE_TTL,
             lambda: _call_alpha_vantage_http("GLOBAL_QUOTE", params),
@@ -148,7 +149,7 @@ def alpha_vantage_market_data(
         intraday_cache_hit: Optional[bool] = None
         intraday_raw: Optional[Dict[str, Any]] = None
         if "error" not in result:
-            intraday_result, intraday_cache_hit = _cached_fetch(
+            intraday_result, intraday_cache_hit = await _cached_fetch(
                 f"intraday:{symbol.upper()}:{interval}",
                 INTRADAY_CACHE_TTL,
                 lambda: _call_alpha_vantage_http(
@@ -163,7 +164,7 @@ def alpha_vantage_market_data(
     else:
         cache_key = f"intraday:{symbol.upper()}:{interval}"
         params = {"symbol": symbol.upper(), "interval": interval}
-        result, cached = _cached_fetch(
+        result, cached = await _cached_fetch(
             cache_key,
             INTRADAY_CACHE_TTL,
             lambda: _call_alpha_vantage_http("TIME_SERIES_INTRADAY", params),
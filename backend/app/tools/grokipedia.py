@@ -2,9 +2,10 @@
 import logging
 from typing import Any, Dict, List, Optional
 
-import requests
+import httpx
 
 from app.config import settings
+from app.services.http_client import get_async_client
 
 logger = logging.getLogger(__name__)
 
@@ -12,7 +13,7 @@ DEFAULT_GROKIPEDIA_URL = "https://api.x.ai/v1/grokipedia/search"
 DEFAULT_TIMEOUT = 20
 
 
-def _request_grokipedia(query: str, limit: int = 5) -> Dict[str, Any]:
+async def _request_grokipedia(query: str, limit: int = 5) -> Dict[str, Any]:
     """Call the Grokipedia REST endpoint."""
     if not settings.grokipedia_api_key:
         return {
@@ -31,13 +32,13 @@ def _request_grokipedia(query: str, limit: int = 5) -> Dict[str, Any]:
     payload = {"query": query, "limit": limit}
 
     try:
-        response = requests.post(base_url, json=payload, headers=headers, timeout=timeout)
+        response = await get_async_client().post(base_url, json=payload, headers=headers, timeout=timeout)
         response.raise_for_status()
         return response.json()
-    except requests.HTTPError as http_exc:
-        status = http_exc.response.status_code if http_exc.response else "unknown"
+    except httpx.HTTPStatusError as http_exc:
+        status = http_exc.response.status_code
         logger.error("Grokipedia API returned HTTP %s: %s", status, http_exc)
-        message = http_exc.response.text if http_exc.response else str(http_exc)
+        message = http_exc.response.text or str(http_exc)
         return {
             "error": f"Grokipedia API HTTP {status} error",
             "note": message,
@@ -53,11 +54,11 @@ def _extract_sources(data: Any) -> List[Dict[str, Any]]:
     return []
 
 
-def grokipedia_search(query: str, limit: int = 5) -> Dict[str, Any]:
+async def grokipedia_search(query: str, limit: int = 5) -> Dict[str, Any]:
     """Search Grokipedia for research information."""
     logger.info("Searching Grokipedia for: %s", query)
 
-    result = _request_grokipedia(query=query, limit=limit)
+    result = await _request_grokipedia(query=query, limit=limit)
 
     if "error" in result:
         return {
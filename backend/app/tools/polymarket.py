@@ -4,11 +4,12 @@ from __future__ import annotations
 import json
 import logging
 import time
-from typing import Any, Callable, Dict, List, Optional, Tuple
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
 
-import requests
+import httpx
 
 from app.config import settings
+from app.services.http_client import get_async_client
 
 logger = logging.getLogger(__name__)
 
@@ -23,7 +24,7 @@ CacheValue = Tuple[float, Any]
 _cache: Dict[str, CacheValue] = {}
 
 
-def _http_get(
+async def _http_get(
     base_url: str,
     path: str,
     params: Optional[Dict[str, Any]] = None,
@@ -42,16 +43,16 @@ def _http_get(
     timeout = getattr(settings, "polymarket_timeout", DEFAULT_TIMEOUT)
 
     try:
-        response = requests.get(url, params=params, headers=headers, timeout=timeout)
+        response = await get_async_client().get(url, params=params, headers=headers, timeout=timeout)
         response.raise_for_status()
 
         if "application/json" in response.headers.get("Content-Type", ""):
             return response.json()
 
         return {"raw": response.text}
-    except requests.HTTPError as exc:  # pragma: no cover - network call
-        status = exc.response.status_code if exc.response else "unknown"
-        message = exc.response.text if exc.response else str(exc)
+    except httpx.HTTPStatusError as exc:  # pragma: no cover - network call
+        status = exc.response.status_code
+        message = exc.response.text or str(exc)
         logger.error("Polymarket HTTP %s error for %s: %s", status, url, message)
         return {"error": f"Polymarket HTTP {status} error: {message}"}
     except Exception as exc:  # pragma: no cover - network call
@@ -59,15 +60,15 @@ def _http_get(
         return {"error": f"Polymarket HTTP call failed: {exc}"}
 
 
-def _gamma_get(path: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-    return _http_get(GAMMA_API_BASE_URL, path, params=params)
+async def _gamma_get(path: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    return await _http_get(GAMMA_API_BASE_URL, path, params=params)
 
 
-def _clob_get(path: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-    return _http_get(CLOB_API_BASE_URL, path, params=params)
+async def _clob_get(path: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    return await _http_get(CLOB_API_BASE_URL, path, params=params)
 
 
-def _cached_fetch(cache_key: str, ttl: int, fetcher: Callable[[], Any]) -> Tuple[Any, bool]:
+async def _cached_fetch(cache_key: str, ttl: int, fetcher: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
     now = time.time()
     cached = _cache.get(cache_key)
 
@@ -76,7 +77,7 @@ def _cached_fetch(cache_key: str, ttl: int, fetcher: Callable[[], Any]) -> Tuple
         if now - timestamp < ttl:
             return payload, True
 
-    payload = fetcher()
+    payload = await fetcher()
     if not _is_api_error(payload):
         _cache[cache_key] = (now, payload)
     return payload, False
@@ -233,7 +234,7 @@ def _normalize_event(event: Dict[str, Any], limit_markets: Optional[int] = None)
     }
 
 
-def _gamma_search(query: str, limit: int) -> Tuple[List[Dict[str, Any]], bool, Dict[str, Any]]:
+async def _gamma_search(query: str, limit: int) -> Tuple[List[Dict[str, Any]], bool, Dict[str, Any]]:
     params = {
         "q": query,
         "type": "events",
@@ -246,7 +247,7 @@ def _gamma_search(query: str, limit: int) -> Tuple[List[Dict[str, Any]], bool, D
 
     cache_key = f"gamma-search:{query}:{params['limit_per_type']}"
 
-    payload, cached = _cached_fetch(cache_key, SEARCH_CACHE_TTL, lambda: _gamma_get("public-search", params))
+    payload, cached = await _cached_fetch(cache_key, SEARCH_CACHE_TTL, lambda: _gamma_get("public-search", params))
 
     if _is_api_error(payload):
         return [], cached, payload if isinstance(payload, dict) else {"error": "Unknown gamma error"}
@@ -259,9 +260,9 @@ def _gamma_search(query: str, limit: int) -> Tuple[List[Dict[str, Any]], bool, D
     return normalized, cached, payload
 
 
-def _fallback_clob_search(query: str, limit: int) -> Tuple[List[Dict[str, Any]], bool, Dict[str, Any]]:
+async def _fallback_clob_search(query: str, limit: int) -> Tuple[List[Dict[str, Any]], bool, Dict[str, Any]]:
     cache_key = "clob:markets:index"
-    payload, cached = _cached_fetch(cache_key, DETAIL_CACHE_TTL, lambda: _clob_get("markets"))
+    payload, cached = await _cached_fetch(cache_key, DETAIL_CACHE_TTL, lambda: _clob_get("markets"))
 
     if _is_api_error(payload):
         return [], cached, payload if isinstance(payload, dict) else {"error": "Unknown CLOB error"}
@@ -295,8 +296,8 @@ def _fallback_clob_search(query: str, limit: int) -> Tuple[List[Dict[str, Any]],
     return normalized, cached, payload
 
 
-def _search_markets(query: str, limit: int) -> Dict[str, Any]:
-    gamma_results, gamma_cached, gamma_raw = _gamma_search(query, limit)
+async def _search_markets(query: str, limit: int) -> Dict[str, Any]:
+    gamma_results, gamma_cached, gamma_raw = await _gamma_search(query, limit)
 
     if gamma_results:
         return {
@@ -308,7 +309,7 @@ def _search_markets(query: str, limit: int) -> Dict[str, Any]:
         }
 
     logger.warning("Polymarket gamma search returned no results; falling back to CLOB search for '%s'", query)
-    clob_results, clob_cached, clob_raw = _fallback_clob_search(query, limit)
+    clob_results, clob_cached, clob_raw = await _fallback_clob_search(query, limit)
 
     if clob_results:
         return {
@@ -364,9 +365,9 @@ def _gamma_detail_attempts(identifier: str) -> List[Tuple[str, str]]:
     return attempts
 
 
-def _fallback_detail_from_clob(identifier: str) -> Optional[Dict[str, Any]]:
+async def _fallback_detail_from_clob(identifier: str) -> Optional[Dict[str, Any]]:
     cache_key = "clob:markets:index"
-    payload, cached = _cached_fetch(cache_key, DETAIL_CACHE_TTL, lambda: _clob_get("markets"))
+    payload, cached = await _cached_fetch(cache_key, DETAIL_CACHE_TTL, lambda: _clob_get("markets"))
 
     if _is_api_error(payload):
         return None
@@ -394,7 +395,7 @@ def _fallback_detail_from_clob(identifier: str) -> Optional[Dict[str, Any]]:
     return None
 
 
-def _fetch_market_details(identifier: str) -> Dict[str, Any]:
+async def _fetch_market_details(identifier: str) -> Dict[str, Any]:
     identifier = identifier.strip()
     if not identifier:
         return {"error": "market_id cannot be empty"}
@@ -408,7 +409,7 @@ def _fetch_market_details(identifier: str) -> Dict[str, Any]:
         tried_paths.add(path)
 
         cache_key = f"gamma-detail:{label}:{identifier}"
-        payload, cached = _cached_fetch(cache_key, DETAIL_CACHE_TTL, lambda path=path: _gamma_get(path))
+        payload, cached = await _cached_fetch(cache_key, DETAIL_CACHE_TTL, lambda path=path: _gamma_get(path))
 
         if _is_api_error(payload):
             continue
@@ -419,7 +420,7 @@ def _fetch_market_details(identifier: str) -> Dict[str, Any]:
         if label.startswith("market"):
             return _market_detail_response(payload, cached, "polymarket_gamma")
 
-    fallback = _fallback_detail_from_clob(identifier)
+    fallback = await _fallback_detail_from_clob(identifier)
     if fallback:
         return fallback
 
@@ -433,7 +434,7 @@ def _fetch_market_details(identifier: str) -> Dict[str, Any]:
     }
 
 
-def polymarket_market_data(
+async def polymarket_market_data(
     query: Optional[str] = None,
     market_id: Optional[str] = None,
     limit: int = 5,
@@ -445,9 +446,9 @@ def polymarket_market_data(
     limit = max(1, min(limit, 20))
 
     if market_id:
-        return _fetch_market_details(str(market_id))
+        return await _fetch_market_details(str(market_id))
 
-    search_response = _search_markets(query, limit)
+    search_response = await _search_markets(query, limit)
 
     if search_response.get("results"):
         return search_response
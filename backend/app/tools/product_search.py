@@ -1,108 +1,68 @@
 """Product search tool for e-commerce."""
-import copy
+import base64
+import binascii
+import hashlib
+import json
 import logging
-from typing import List, Dict, Any, Optional
-from datetime import datetime, timedelta
-from urllib.parse import urljoin
-
-import requests
+from array import array
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Sequence, Tuple
 
 from app.config import settings
+from app.services.cart import cart_service, current_cart_id
+from app.services.lru_cache import LRUCache
+from app.services.metrics import metrics
+from app.services.product_catalog import CatalogSnapshot, product_catalog
+from app.services.product_index import tokenize
 
 logger = logging.getLogger(__name__)
 
-# Cache for products
-_cached_products: Optional[List[Dict[str, Any]]] = None
-_cache_timestamp: Optional[datetime] = None
-CACHE_DURATION = timedelta(minutes=5)
-
-
-def _resolve_media_url(path: Optional[str]) -> Optional[str]:
-    """Convert relative media paths from the catalog into absolute S3 URLs."""
-    if not path:
-        return path
-
-    if path.startswith("http://") or path.startswith("https://"):
-        return path
-
-    base_url = settings.product_media_base_url.rstrip("/") if settings.product_media_base_url else ""
-    if not base_url:
-        # Nothing to resolve against – return normalized relative path
-        return path.lstrip("/")
-
-    clean_path = path.lstrip("/")
-    return urljoin(f"{base_url}/", clean_path)
-
+# Page sizes for the search endpoint
+DEFAULT_PAGE_SIZE = 5
+MAX_PAGE_SIZE = 100
 
-def _normalize_product(product: Dict[str, Any]) -> Dict[str, Any]:
-    """Ensure media fields in a product reference absolute URLs."""
-    normalized = copy.deepcopy(product)
+# Autocomplete sizes for the suggest endpoint
+DEFAULT_SUGGEST_LIMIT = 8
+MAX_SUGGEST_LIMIT = 20
 
-    normalized["image_url"] = _resolve_media_url(product.get("image_url"))
+# Full result orders kept for cursor paging, keyed by catalog and normalized query.
+# Later pages slice the cached order instead of re-scoring the query.
+RESULT_ORDER_CACHE_SIZE = 32
+_result_orders: LRUCache[Tuple[str, str], array] = LRUCache(RESULT_ORDER_CACHE_SIZE)
 
-    if isinstance(product.get("local_images"), list):
-        normalized["local_images"] = [
-            _resolve_media_url(image) for image in product["local_images"]
-        ]
+# Top results of repeated tool searches ("headphones", "cat toys"), keyed by
+# snapshot version and normalized query; emptied when a new snapshot is swapped in
+_search_cache: LRUCache[Tuple, List[Dict[str, Any]]] = LRUCache(settings.search_cache_size)
+_search_cache_version: Optional[int] = None
 
-    if isinstance(product.get("local_videos"), list):
-        normalized["local_videos"] = [
-            _resolve_media_url(video) for video in product["local_videos"]
-        ]
+metrics.register_collector(
+    "search_cache",
+    lambda: {"results": _search_cache.stats(), "result_orders": _result_orders.stats()},
+)
 
-    # Some catalogs may provide a thumbnail field – normalize if present
-    if product.get("thumbnail_url"):
-        normalized["thumbnail_url"] = _resolve_media_url(product.get("thumbnail_url"))
 
-    return normalized
+def _normalize_query(
+    query: str, max_price: Optional[float], category: Optional[str], ranked: bool
+) -> Tuple:
+    """Canonical form of a query: what the index sees, so equivalent phrasings share entries."""
+    return (
+        " ".join(tokenize(query)),
+        float(max_price) if max_price else None,
+        (category or "").strip().lower() or None,
+        ranked,
+    )
 
 
-def fetch_products() -> List[Dict[str, Any]]:
-    """Fetch products from S3 catalog with caching."""
-    global _cached_products, _cache_timestamp
-
-    # Check cache
-    if _cached_products and _cache_timestamp:
-        if datetime.now() - _cache_timestamp < CACHE_DURATION:
-            logger.debug("Using cached products")
-            return _cached_products
-
-    # Fetch fresh data
-    try:
-        logger.info(f"Fetching products from: {settings.product_catalog_url}")
-        response = requests.get(settings.product_catalog_url, timeout=10)
-        response.raise_for_status()
-        products = response.json()
-
-        # Filter available products
-        available = [p for p in products if p.get("is_available", False)]
-
-        normalized_products = [_normalize_product(product) for product in available]
-
-        # Update cache
-        _cached_products = normalized_products
-        _cache_timestamp = datetime.now()
-
-        logger.info(
-            "Loaded %s available products (media base: %s)",
-            len(normalized_products),
-            settings.product_media_base_url,
-        )
-        return normalized_products
-
-    except Exception as e:
-        logger.error(f"Error fetching products: {e}")
-        # Return cached data if available, even if expired
-        if _cached_products:
-            logger.warning("Using stale cached products")
-            return _cached_products
-        return []
+def fetch_products() -> Sequence[Dict[str, Any]]:
+    """Return the cached product catalog (refreshed in the background)."""
+    snapshot = product_catalog.get_snapshot()
+    return snapshot.products if snapshot else []
 
 
 def search_products(
     query: str, 
     max_price: Optional[float] = None, 
-    category: Optional[str] = None
+    category: Optional[str] = None,
+    ranked: bool = True,
 ) -> List[Dict[str, Any]]:
     """
     Search products matching criteria.
@@ -111,73 +71,321 @@ def search_products(
         query: Search query (searches name, short_name, description)
         max_price: Optional maximum price filter
         category: Optional category filter
+        ranked: Order results by BM25 relevance (default) or catalog order
     
     Returns:
-        List of matching products (max 5)
+        List of matching products (max 5). Results are cached per catalog
+        snapshot; the product dicts are shared and must not be modified.
     """
-    products = fetch_products()
-    query_lower = query.lower()
-    
-    # Special handling for motorcycle searches
-    is_motorcycle_query = "motorcycle" in query_lower or "bike" in query_lower
-    
-    results = []
-    for product in products:
-        # Search in multiple fields
-        name_match = query_lower in product.get("name", "").lower()
-        short_name_match = query_lower in product.get("short_name", "").lower()
-        desc_match = query_lower in product.get("description", "").lower()
-        voice_desc_match = query_lower in product.get("voice_description", "").lower()
-        
-        # Special motorcycle detection: check if "motorcycle" appears in description
-        # or as 3rd word in product title when searching for motorcycles
-        motorcycle_match = False
-        if is_motorcycle_query:
-            product_name = product.get("name", "")
-            product_desc = product.get("description", "").lower()
-            product_voice_desc = product.get("voice_description", "").lower()
-            
-            # Check if "motorcycle" appears in description
-            if "motorcycle" in product_desc or "motorcycle" in product_voice_desc:
-                motorcycle_match = True
-            else:
-                # Check if "motorcycle" is the 3rd word in the product title
-                name_words = product_name.split()
-                if len(name_words) >= 3 and name_words[2].lower() == "motorcycle":
-                    motorcycle_match = True
-        
-        # Price filter
-        if max_price and product.get("price", float('inf')) > max_price:
-            continue
-        
-        # Category filter
-        if category and product.get("category", "").lower() != category.lower():
-            continue
-        
-        if name_match or short_name_match or desc_match or voice_desc_match or motorcycle_match:
-            results.append(product)
-    
+    global _search_cache_version
+
+    snapshot = product_catalog.get_snapshot()
+    if snapshot is None:
+        return []
+
+    if snapshot.version != _search_cache_version:
+        # New catalog data: every cached result is obsolete
+        _search_cache.clear()
+        _search_cache_version = snapshot.version
+
+    key = (snapshot.version, _normalize_query(query, max_price, category, ranked))
+    cached = _search_cache.get(key)
+    if cached is not None:
+        metrics.increment("search.cache_hits")
+        return list(cached)
+    metrics.increment("search.cache_misses")
+
     # Return top 5 results
-    return results[:5]
+    top_ids = snapshot.index.search(query, 5, max_price=max_price, category=category, ranked=ranked)
+    results = [snapshot.products[doc_id] for doc_id in top_ids]
+    _search_cache.put(key, results)
+    return list(results)
+
+
+def product_facets() -> Dict[str, Any]:
+    """
+    Per-category product counts and price histograms for the current catalog.
+
+    Returns:
+        Dict with ``total``, ``categories`` (name, count, price_histogram)
+        and an overall ``price_histogram``
+    """
+    snapshot = product_catalog.get_snapshot()
+    if snapshot is None:
+        return {"total": 0, "categories": [], "price_histogram": []}
+    return snapshot.index.facets.facets()
+
+
+def suggest_products(prefix: str, limit: int = DEFAULT_SUGGEST_LIMIT) -> Dict[str, Any]:
+    """
+    Complete a partially typed query from product names.
+
+    Args:
+        prefix: Text typed so far; matches at the start of any word of a name
+        limit: Maximum number of suggestions (capped at MAX_SUGGEST_LIMIT)
+
+    Returns:
+        Dict with the ``prefix`` and its ``suggestions``, most popular product first
+    """
+    snapshot = product_catalog.get_snapshot()
+    if snapshot is None:
+        return {"prefix": prefix, "suggestions": []}
+    limit = max(1, min(limit, MAX_SUGGEST_LIMIT))
+    return {"prefix": prefix, "suggestions": snapshot.index.suggest(prefix, limit)}
+
+
+def _catalog_tag(snapshot: CatalogSnapshot) -> str:
+    """Identifies the catalog data, so cursors survive refreshes that change nothing."""
+    return snapshot.etag or f"v{snapshot.version}"
+
+
+def _query_key(query: str, max_price: Optional[float], category: Optional[str], ranked: bool) -> str:
+    """Stable digest of a normalized query and its filters."""
+    normalized = _normalize_query(query, max_price, category, ranked)
+    return hashlib.sha1(json.dumps(normalized).encode("utf-8")).hexdigest()[:16]
+
+
+def _encode_cursor(tag: str, query_key: str, offset: int) -> str:
+    payload = json.dumps({"t": tag, "q": query_key, "o": offset}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor: str, tag: str, query_key: str) -> int:
+    """
+    Return the result offset a cursor points at.
+
+    Raises:
+        ValueError: If the cursor is malformed, belongs to another query, or
+            was issued for a catalog that has since changed
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        offset = int(payload["o"])
+        cursor_tag, cursor_query = payload["t"], payload["q"]
+    except (ValueError, KeyError, TypeError, UnicodeEncodeError, binascii.Error):
+        raise ValueError("Invalid cursor")
+    if cursor_query != query_key:
+        raise ValueError("Cursor belongs to a different query")
+    if cursor_tag != tag:
+        raise ValueError("The catalog changed since this cursor was issued; restart the search")
+    if offset < 0:
+        raise ValueError("Invalid cursor")
+    return offset
+
+
+def _result_order(
+    snapshot: CatalogSnapshot,
+    query_key: str,
+    query: str,
+    max_price: Optional[float],
+    category: Optional[str],
+    ranked: bool,
+) -> array:
+    """Every match for the query in result order, computed once per catalog."""
+    cache_key = (_catalog_tag(snapshot), query_key)
+    order = _result_orders.get(cache_key)
+    if order is None:
+        scores = snapshot.index.matches(query, max_price=max_price, category=category)
+        order = snapshot.index.order(scores, ranked=ranked)
+        _result_orders.put(cache_key, order)
+    return order
+
+
+def search_products_page(
+    query: str,
+    max_price: Optional[float] = None,
+    category: Optional[str] = None,
+    ranked: bool = True,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    One page of search results, with a cursor for the next page.
+
+    The first page is a top-``limit`` selection. Following a cursor resumes
+    from a cached full result order, so deep pages cost a slice rather than
+    a re-scored, re-sorted query.
+
+    Args:
+        query: Search query (empty lists the whole catalog by popularity)
+        max_price: Optional maximum price filter
+        category: Optional category filter
+        ranked: Order by relevance (default) or catalog order
+        limit: Page size, clamped to 1..MAX_PAGE_SIZE
+        cursor: ``next_cursor`` from the previous page
+
+    Returns:
+        Dict with ``products``, ``count``, ``total`` and ``next_cursor``
+        (None on the last page)
+
+    Raises:
+        ValueError: If ``cursor`` is invalid or expired
+    """
+    snapshot = product_catalog.get_snapshot()
+    if snapshot is None:
+        return {"products": [], "count": 0, "total": 0, "next_cursor": None}
+
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    tag = _catalog_tag(snapshot)
+    query_key = _query_key(query, max_price, category, ranked)
+
+    if cursor is None:
+        offset = 0
+        scores = snapshot.index.matches(query, max_price=max_price, category=category)
+        positions = snapshot.index.top(scores, limit + 1, ranked=ranked)
+        total = len(scores)
+    else:
+        offset = _decode_cursor(cursor, tag, query_key)
+        order = _result_order(snapshot, query_key, query, max_price, category, ranked)
+        positions = order[offset:offset + limit + 1]
+        total = len(order)
+
+    page = positions[:limit]
+    next_cursor = _encode_cursor(tag, query_key, offset + len(page)) if len(positions) > limit else None
+    return {
+        "products": [snapshot.products[doc_id] for doc_id in page],
+        "count": len(page),
+        "total": total,
+        "next_cursor": next_cursor,
+    }
+
+
+def iter_search_results(
+    query: str,
+    max_price: Optional[float] = None,
+    category: Optional[str] = None,
+    ranked: bool = True,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+) -> Tuple[int, Iterator[Dict[str, Any]]]:
+    """
+    Every search result from ``cursor`` onwards, for bulk consumers.
+
+    Arguments are validated immediately; products are produced lazily from
+    one catalog snapshot, so a refresh mid-stream cannot mix catalogs.
+
+    Returns:
+        ``(total, products)`` where ``total`` counts every match of the query
+
+    Raises:
+        ValueError: If ``cursor`` is invalid or expired
+    """
+    snapshot = product_catalog.get_snapshot()
+    if snapshot is None:
+        return 0, iter(())
+
+    query_key = _query_key(query, max_price, category, ranked)
+    offset = _decode_cursor(cursor, _catalog_tag(snapshot), query_key) if cursor else 0
+    order = _result_order(snapshot, query_key, query, max_price, category, ranked)
+    end = len(order) if limit is None else min(len(order), offset + limit)
+    products = snapshot.products
+    return len(order), (products[order[position]] for position in range(offset, end))
+
+
+def get_product(product_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Look up a single product by ``product_id`` or ASIN.
+
+    Args:
+        product_id: Product ID or ASIN
+
+    Returns:
+        The product, or None if it is not in the current catalog
+    """
+    snapshot = product_catalog.get_snapshot()
+    if snapshot is None:
+        return None
+    position = snapshot.index.position(product_id)
+    return snapshot.products[position] if position is not None else None
+
+
+def lookup_products(product_ids: Iterable[str]) -> Dict[str, Any]:
+    """
+    Resolve many product IDs against one catalog snapshot.
+
+    Args:
+        product_ids: Product IDs or ASINs; duplicates are resolved once
+
+    Returns:
+        Dict with ``products`` (id -> product, in request order) and
+        ``missing`` (ids not in the catalog)
+    """
+    snapshot = product_catalog.get_snapshot()
+    found: Dict[str, Dict[str, Any]] = {}
+    missing: List[str] = []
+    for product_id in dict.fromkeys(product_ids):
+        position = snapshot.index.position(product_id) if snapshot else None
+        if position is None:
+            missing.append(product_id)
+        else:
+            found[product_id] = snapshot.products[position]
+    return {"products": found, "missing": missing}
+
+
+def get_cart(cart_id: str) -> Dict[str, Any]:
+    """
+    Cart contents with product details from the current catalog.
+
+    Args:
+        cart_id: Cart (conversation) ID
+
+    Returns:
+        Dict with ``cart_id``, ``items`` (product_id, quantity, name, price)
+        and ``total_items``
+    """
+    items = cart_service.get_cart(cart_id)
+    details = lookup_products(items)["products"]
+    return {
+        "cart_id": cart_id,
+        "items": [
+            {
+                "product_id": product_id,
+                "quantity": quantity,
+                "name": details.get(product_id, {}).get("name"),
+                "price": details.get(product_id, {}).get("price"),
+            }
+            for product_id, quantity in items.items()
+        ],
+        "total_items": sum(items.values()),
+    }
 
 
 def add_to_cart(product_id: str, quantity: int = 1) -> Dict[str, Any]:
     """
-    Add product to cart (placeholder - implement cart storage later).
+    Add product to the current conversation's cart.
     
     Args:
         product_id: Product ID to add
         quantity: Quantity to add
     
     Returns:
-        Success message
+        Success message, or an error if the product is not in the catalog
     """
-    # TODO: Implement actual cart storage (database, session, etc.)
-    logger.info(f"Adding {quantity}x product {product_id} to cart")
+    product = get_product(product_id)
+    if product is None:
+        logger.info(f"Rejected add to cart for unknown product {product_id}")
+        return {
+            "success": False,
+            "message": f"Product {product_id} was not found in the catalog.",
+            "product_id": product_id,
+        }
+    if quantity < 1:
+        return {
+            "success": False,
+            "message": "Quantity must be at least 1.",
+            "product_id": product_id,
+        }
+
+    cart_id = current_cart_id.get()
+    canonical_id = product.get("product_id") or product_id
+    items = cart_service.add_item(cart_id, canonical_id, quantity)
+    logger.info(f"Added {quantity}x product {canonical_id} to cart {cart_id}")
     return {
         "success": True,
-        "message": f"Added {quantity} item(s) with ID {product_id} to your cart.",
-        "product_id": product_id,
-        "quantity": quantity
+        "message": f"Added {quantity} item(s) of {product.get('name') or product_id} to your cart.",
+        "product_id": canonical_id,
+        "product_name": product.get("name") or canonical_id,
+        "quantity": quantity,
+        "cart_total_items": sum(items.values()),
     }
-
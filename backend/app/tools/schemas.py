@@ -1,4 +1,8 @@
 """Tool schemas for LLM function calling."""
+from typing import Any, Callable, Dict, Optional
+
+from app.services.product_index import QUERY_STOP_WORDS, subtokens, tokenize
+
 TOOLS_SCHEMA = [
     {
         "type": "function",
@@ -121,3 +125,67 @@ TOOLS_SCHEMA = [
     }
 ]
 
+
+def _spoken_price(price: Any) -> str:
+    if isinstance(price, (int, float)) and not isinstance(price, bool):
+        return f"${price:,.2f}"
+    return str(price or "").strip()
+
+
+# Words of a plain lookup ("tell me about the ...") besides the product itself
+_LOOKUP_WORDS = QUERY_STOP_WORDS | frozenset("about tell search what whats".split())
+
+
+def _is_plain_lookup(query: str, product: Dict[str, Any], user_message: str) -> bool:
+    """
+    True if the user only named a product and ``product`` has every word of
+    the query as typed (not through spelling correction or infix matching).
+    """
+    query_terms = set(tokenize(query)) - _LOOKUP_WORDS
+    if not query_terms or not set(tokenize(user_message)) - _LOOKUP_WORDS <= query_terms:
+        return False
+    product_terms = set()
+    for field in ("name", "short_name", "description", "voice_description"):
+        for token in tokenize(product.get(field)):
+            product_terms.add(token)
+            product_terms.update(subtokens(token))
+    return all(
+        any(term.startswith(query_term) for term in product_terms)
+        for query_term in query_terms
+    )
+
+
+def _render_add_to_cart(arguments: Dict[str, Any], result: Any, user_message: str) -> Optional[str]:
+    if not isinstance(result, dict) or not result.get("success"):
+        return None
+    name = result.get("product_name") or result.get("product_id")
+    quantity = result.get("quantity", 1)
+    total = result.get("cart_total_items", quantity)
+    added = f"I added {name}" if quantity == 1 else f"I added {quantity} of {name}"
+    in_cart = "1 item" if total == 1 else f"{total} items"
+    return f"{added} to your cart. You have {in_cart} in your cart now."
+
+
+def _render_product_search(arguments: Dict[str, Any], result: Any, user_message: str) -> Optional[str]:
+    # Only the clear-cut outcome: one product the user asked for by name.
+    # Several matches need comparing, no match may deserve a broader search,
+    # and a question about the product ("is it waterproof?") needs an answer
+    if not isinstance(result, list) or len(result) != 1:
+        return None
+    product = result[0]
+    name = product.get("name") or product.get("short_name")
+    if not name or not _is_plain_lookup(arguments.get("query") or "", product, user_message):
+        return None
+    price = _spoken_price(product.get("price"))
+    return f"I found {name}{f' for {price}' if price else ''}. Want me to add it to your cart?"
+
+
+# Spoken replies built straight from a tool's result, so the turn needs no
+# second completion. A tool is templatable if it has an entry here; the
+# renderer gets the call's arguments and result and the user's message, and
+# returns None when the result needs the model's own wording (errors,
+# several products to compare, a question beyond naming the product).
+TOOL_RESPONSE_TEMPLATES: Dict[str, Callable[[Dict[str, Any], Any, str], Optional[str]]] = {
+    "add_to_cart": _render_add_to_cart,
+    "search_products": _render_product_search,
+}
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Benchmark a product catalog refresh on a synthetic catalog.
+
+Compares the original deepcopy-based normalization, which resolved every
+media URL with urljoin, against the current path. Reports wall time and
+tracemalloc peak memory for a cold normalization and for a warm one where
+media URLs are unchanged, plus the search index build for reference.
+
+Usage:
+    cd backend
+    python scripts/benchmark_catalog_refresh.py
+    python scripts/benchmark_catalog_refresh.py --size 10000
+"""
+import argparse
+import copy
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import urljoin
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.config import settings  # noqa: E402
+from app.services import product_catalog  # noqa: E402
+from benchmark_product_search import make_catalog  # noqa: E402
+
+
+def legacy_resolve_media_url(path: Optional[str]) -> Optional[str]:
+    """Media URL resolution as it was before memoization."""
+    if not path:
+        return path
+    if path.startswith("http://") or path.startswith("https://"):
+        return path
+    base_url = settings.product_media_base_url.rstrip("/") if settings.product_media_base_url else ""
+    if not base_url:
+        return path.lstrip("/")
+    return urljoin(f"{base_url}/", path.lstrip("/"))
+
+
+def legacy_normalize_product(product: Dict[str, Any]) -> Dict[str, Any]:
+    """Normalization as it was before: deepcopy plus per-URL urljoin."""
+    normalized = copy.deepcopy(product)
+    normalized["image_url"] = legacy_resolve_media_url(product.get("image_url"))
+    if isinstance(product.get("local_images"), list):
+        normalized["local_images"] = [legacy_resolve_media_url(i) for i in product["local_images"]]
+    if isinstance(product.get("local_videos"), list):
+        normalized["local_videos"] = [legacy_resolve_media_url(v) for v in product["local_videos"]]
+    if product.get("thumbnail_url"):
+        normalized["thumbnail_url"] = legacy_resolve_media_url(product.get("thumbnail_url"))
+    return normalized
+
+
+def legacy_normalize(products: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    available = [p for p in products if p.get("is_available", False)]
+    return [legacy_normalize_product(p) for p in available]
+
+
+def current_normalize(products: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [
+        product_catalog._normalize_product(p) for p in products if p.get("is_available", False)
+    ]
+
+
+def measure(step: Callable[[List[Dict[str, Any]]], Any], products: List[Dict[str, Any]]):
+    """Return (seconds, peak MiB) for ``step``; timing and tracing are separate runs."""
+    # Every refresh parses a fresh payload, so hand each run its own copy
+    payload = [dict(product) for product in products]
+    start = time.perf_counter()
+    step(payload)
+    elapsed = time.perf_counter() - start
+
+    payload = [dict(product) for product in products]
+    tracemalloc.start()
+    try:
+        step(payload)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return elapsed, peak / 1024 / 1024
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size", type=int, default=50_000)
+    args = parser.parse_args()
+
+    products = make_catalog(args.size)
+
+    print(f"{args.size} products")
+    print(f"{'step':>22} {'seconds':>9} {'peak MiB':>9}")
+
+    seconds, peak = measure(legacy_normalize, products)
+    print(f"{'normalize (legacy)':>22} {seconds:>9.2f} {peak:>9.1f}")
+
+    # Cold: empty URL memo. Warm: the memo holds the previous refresh's URLs.
+    # measure() runs the step twice, so clear before each labelled cold run.
+    product_catalog._join_media_url.cache_clear()
+    start = time.perf_counter()
+    normalized = current_normalize([dict(product) for product in products])
+    cold_seconds = time.perf_counter() - start
+    product_catalog._join_media_url.cache_clear()
+    tracemalloc.start()
+    current_normalize([dict(product) for product in products])
+    _, cold_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{'normalize (cold)':>22} {cold_seconds:>9.2f} {cold_peak / 1024 / 1024:>9.1f}")
+
+    seconds, peak = measure(current_normalize, products)
+    print(f"{'normalize (warm)':>22} {seconds:>9.2f} {peak:>9.1f}")
+
+    start = time.perf_counter()
+    product_catalog.ProductIndex(normalized)
+    print(f"{'index build':>22} {time.perf_counter() - start:>9.2f} {'-':>9}")
+
+
+if __name__ == "__main__":
+    main()
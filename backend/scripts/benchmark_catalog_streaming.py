@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Benchmark peak memory of loading a large catalog: whole-body vs streaming.
+
+Writes a synthetic catalog to a temporary file, serves it over a local HTTP
+server and loads it in a fresh subprocess per mode, reporting wall time and
+peak RSS (ru_maxrss). Both modes filter unavailable products and normalize
+media URLs; the search index build is left out because it is the same for
+both.
+
+    legacy  response.json() on the full body, then filter and normalize
+    stream  ProductCatalog._download(): entries parsed off the HTTP stream
+    file    the same streaming parser reading a local path
+
+Usage:
+    cd backend
+    python scripts/benchmark_catalog_streaming.py
+    python scripts/benchmark_catalog_streaming.py --size 500000 --unavailable 0.3
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+MODES = ("legacy", "stream", "file")
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):  # keep output readable
+        pass
+
+
+def peak_rss_mib() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def run_child(mode: str, location: str) -> None:
+    """Load the catalog once in this process and print a JSON result line."""
+    import requests
+
+    from app.config import settings
+    from app.services import product_catalog
+
+    baseline = peak_rss_mib()
+    start = time.perf_counter()
+    if mode == "legacy":
+        response = requests.get(location, timeout=60)
+        response.raise_for_status()
+        products = tuple(
+            product_catalog._normalize_product(p)
+            for p in response.json()
+            if p.get("is_available", False)
+        )
+    else:
+        settings.product_catalog_url = location
+        entries, _ = product_catalog.ProductCatalog()._download()
+        products = tuple(
+            product_catalog._normalize_product(p)
+            for p in entries
+            if p.get("is_available", False)
+        )
+    elapsed = time.perf_counter() - start
+    print(json.dumps({
+        "products": len(products),
+        "seconds": elapsed,
+        "baseline_mib": baseline,
+        "peak_mib": peak_rss_mib(),
+    }))
+
+
+def write_catalog(path: Path, size: int, unavailable: float) -> None:
+    from benchmark_product_search import make_catalog
+
+    rng = random.Random(11)
+    products = make_catalog(size)
+    for product in products:
+        product["is_available"] = rng.random() >= unavailable
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(products, f, indent=2)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size", type=int, default=200_000)
+    parser.add_argument("--unavailable", type=float, default=0.2,
+                        help="fraction of products marked unavailable")
+    parser.add_argument("--child", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--location", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.location)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "unified-products-master.json"
+        write_catalog(path, args.size, args.unavailable)
+        size_mib = path.stat().st_size / 1024 / 1024
+
+        handler = partial(QuietHandler, directory=tmp)
+        server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_port}/{path.name}"
+
+        print(f"{args.size} products, {size_mib:.1f} MiB on disk, {args.unavailable:.0%} unavailable")
+        print(f"{'mode':>8} {'kept':>8} {'seconds':>9} {'base MiB':>9} {'peak MiB':>9} {'delta':>9}")
+        try:
+            for mode in MODES:
+                location = str(path) if mode == "file" else url
+                output = subprocess.run(
+                    [sys.executable, __file__, "--child", mode, "--location", location],
+                    check=True, capture_output=True, text=True, env=os.environ,
+                ).stdout
+                result = json.loads(output.strip().splitlines()[-1])
+                print(
+                    f"{mode:>8} {result['products']:>8} {result['seconds']:>9.2f} "
+                    f"{result['baseline_mib']:>9.1f} {result['peak_mib']:>9.1f} "
+                    f"{result['peak_mib'] - result['baseline_mib']:>9.1f}"
+                )
+        finally:
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Benchmark per-worker memory with private vs shared (memory-mapped) catalogs.
+
+Starts several worker processes at once, as uvicorn --workers would, and has
+each load the catalog and answer a few searches. Reports each worker's
+private memory (USS), proportional share (PSS) and RSS from
+/proc/self/smaps_rollup, so Linux only.
+
+    private  every worker parses the JSON and builds its own index
+    shared   every worker maps one snapshot file (PRODUCT_SNAPSHOT_CACHE_PATH)
+
+Usage:
+    cd backend
+    python scripts/benchmark_catalog_workers.py
+    python scripts/benchmark_catalog_workers.py --sizes 20000 80000 --workers 8
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+MODES = ("private", "shared")
+QUERIES = ["headphones", "wireless speaker", "sony", "motorcycle helmet", "hedphones", ""]
+
+
+def memory_mib() -> Dict[str, float]:
+    fields = {}
+    with open("/proc/self/smaps_rollup", encoding="ascii") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    return {
+        "rss": fields["Rss"],
+        "pss": fields["Pss"],
+        "uss": fields["Private_Clean"] + fields["Private_Dirty"],
+    }
+
+
+def run_worker(mode: str, catalog_path: str, snapshot_path: str) -> None:
+    """Load the catalog, search, report memory, then stay alive until stdin closes."""
+    from app.config import settings
+    from app.services.product_catalog import ProductCatalog
+
+    settings.product_catalog_url = catalog_path
+    settings.product_snapshot_cache_path = snapshot_path if mode == "shared" else ""
+    snapshot = ProductCatalog().refresh()
+    for query in QUERIES:
+        for doc_id in snapshot.index.search(query, 5):
+            snapshot.products[doc_id]
+    print(json.dumps({"source": snapshot.source, **memory_mib()}), flush=True)
+    sys.stdin.read()
+
+
+def measure(mode: str, catalog_path: Path, snapshot_path: Path, workers: int) -> List[Dict[str, float]]:
+    processes = [
+        subprocess.Popen(
+            [sys.executable, __file__, "--worker", mode, str(catalog_path), str(snapshot_path)],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+        )
+        for _ in range(workers)
+    ]
+    # Read every report before releasing any worker, so PSS reflects all of them sharing
+    results = [json.loads(process.stdout.readline()) for process in processes]
+    for process in processes:
+        process.communicate("")
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 40_000])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--worker", nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(*args.worker)
+        return
+
+    from benchmark_product_search import make_catalog
+
+    from app.config import settings
+    from app.services.product_catalog import ProductCatalog
+
+    print(f"{args.workers} workers; MiB per worker (mean)")
+    print(f"{'products':>9} {'mode':>8} {'USS':>8} {'PSS':>8} {'RSS':>8} {'total PSS':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            catalog_path = Path(tmp) / f"catalog-{size}.json"
+            snapshot_path = Path(tmp) / f"catalog-{size}.snapshot"
+            with open(catalog_path, "w", encoding="utf-8") as f:
+                json.dump(make_catalog(size), f)
+
+            # Build the shared file up front, as the first worker to start would
+            settings.product_catalog_url = str(catalog_path)
+            settings.product_snapshot_cache_path = str(snapshot_path)
+            ProductCatalog().refresh()
+
+            for mode in MODES:
+                results = measure(mode, catalog_path, snapshot_path, args.workers)
+                mean = {key: sum(r[key] for r in results) / len(results) for key in ("uss", "pss", "rss")}
+                total_pss = sum(r["pss"] for r in results)
+                print(
+                    f"{size:>9} {mode:>8} {mean['uss']:>8.1f} {mean['pss']:>8.1f} "
+                    f"{mean['rss']:>8.1f} {total_pss:>10.1f}"
+                )
+            os.remove(snapshot_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Benchmark concurrent chats on one worker against a local mock LLM.
+
+Starts an OpenAI-compatible mock server that answers every completion after
+--latency-ms. When tools may be called, it asks for search_products and add_to_cart;
+otherwise it answers with text. The app is then served by a single uvicorn
+worker, and batches of chats are sent at increasing concurrency.
+
+    blocking  the previous pipeline: sync OpenAI client and sync tools called
+              inside an async handler, which stalls the event loop
+    async     POST /api/chat: async OpenAI client, async tools, tool threads
+
+Each chat uses its own conversation (cart). After the async run, the script
+checks that every cart holds exactly the one item its chat added.
+
+Usage:
+    cd backend
+    python scripts/benchmark_chat_concurrency.py
+    python scripts/benchmark_chat_concurrency.py --concurrency 1 20 100 --latency-ms 300
+"""
+import argparse
+import asyncio
+import json
+import logging
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx  # noqa: E402
+import uvicorn  # noqa: E402
+
+from mock_llm import MockLLM, free_port, text_message, tool_call_message, wants_tool  # noqa: E402
+
+PRODUCT_ID = "SYN00000001"
+
+
+def reply(body: Dict) -> Dict:
+    if wants_tool(body):
+        return tool_call_message(
+            ("search_products", {"query": "headphones"}),
+            ("add_to_cart", {"product_id": PRODUCT_ID}),
+        )
+    return text_message("Added the headphones to your cart.")
+
+
+def add_blocking_route(app, base_url: str) -> None:
+    """The pre-async chat path, for comparison."""
+    from openai import OpenAI
+
+    from app.config import settings
+    from app.models.request import ChatRequest
+    from app.services.cart import current_cart_id
+    from app.services.tool_executor import tool_executor
+    from app.tools.schemas import TOOLS_SCHEMA
+
+    client = OpenAI(api_key=settings.openai_api_key, base_url=base_url)
+
+    @app.post("/bench/blocking-chat")
+    async def blocking_chat(request: ChatRequest):
+        current_cart_id.set(request.conversation_id)
+        messages = [{"role": "user", "content": request.message}]
+        first = client.chat.completions.create(model="mock", messages=messages, tools=TOOLS_SCHEMA)
+        message = first.choices[0].message
+        messages.append(message.model_dump(exclude_none=True))
+        for call in message.tool_calls or []:
+            result = tool_executor.execute(call.function.name, json.loads(call.function.arguments))
+            messages.append({"role": "tool", "tool_call_id": call.id, "content": json.dumps(result)[:1500]})
+        final = client.chat.completions.create(model="mock", messages=messages)
+        return {"text": final.choices[0].message.content}
+
+
+async def run_batch(url: str, mode: str, concurrency: int, requests_per_client: int) -> Dict[str, float]:
+    path = "/api/chat" if mode == "async" else "/bench/blocking-chat"
+    latencies: List[float] = []
+    limits = httpx.Limits(max_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=url, timeout=600, limits=limits) as client:
+        async def user(number: int) -> None:
+            for request in range(requests_per_client):
+                start = time.perf_counter()
+                response = await client.post(path, json={
+                    "message": "add headphones to my cart",
+                    "conversation_id": f"bench-{mode}-{concurrency}-{number}-{request}",
+                })
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(user(number) for number in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "chats_per_second": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000,
+    }
+
+
+def check_carts(concurrency: int, requests_per_client: int) -> bool:
+    from app.services.cart import cart_service
+
+    for number in range(concurrency):
+        for request in range(requests_per_client):
+            cart = cart_service.get_cart(f"bench-async-{concurrency}-{number}-{request}")
+            if cart != {PRODUCT_ID: 1}:
+                print(f"FAIL cart bench-async-{concurrency}-{number}-{request} holds {cart}")
+                return False
+    return True
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--requests", type=int, default=2, help="chats per simulated user")
+    parser.add_argument("--latency-ms", type=float, default=200.0, help="mock LLM latency per completion")
+    parser.add_argument("--products", type=int, default=2000)
+    args = parser.parse_args()
+
+    mock = MockLLM(reply, latency=args.latency_ms / 1000)
+    mock_url = mock.base_url
+
+    from app.config import settings
+
+    settings.openai_api_key = "sk-benchmark-" + "0" * 32
+    settings.openai_base_url = mock_url
+    settings.llm_provider = "openai"
+    # Start from empty carts and conversations on every run
+    settings.cart_store = "memory"
+    settings.conversation_store = "memory"
+
+    from benchmark_product_search import make_catalog
+
+    from app.main import app
+    from app.services.product_catalog import product_catalog
+
+    logging.disable(logging.INFO)
+    product_catalog.load(make_catalog(args.products))
+    add_blocking_route(app, mock_url)
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, lifespan="off", log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    url = f"http://127.0.0.1:{port}"
+
+    print(f"1 worker, mock LLM {args.latency_ms:.0f} ms per completion (2 per chat)")
+    print(f"{'mode':>9} {'users':>6} {'chats/s':>8} {'p50 ms':>9} {'p95 ms':>9}")
+    ok = True
+    for concurrency in args.concurrency:
+        for mode in ("blocking", "async"):
+            result = asyncio.run(run_batch(url, mode, concurrency, args.requests))
+            print(
+                f"{mode:>9} {concurrency:>6} {result['chats_per_second']:>8.1f} "
+                f"{result['p50_ms']:>9.0f} {result['p95_ms']:>9.0f}"
+            )
+        ok = check_carts(concurrency, args.requests) and ok
+
+    server.should_exit = True
+    mock.shutdown()
+    if not ok:
+        raise SystemExit(1)
+    print("Every conversation's cart holds exactly its own item")
+
+
+if __name__ == "__main__":
+    main()
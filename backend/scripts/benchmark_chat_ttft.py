@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Measure time to first token: POST /api/chat vs POST /api/chat/stream.
+
+Starts an OpenAI-compatible mock LLM that takes --first-token-ms before its
+first output and --token-ms per token after that. It supports both plain and
+streamed (SSE) completions. The first completion of every chat asks for
+search_products, and the second answers with --tokens tokens.
+
+For /api/chat, the first token reaches the client with the whole response.
+For /api/chat/stream, the script reports when the first token event arrives,
+when the first complete sentence is available (where TTS could start), and
+when the stream ends.
+
+Usage:
+    cd backend
+    python scripts/benchmark_chat_ttft.py
+    python scripts/benchmark_chat_ttft.py --first-token-ms 400 --token-ms 30 --tokens 80 --runs 5
+"""
+import argparse
+import json
+import logging
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx  # noqa: E402
+import uvicorn  # noqa: E402
+
+from mock_llm import MockLLM, free_port, text_message, tool_call_message, wants_tool  # noqa: E402
+
+ANSWER_WORDS = (
+    "I found a few great headphones for you. The Sony model has the best noise canceling. "
+    "The Anker pair is the budget pick. Want me to add one to your cart?"
+).split(" ")
+
+
+def make_reply(tokens: int):
+    answer = "".join(ANSWER_WORDS[i % len(ANSWER_WORDS)] + " " for i in range(tokens))
+
+    def reply(body: Dict) -> Dict:
+        if wants_tool(body):
+            return tool_call_message(("search_products", {"query": "headphones"}))
+        return text_message(answer)
+
+    return reply
+
+
+def time_blocking(client: httpx.Client, conversation_id: str) -> float:
+    start = time.perf_counter()
+    response = client.post("/api/chat", json={"message": "find headphones", "conversation_id": conversation_id})
+    response.raise_for_status()
+    return time.perf_counter() - start
+
+
+def time_streaming(client: httpx.Client, conversation_id: str) -> Dict[str, float]:
+    start = time.perf_counter()
+    first_token = first_sentence = None
+    text = ""
+    event = None
+    with client.stream("POST", "/api/chat/stream", json={"message": "find headphones", "conversation_id": conversation_id}) as response:
+        response.raise_for_status()
+        for line in response.iter_lines():
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+            elif line.startswith("data: "):
+                data = json.loads(line[len("data: "):])
+                if event == "error":
+                    raise RuntimeError(data["detail"])
+                if event == "token":
+                    now = time.perf_counter() - start
+                    first_token = first_token if first_token is not None else now
+                    text += data["text"]
+                    if first_sentence is None and any(mark in text for mark in ".!?"):
+                        first_sentence = now
+    return {"first_token": first_token, "first_sentence": first_sentence, "total": time.perf_counter() - start}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--first-token-ms", type=float, default=300.0)
+    parser.add_argument("--token-ms", type=float, default=25.0)
+    parser.add_argument("--tokens", type=int, default=60)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    mock = MockLLM(make_reply(args.tokens), latency=args.first_token_ms / 1000, per_token=args.token_ms / 1000)
+
+    from app.config import settings
+
+    settings.openai_api_key = "sk-benchmark-" + "0" * 32
+    settings.openai_base_url = mock.base_url
+    settings.llm_provider = "openai"
+    # Start from empty carts and conversations on every run
+    settings.cart_store = "memory"
+    settings.conversation_store = "memory"
+
+    from benchmark_product_search import make_catalog
+
+    from app.main import app
+    from app.services.product_catalog import product_catalog
+
+    logging.disable(logging.INFO)
+    product_catalog.load(make_catalog(1000))
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, lifespan="off", log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+
+    blocking: List[float] = []
+    streaming: List[Dict[str, float]] = []
+    with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=120) as client:
+        # A new conversation per request, so every turn sees the same prompt
+        for run in range(args.runs):
+            blocking.append(time_blocking(client, f"ttft-blocking-{run}"))
+            streaming.append(time_streaming(client, f"ttft-stream-{run}"))
+
+    def median_ms(values) -> float:
+        return statistics.median(values) * 1000
+
+    print(
+        f"mock LLM: {args.first_token_ms:.0f} ms to first token, {args.token_ms:.0f} ms/token, "
+        f"{args.tokens} tokens; median of {args.runs} runs"
+    )
+    print(f"{'endpoint':>17} {'first token':>12} {'first sentence':>15} {'complete':>9}")
+    print(f"{'/api/chat':>17} {median_ms(blocking):>10.0f}ms {median_ms(blocking):>13.0f}ms {median_ms(blocking):>7.0f}ms")
+    print(
+        f"{'/api/chat/stream':>17} {median_ms(r['first_token'] for r in streaming):>10.0f}ms "
+        f"{median_ms(r['first_sentence'] for r in streaming):>13.0f}ms "
+        f"{median_ms(r['total'] for r in streaming):>7.0f}ms"
+    )
+
+    server.should_exit = True
+    mock.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Replay a long voice session with client-side and server-side history.
+
+Runs --turns chat turns through LLMService against a fake completion
+endpoint and compares two ways of carrying the conversation:
+
+    client   the client resends its whole history in every request and the
+             server keeps the last messages that fit (previous behaviour)
+    server   the conversation store appends each turn, folds older turns
+             into a rolling summary and sends summary + recent messages
+
+The user states a budget in the first turn. For each mode the script reports
+the request size the client uploads, the prompt tokens per completion, the
+number of summary calls, and whether the budget is still in the prompt of
+the last turn.
+
+Usage:
+    cd backend
+    python scripts/benchmark_conversation_memory.py
+    python scripts/benchmark_conversation_memory.py --turns 200
+"""
+import argparse
+import asyncio
+import json
+import logging
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.config import settings  # noqa: E402
+from app.services.conversation import ConversationService, SQLiteConversationStore  # noqa: E402
+from app.services.llm import LLMService  # noqa: E402
+from app.services.tool_executor import ToolExecutor  # noqa: E402
+
+FACT = "My budget is 240 dollars and I only want over-ear headphones."
+QUESTIONS = [
+    "What about the battery life on that one?",
+    "Is there a cheaper option with noise canceling?",
+    "Does it come in black? My commute is about an hour each way on the train.",
+    "Compare the two you just mentioned for comfort on long flights.",
+]
+ANSWER = (
+    "Good question. The Sony model lasts about thirty hours with noise canceling on, and the Anker "
+    "pair is lighter. Both fold flat for travel. Want me to add one to your cart?"
+)
+
+
+class FakeCompletions:
+    def __init__(self, counter):
+        self.counter = counter
+        self.prompt_tokens: List[int] = []
+        self.summary_calls = 0
+        self.last_prompt = ""
+
+    async def create(self, **payload):
+        messages = payload["messages"]
+        if messages[0]["content"].startswith("You keep the memory"):
+            # Summarizer: keep what the user asked for, one line per message
+            self.summary_calls += 1
+            request = messages[1]["content"]
+            previous = request.split("Summary so far:\n", 1)[-1].split("\n\nNew messages:", 1)[0]
+            previous = previous if request.startswith("Summary so far:") else ""
+            new = [
+                line[len("User: "):].split(".")[0] for line in request.split("New messages:\n", 1)[1].splitlines()
+                if line.startswith("User: ") and ("budget" in line or "want" in line)
+            ]
+            content = " ".join(part for part in [previous, *new] if part) or "The user is browsing headphones."
+        else:
+            self.prompt_tokens.append(self.counter.count_messages(messages))
+            self.last_prompt = json.dumps(messages)
+            content = ANSWER
+        message = SimpleNamespace(role="assistant", content=content, tool_calls=None)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+
+def user_message(turn: int) -> str:
+    return FACT if turn == 0 else QUESTIONS[turn % len(QUESTIONS)]
+
+
+async def run_client(service: LLMService, turns: int) -> Dict[str, Any]:
+    history: List[Dict[str, Any]] = []
+    upload = []
+    for turn in range(turns):
+        message = user_message(turn)
+        upload.append(len(json.dumps({"message": message, "history": history})))
+        result = await service.process_with_tools(message, history, [], ToolExecutor())
+        history += [{"role": "user", "content": message}, {"role": "assistant", "content": result["text"]}]
+    return {"upload": upload}
+
+
+async def run_server(service: LLMService, conversations: ConversationService, turns: int) -> Dict[str, Any]:
+    upload = []
+    context_seconds = []
+    for turn in range(turns):
+        message = user_message(turn)
+        upload.append(len(json.dumps({"message": message, "conversation_id": "bench"})))
+        start = time.perf_counter()
+        history = conversations.context("bench")
+        context_seconds.append(time.perf_counter() - start)
+        result = await service.process_with_tools(message, history, [], ToolExecutor(), trim_history=False)
+        conversations.append_turn("bench", message, result["text"])
+        await conversations.compact("bench", service.summarize)
+    return {"upload": upload, "context_ms": statistics.median(context_seconds) * 1000}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--turns", type=int, default=60)
+    args = parser.parse_args()
+
+    settings.llm_provider = "openai"
+    logging.disable(logging.WARNING)
+
+    print(f"{args.turns} turns, {settings.llm_model}")
+    print(
+        f"{'history':>8} {'upload last':>12} {'prompt median':>14} {'prompt max':>11} "
+        f"{'summaries':>10} {'budget kept':>12}"
+    )
+    ok = True
+    with tempfile.TemporaryDirectory() as directory:
+        for mode in ("client", "server"):
+            service = LLMService()
+            completions = FakeCompletions(service.token_counter)
+            service._client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+            if mode == "client":
+                result = asyncio.run(run_client(service, args.turns))
+            else:
+                conversations = ConversationService(SQLiteConversationStore(str(Path(directory) / "conversations.db")))
+                result = asyncio.run(run_server(service, conversations, args.turns))
+                conversations.close()
+            kept = "240 dollars" in completions.last_prompt
+            print(
+                f"{mode:>8} {result['upload'][-1]:>11}B {statistics.median(completions.prompt_tokens):>14.0f} "
+                f"{max(completions.prompt_tokens):>11} {completions.summary_calls:>10} {'yes' if kept else 'no':>12}"
+            )
+            if mode == "server":
+                print(f"server-side context lookup: {result['context_ms']:.3f} ms median")
+                ok = kept
+
+    if not ok:
+        print("FAIL: the first turn's budget was lost")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
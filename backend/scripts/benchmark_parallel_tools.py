@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark one LLM turn's tool calls run one after another vs concurrently.
+
+Simulates a turn that asks for a stock quote, a Polymarket market and a
+product search, with the given network latencies. The product search is a
+sync tool, so it runs in a worker thread. Reports the wall time of
+sequential execution (the previous loop) and of ToolExecutor.execute_many_async.
+Then checks that results keep the call order and that a hung tool times out
+without holding back the others.
+
+Usage:
+    cd backend
+    python scripts/benchmark_parallel_tools.py
+    python scripts/benchmark_parallel_tools.py --latencies-ms 250 400 150 --timeout 0.5
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.tool_executor import ToolExecutor  # noqa: E402
+
+
+def make_executor(quote_ms: float, market_ms: float, search_ms: float, timeout: float) -> ToolExecutor:
+    executor = ToolExecutor()
+
+    async def alpha_vantage_market_data(symbol: str):
+        await asyncio.sleep(quote_ms / 1000)
+        return {"symbol": symbol, "price": 123.45}
+
+    async def polymarket_market_data(query: str):
+        await asyncio.sleep(market_ms / 1000)
+        return {"query": query, "results": [{"question": query}]}
+
+    def search_products(query: str):
+        time.sleep(search_ms / 1000)
+        return [{"name": f"{query} result"}]
+
+    async def hung_tool():
+        await asyncio.sleep(3600)
+
+    executor.register_tool("alpha_vantage_market_data", alpha_vantage_market_data)
+    executor.register_tool("polymarket_market_data", polymarket_market_data)
+    executor.register_tool("search_products", search_products)
+    executor.register_tool("hung_tool", hung_tool, timeout=timeout)
+    return executor
+
+
+CALLS = [
+    ("alpha_vantage_market_data", {"symbol": "AAPL"}),
+    ("polymarket_market_data", {"query": "election"}),
+    ("search_products", {"query": "headphones"}),
+]
+
+
+async def sequential(executor: ToolExecutor):
+    return [await executor.execute_async(name, args) for name, args in CALLS]
+
+
+async def main_async(args) -> bool:
+    executor = make_executor(*args.latencies_ms, timeout=args.timeout)
+    print(f"{'mode':>11} {'wall ms':>8}")
+    for label, run in (("sequential", sequential), ("concurrent", lambda e: e.execute_many_async(CALLS))):
+        start = time.perf_counter()
+        results = await run(executor)
+        print(f"{label:>11} {(time.perf_counter() - start) * 1000:>8.0f}")
+
+    in_order = (
+        results[0].get("symbol") == "AAPL"
+        and results[1].get("query") == "election"
+        and results[2][0]["name"] == "headphones result"
+    )
+    if not in_order:
+        print(f"FAIL: results out of order: {results}")
+        return False
+
+    start = time.perf_counter()
+    results = await executor.execute_many_async([("hung_tool", {}), *CALLS])
+    elapsed = time.perf_counter() - start
+    print(f"{'with hang':>11} {elapsed * 1000:>8.0f}  ({results[0]['error']})")
+    if "timed out" not in results[0].get("error", "") or "error" in results[1]:
+        print("FAIL: hung tool did not time out cleanly")
+        return False
+    return True
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--latencies-ms", type=float, nargs=3, default=[300, 400, 200],
+        metavar=("QUOTE", "MARKET", "SEARCH"),
+    )
+    parser.add_argument("--timeout", type=float, default=1.0, help="timeout for the hung tool, seconds")
+    args = parser.parse_args()
+
+    if not asyncio.run(main_async(args)):
+        raise SystemExit(1)
+    print("Results keep call order; the hung tool timed out alone")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Benchmark product search against large synthetic catalogs.
+
+Compares the original linear substring scan with the indexed search path,
+both in latency and in memory allocated per query. The indexed path is
+timed with search_products' result cache emptied before every query; the
+latency of a repeated (cached) query is reported on its own line.
+
+Usage:
+    cd backend
+    python scripts/benchmark_product_search.py
+    python scripts/benchmark_product_search.py --sizes 1000 10000 --repeat 50
+    python scripts/benchmark_product_search.py --allocations
+    python scripts/benchmark_product_search.py --sizes 100000 --fuzzy-budget-ms 25
+"""
+import argparse
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services import product_catalog  # noqa: E402
+from app.tools import product_search  # noqa: E402
+
+BRANDS = ["Sony", "Apple", "Anker", "Bose", "Logitech", "Samsung", "Kong", "Ninja", "Dyson", "Garmin"]
+NOUNS = [
+    "Headphones", "Earbuds", "Speaker", "Charger", "Keyboard", "Mouse", "Blender", "Vacuum",
+    "Watch", "Camera", "Helmet", "Backpack", "Lamp", "Toy", "Brush", "Kettle", "Monitor",
+]
+ADJECTIVES = [
+    "Wireless", "Portable", "Premium", "Compact", "Smart", "Rechargeable", "Waterproof",
+    "Ergonomic", "Stainless", "Motorcycle", "Noise Canceling", "Bluetooth",
+]
+CATEGORIES = ["Electronics", "Home & Kitchen", "Pet Supplies", "Automotive", "Office Supplies"]
+QUERIES = ["headphones", "wireless speaker", "sony", "motorcycle helmet", "kettle", "zzz-no-match"]
+# Misspellings in the style of speech-to-text output; each falls through to fuzzy lookup
+FUZZY_QUERIES = ["hedphones", "wireles speeker", "samsng", "ergonmic keybord", "blu tooth", "garmn wach"]
+
+
+def make_catalog(size: int, seed: int = 7) -> List[Dict[str, Any]]:
+    """Generate ``size`` products shaped like unified-products-master.json entries."""
+    rng = random.Random(seed)
+    products = []
+    for i in range(size):
+        brand = rng.choice(BRANDS)
+        noun = rng.choice(NOUNS)
+        adjectives = " ".join(rng.sample(ADJECTIVES, 2))
+        name = f"{brand} {adjectives} {noun} Model {i}"
+        description = f"{adjectives} {noun.lower()} by {brand} with {rng.randint(1, 48)}-hour battery"
+        images = [f"product_media/SYN{i:08d}/image_{n:02d}.jpg" for n in range(1, rng.randint(2, 6))]
+        products.append({
+            "product_id": f"SYN{i:08d}",
+            "name": name,
+            "short_name": f"{brand} {noun}",
+            "description": description,
+            "voice_description": description,
+            "price": round(rng.uniform(5, 800), 2),
+            "currency": "USD",
+            "category": rng.choice(CATEGORIES),
+            "is_available": True,
+            "rating": round(rng.uniform(3.0, 5.0), 1),
+            "reviews": rng.randint(0, 20000),
+            "image_url": images[0],
+            "local_images": images,
+            "image_count": len(images),
+        })
+    return products
+
+
+def linear_search(
+    products: List[Dict[str, Any]],
+    query: str,
+    max_price: Optional[float] = None,
+    category: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """The original O(N * fields) substring scan, kept as the baseline."""
+    query_lower = query.lower()
+    is_motorcycle_query = "motorcycle" in query_lower or "bike" in query_lower
+
+    results = []
+    for product in products:
+        name_match = query_lower in product.get("name", "").lower()
+        short_name_match = query_lower in product.get("short_name", "").lower()
+        desc_match = query_lower in product.get("description", "").lower()
+        voice_desc_match = query_lower in product.get("voice_description", "").lower()
+
+        motorcycle_match = False
+        if is_motorcycle_query:
+            product_desc = product.get("description", "").lower()
+            product_voice_desc = product.get("voice_description", "").lower()
+            if "motorcycle" in product_desc or "motorcycle" in product_voice_desc:
+                motorcycle_match = True
+            else:
+                name_words = product.get("name", "").split()
+                if len(name_words) >= 3 and name_words[2].lower() == "motorcycle":
+                    motorcycle_match = True
+
+        if max_price and product.get("price", float('inf')) > max_price:
+            continue
+        if category and product.get("category", "").lower() != category.lower():
+            continue
+        if name_match or short_name_match or desc_match or voice_desc_match or motorcycle_match:
+            results.append(product)
+
+    return results[:5]
+
+
+def prime_cache(products: List[Dict[str, Any]]) -> float:
+    """Install ``products`` as the current catalog snapshot and return the build time."""
+    catalog = product_catalog.product_catalog
+    synonyms = catalog._load_synonyms()
+    start = time.perf_counter()
+    catalog.load(products, synonyms)
+    return time.perf_counter() - start
+
+
+def uncached_search(query: str) -> List[Dict[str, Any]]:
+    """search_products with its result cache emptied first, so the index does the work."""
+    product_search._search_cache.clear()
+    return product_search.search_products(query)
+
+
+def time_queries(search, repeat: int) -> float:
+    """Return mean milliseconds per query over the benchmark query set."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for query in QUERIES:
+            search(query)
+    elapsed = time.perf_counter() - start
+    return elapsed * 1000 / (repeat * len(QUERIES))
+
+
+def measure_allocations(search) -> float:
+    """Return mean peak KiB allocated while answering one query."""
+    tracemalloc.start()
+    try:
+        total = 0
+        for query in QUERIES:
+            search(query)  # warm up lazily created state outside the measurement
+            baseline, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            search(query)
+            _, peak = tracemalloc.get_traced_memory()
+            total += peak - baseline
+    finally:
+        tracemalloc.stop()
+    return total / 1024 / len(QUERIES)
+
+
+def check_fuzzy_budget(budget_ms: float, repeat: int) -> bool:
+    """Time misspelled queries (result cache bypassed); True if p95 is within budget."""
+    timings = []
+    for _ in range(repeat):
+        for query in FUZZY_QUERIES:
+            start = time.perf_counter()
+            results = uncached_search(query)
+            timings.append((time.perf_counter() - start) * 1000)
+            if not results:
+                print(f"  fuzzy query {query!r} returned no products")
+
+    timings.sort()
+    p50 = timings[len(timings) // 2]
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    within = p95 <= budget_ms
+    print(
+        f"{'':>10} fuzzy p50 {p50:.3f} ms, p95 {p95:.3f} ms "
+        f"(budget {budget_ms} ms: {'OK' if within else 'EXCEEDED'})"
+    )
+    return within
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument(
+        "--allocations", action="store_true", help="also report peak KiB allocated per query"
+    )
+    parser.add_argument(
+        "--fuzzy-budget-ms",
+        type=float,
+        help="fail if p95 latency of misspelled queries exceeds this budget",
+    )
+    args = parser.parse_args()
+    within_budget = True
+
+    print(f"{'products':>10} {'build ms':>10} {'linear ms/q':>12} {'index ms/q':>11} {'speedup':>8}")
+    for size in args.sizes:
+        products = make_catalog(size)
+        build_seconds = prime_cache(products)
+
+        linear_ms = time_queries(lambda q: linear_search(products, q), args.repeat)
+        indexed_ms = time_queries(uncached_search, args.repeat)
+        # Repeated queries are answered from search_products' result cache
+        cached_ms = time_queries(product_search.search_products, args.repeat)
+
+        print(
+            f"{size:>10} {build_seconds * 1000:>10.1f} {linear_ms:>12.3f} "
+            f"{indexed_ms:>11.3f} {linear_ms / indexed_ms:>7.1f}x"
+        )
+        print(f"{'':>10} {'cache hit':>10} {'':>12} {cached_ms:>11.4f}")
+
+        if args.allocations:
+            linear_kib = measure_allocations(lambda q: linear_search(products, q))
+            indexed_kib = measure_allocations(uncached_search)
+            print(
+                f"{'':>10} {'alloc KiB/q':>10} {linear_kib:>12.1f} {indexed_kib:>11.1f}"
+            )
+
+        if args.fuzzy_budget_ms is not None:
+            within_budget &= check_fuzzy_budget(args.fuzzy_budget_ms, args.repeat)
+
+    if not within_budget:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Benchmark product name autocomplete against large synthetic catalogs.
+
+Times ProductIndex.suggest for short and long prefixes, on the index as built
+from JSON and as attached from a binary snapshot. Checks every answer against
+a brute-force scan of the names. Exits non-zero if p99 latency exceeds the
+budget.
+
+Usage:
+    cd backend
+    python scripts/benchmark_product_suggest.py
+    python scripts/benchmark_product_suggest.py --sizes 10000 100000 --budget-ms 0.5
+"""
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.catalog_binary import read_catalog_binary, write_catalog_binary  # noqa: E402
+from app.services.product_index import ProductIndex, popularity_boost, tokenize  # noqa: E402
+
+PREFIXES = ["s", "so", "son", "sony", "sony wire", "head", "wireless b", "model 12", "k", "zzz"]
+LIMIT = 8
+
+
+def expected(products: List[Dict[str, Any]], prefix: str) -> Dict[str, float]:
+    """Reference answer: every name with a word-start match, with its best popularity."""
+    typed = " ".join(tokenize(prefix))
+    best: Dict[str, float] = {}
+    for product in products:
+        boost = popularity_boost(product)
+        for text in (product.get("name"), product.get("short_name")):
+            words = tokenize(text)
+            if any(" ".join(words[i:]).startswith(typed) for i in range(len(words))):
+                normalized = " ".join(words)
+                best[normalized] = max(boost, best.get(normalized, 0.0))
+    return best
+
+
+def time_prefixes(index: ProductIndex, repeat: int) -> List[float]:
+    samples = []
+    for _ in range(repeat):
+        for prefix in PREFIXES:
+            start = time.perf_counter()
+            index.suggest(prefix, LIMIT)
+            samples.append((time.perf_counter() - start) * 1000)
+    return sorted(samples)
+
+
+def check(index: ProductIndex, products: List[Dict[str, Any]]) -> bool:
+    """Suggestions must be the reference's most popular names (ties may be ordered differently)."""
+    ok = True
+    for prefix in PREFIXES:
+        matches = expected(products, prefix)
+        want = sorted(matches.values(), reverse=True)[:LIMIT]
+        got = [matches.get(" ".join(tokenize(text))) for text in index.suggest(prefix, LIMIT)]
+        if got != want:
+            print(f"  MISMATCH {prefix!r}: popularity {got}, expected {want}")
+            ok = False
+    return ok
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--budget-ms", type=float, default=1.0, help="p99 latency budget per call")
+    args = parser.parse_args()
+
+    from benchmark_product_search import make_catalog
+
+    print(f"{'products':>9} {'index':>7} {'build s':>8} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    within_budget = True
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            products = make_catalog(size)
+            start = time.perf_counter()
+            built = ProductIndex(products)
+            build_seconds = time.perf_counter() - start
+
+            path = Path(tmp) / f"catalog-{size}.snapshot"
+            write_catalog_binary(path, products, built, {}, "")
+            _, attached, _ = read_catalog_binary(path.read_bytes())
+
+            for label, index in (("built", built), ("binary", attached)):
+                if not check(index, products):
+                    within_budget = False
+                samples = time_prefixes(index, args.repeat)
+                p99 = samples[int(len(samples) * 0.99) - 1]
+                within_budget = within_budget and p99 <= args.budget_ms
+                print(
+                    f"{size:>9} {label:>7} {build_seconds:>8.2f} {statistics.median(samples):>8.3f} "
+                    f"{p99:>8.3f} {samples[-1]:>8.3f}"
+                )
+
+    if not within_budget:
+        print(f"FAIL: over the {args.budget_ms} ms budget or wrong suggestions")
+        raise SystemExit(1)
+    print(f"All prefixes within {args.budget_ms} ms (p99)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Benchmark POST /api/chat with the response cache on and off.
+
+Replays a stream of voice questions in which a few intents repeat with
+different wording ("what's the price of AirPods", "AirPods price?"), mixed
+with follow-ups that depend on the conversation or the user ("how much is
+that one", "what's in my cart").
+The app runs in-process against an OpenAI-compatible mock LLM that takes
+--latency-ms per completion and answers product questions with a
+search_products call. Reports LLM calls, cache hits and latency per mode,
+and fails if a follow-up is served from the cache.
+
+Usage:
+    cd backend
+    python scripts/benchmark_response_cache.py
+    python scripts/benchmark_response_cache.py --requests 500 --latency-ms 400
+"""
+import argparse
+import asyncio
+import logging
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx  # noqa: E402
+
+from mock_llm import MockLLM, text_message, tool_call_message, wants_tool  # noqa: E402
+
+# Intents, each asked in several ways
+INTENTS = [
+    ["what's the price of AirPods", "AirPods price?", "price of airpods please"],
+    ["show me headphones under 300", "Show me headphones under 300.", "headphones under 300"],
+    ["find a bluetooth speaker", "Find me a Bluetooth speaker", "bluetooth speakers"],
+    ["what smart watches do you have", "show smart watches", "smart watch options"],
+]
+FOLLOW_UPS = ["how much is that one", "does it come in black", "show me more like those", "what's in my cart"]
+
+
+def reply(body: Dict) -> Dict:
+    if wants_tool(body):
+        return tool_call_message(("search_products", {"query": body["messages"][-1]["content"]}))
+    return text_message("Here are the best matches I found.")
+
+
+def make_workload(size: int, seed: int) -> List[str]:
+    rng = random.Random(seed)
+    return [
+        rng.choice(FOLLOW_UPS) if rng.random() < 0.2 else rng.choice(rng.choice(INTENTS))
+        for _ in range(size)
+    ]
+
+
+async def replay(app, workload: List[str], mock: MockLLM, mode: str) -> Dict[str, List[float]]:
+    latencies: Dict[str, List[float]] = {"question": [], "follow_up": []}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://app", timeout=60) as client:
+        for number, message in enumerate(workload):
+            calls = mock.calls
+            start = time.perf_counter()
+            response = await client.post("/api/chat", json={"message": message, "conversation_id": f"rc-{mode}-{number}"})
+            response.raise_for_status()
+            kind = "follow_up" if message in FOLLOW_UPS else "question"
+            latencies[kind].append(time.perf_counter() - start)
+            if response.json()["tools_used"] != ["search_products"]:
+                raise RuntimeError(f"the answer to {message!r} carries no fresh search results")
+            if kind == "follow_up" and mock.calls == calls:
+                raise RuntimeError(f"follow-up {message!r} was answered from the cache")
+    return latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="mock LLM latency per completion")
+    parser.add_argument("--seed", type=int, default=24)
+    args = parser.parse_args()
+
+    mock = MockLLM(reply, latency=args.latency_ms / 1000)
+
+    from app.config import settings
+
+    settings.openai_api_key = "sk-benchmark-" + "0" * 32
+    settings.openai_base_url = mock.base_url
+    settings.llm_provider = "openai"
+    settings.cart_store = "memory"
+    settings.conversation_store = "memory"
+    settings.response_cache_enabled = True
+
+    from benchmark_product_search import make_catalog
+
+    import app.main
+    from app.services.product_catalog import product_catalog
+
+    logging.disable(logging.WARNING)
+    product_catalog.load(make_catalog(2000))
+    cache = app.main.response_cache
+    workload = make_workload(args.requests, args.seed)
+
+    print(f"{args.requests} chats, mock LLM {args.latency_ms:.0f} ms per completion")
+    print(f"{'cache':>6} {'LLM calls':>10} {'hits':>6} {'question p50':>13} {'follow-up p50':>14}")
+
+    async def run_modes() -> None:
+        # One event loop for both modes: the LLM client's connections belong to it
+        for enabled in (False, True):
+            app.main.response_cache = cache if enabled else None
+            cache.clear()
+            mock.calls = 0
+            hits_before = cache._entries.hits
+            latencies = await replay(app.main.app, workload, mock, "on" if enabled else "off")
+            hits = cache._entries.hits - hits_before if enabled else 0
+            print(
+                f"{'on' if enabled else 'off':>6} {mock.calls:>10} {hits:>6} "
+                f"{statistics.median(latencies['question']) * 1000:>11.0f}ms "
+                f"{statistics.median(latencies['follow_up']) * 1000:>12.0f}ms"
+            )
+
+    asyncio.run(run_modes())
+    mock.shutdown()
+    print("Follow-ups always reached the LLM; cached answers carried fresh search results")
+
+
+if __name__ == "__main__":
+    main()
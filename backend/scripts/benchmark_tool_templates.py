@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Benchmark POST /api/chat with templated tool replies on and off.
+
+Replays voice turns that add a product to the cart, ask about one product
+by name, or browse a category. The app runs in-process against an
+OpenAI-compatible mock LLM that takes --latency-ms per completion and picks
+the tool from the wording. With templates on, cart additions and searches
+with a single match are answered from the tool result without a second
+completion; browsing (several matches) still goes through the model.
+Reports LLM calls and latency per kind of turn, and fails if a templated
+turn made a second call or a browsing turn skipped it.
+
+Usage:
+    cd backend
+    python scripts/benchmark_tool_templates.py
+    python scripts/benchmark_tool_templates.py --requests 300 --latency-ms 500
+"""
+import argparse
+import asyncio
+import logging
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx  # noqa: E402
+
+from mock_llm import MockLLM, text_message, tool_call_message, wants_tool  # noqa: E402
+
+ADD_PREFIX = "add to my cart: "
+LOOKUP_PREFIX = "tell me about the "
+BROWSE_QUERIES = ["wireless headphones", "bluetooth speaker", "smart watch", "electric kettle"]
+SECOND_CALL_TEXT = "Here is what I found for you."
+
+
+def reply(body: Dict) -> Dict:
+    if not wants_tool(body):
+        return text_message(SECOND_CALL_TEXT)
+    text = body["messages"][-1]["content"]
+    if text.startswith(ADD_PREFIX):
+        return tool_call_message(("add_to_cart", {"product_id": text[len(ADD_PREFIX):], "quantity": 1}))
+    return tool_call_message(("search_products", {"query": text.replace(LOOKUP_PREFIX, "")}))
+
+
+def make_workload(catalog: List[Dict[str, Any]], size: int, seed: int) -> List[Tuple[str, str]]:
+    rng = random.Random(seed)
+    workload = []
+    for _ in range(size):
+        product = rng.choice(catalog)
+        kind = rng.choice(["cart", "lookup", "browse"])
+        if kind == "cart":
+            workload.append((kind, ADD_PREFIX + product["product_id"]))
+        elif kind == "lookup":
+            workload.append((kind, LOOKUP_PREFIX + product["name"]))
+        else:
+            workload.append((kind, rng.choice(BROWSE_QUERIES)))
+    return workload
+
+
+async def replay(app, workload: List[Tuple[str, str]], mock: MockLLM, templated: bool):
+    latencies: Dict[str, List[float]] = {"cart": [], "lookup": [], "browse": []}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://app", timeout=60) as client:
+        for number, (kind, message) in enumerate(workload):
+            calls = mock.calls
+            start = time.perf_counter()
+            response = await client.post("/api/chat", json={"message": message, "conversation_id": f"tt-{number}"})
+            response.raise_for_status()
+            latencies[kind].append(time.perf_counter() - start)
+            expected = 1 if templated and kind != "browse" else 2
+            if mock.calls - calls != expected:
+                raise RuntimeError(f"{kind} turn {message!r} made {mock.calls - calls} LLM calls, expected {expected}")
+            if expected == 1 and response.json()["text"] == SECOND_CALL_TEXT:
+                raise RuntimeError(f"{kind} turn {message!r} was not answered from a template")
+    return latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=150)
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="mock LLM latency per completion")
+    parser.add_argument("--seed", type=int, default=25)
+    args = parser.parse_args()
+
+    mock = MockLLM(reply, latency=args.latency_ms / 1000)
+
+    from app.config import settings
+
+    settings.openai_api_key = "sk-benchmark-" + "0" * 32
+    settings.openai_base_url = mock.base_url
+    settings.llm_provider = "openai"
+    settings.cart_store = "memory"
+    settings.conversation_store = "memory"
+
+    from benchmark_product_search import make_catalog
+
+    import app.main
+    from app.services.metrics import metrics
+    from app.services.product_catalog import product_catalog
+    from app.tools.schemas import TOOL_RESPONSE_TEMPLATES
+
+    logging.disable(logging.WARNING)
+    catalog = make_catalog(2000)
+    product_catalog.load(catalog)
+    workload = make_workload(catalog, args.requests, args.seed)
+
+    print(f"{args.requests} chats, mock LLM {args.latency_ms:.0f} ms per completion")
+    print(f"{'templates':>10} {'LLM calls':>10} {'templated':>10} {'cart p50':>9} {'lookup p50':>11} {'browse p50':>11}")
+
+    async def run_modes() -> None:
+        # One event loop for both modes: the LLM client's connections belong to it
+        for templated in (False, True):
+            app.main.llm_service.response_templates = TOOL_RESPONSE_TEMPLATES if templated else {}
+            mock.calls = 0
+            before = metrics.snapshot()["counters"].get("llm.template_responses", 0)
+            latencies = await replay(app.main.app, workload, mock, templated)
+            rendered = metrics.snapshot()["counters"].get("llm.template_responses", 0) - before
+            print(
+                f"{'on' if templated else 'off':>10} {mock.calls:>10} {rendered:>10} "
+                + " ".join(
+                    f"{statistics.median(latencies[kind]) * 1000:>{width}.0f}ms"
+                    for kind, width in (("cart", 7), ("lookup", 9), ("browse", 9))
+                )
+            )
+
+    asyncio.run(run_modes())
+    mock.shutdown()
+    print("Cart and single-product turns took one completion; browsing kept the second")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Build the binary catalog snapshot that Lambda containers load on cold start.
+
+Downloads the JSON catalog (PRODUCT_CATALOG_URL, or --source), normalizes it
+with the configured PRODUCT_MEDIA_BASE_URL, builds the search index and
+writes everything to one file. Run it whenever the catalog is published and
+upload the result next to the JSON, then point PRODUCT_SNAPSHOT_URL at it.
+The snapshot is reloaded and compared against the freshly built index
+before the script reports success.
+
+Usage:
+    cd backend
+    python scripts/build_catalog_snapshot.py --output unified-products-master.snapshot
+    python scripts/build_catalog_snapshot.py --source ./unified-products-master.json --output catalog.snapshot
+    aws s3 cp unified-products-master.snapshot s3://tubbyai-products-catalog/
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.config import settings  # noqa: E402
+from app.services.catalog_binary import read_catalog_binary, write_catalog_binary  # noqa: E402
+from app.services.product_catalog import ProductCatalog  # noqa: E402
+
+# Queries used to check that the stored index answers like the built one
+CHECK_QUERIES = ["headphones", "wireless speaker", "sony", "bike", "hedphones", ""]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--source", help="JSON catalog URL or path (default: PRODUCT_CATALOG_URL)")
+    parser.add_argument("--output", required=True, type=Path)
+    args = parser.parse_args()
+
+    if args.source:
+        settings.product_catalog_url = args.source
+    # Always build from the JSON catalog, never from a previous snapshot
+    settings.product_snapshot_url = ""
+
+    start = time.perf_counter()
+    snapshot = ProductCatalog().refresh()
+    if snapshot is None:
+        print(f"ERROR: could not load the catalog from {settings.product_catalog_url}")
+        sys.exit(1)
+    built = time.perf_counter() - start
+    print(f"Loaded and indexed {len(snapshot.products)} products in {built:.2f}s")
+
+    size = write_catalog_binary(
+        args.output,
+        snapshot.products,
+        snapshot.index,
+        snapshot.synonyms,
+        media_base_url=settings.product_media_base_url,
+        etag=snapshot.etag,
+        last_modified=snapshot.last_modified,
+    )
+    print(f"Wrote {args.output} ({size / 1024 / 1024:.1f} MiB)")
+
+    data = args.output.read_bytes()
+    start = time.perf_counter()
+    products, index, _ = read_catalog_binary(data)
+    attached = time.perf_counter() - start
+    print(f"Snapshot attaches in {attached * 1000:.1f} ms (vs {built:.2f}s to build)")
+
+    if len(products) != len(snapshot.products):
+        print("ERROR: product count mismatch after reload")
+        sys.exit(1)
+    for query in CHECK_QUERIES:
+        expected = snapshot.index.search(query, 5)
+        if index.search(query, 5) != expected:
+            print(f"ERROR: stored index disagrees with the built one for {query!r}")
+            sys.exit(1)
+        if [products[doc_id] for doc_id in expected] != [snapshot.products[doc_id] for doc_id in expected]:
+            print(f"ERROR: stored products differ for {query!r}")
+            sys.exit(1)
+    print("Snapshot verified")
+
+
+if __name__ == "__main__":
+    main()
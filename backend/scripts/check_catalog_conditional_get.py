@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Verify catalog refreshes use conditional GETs against a local HTTP stand-in for S3.
+
+Serves a catalog with ETag / Last-Modified headers, refreshes twice and
+checks that the second refresh receives a 304 and keeps the already
+parsed, normalized and indexed snapshot. Then changes the synonym table
+and checks that a 304 refresh re-indexes with it, and changes the catalog
+and checks that the next refresh rebuilds it.
+
+Usage:
+    cd backend
+    python scripts/check_catalog_conditional_get.py
+"""
+import hashlib
+import json
+import sys
+import threading
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.config import settings  # noqa: E402
+from app.services.product_catalog import ProductCatalog  # noqa: E402
+
+CATALOG = [
+    {"product_id": "A1", "name": "Sony WH-1000XM5 Headphones", "price": 398, "is_available": True},
+    {"product_id": "A2", "name": "Apple AirPods Pro", "price": 249, "is_available": True},
+]
+
+
+class CatalogHandler(BaseHTTPRequestHandler):
+    """Serves the catalog like S3 does: strong ETag, Last-Modified, 304 on match."""
+
+    body = b""
+    etag = ""
+    last_modified = ""
+    statuses = []
+    synonyms = {"expansions": {}}
+
+    @classmethod
+    def publish(cls, catalog) -> None:
+        cls.body = json.dumps(catalog).encode("utf-8")
+        cls.etag = '"%s"' % hashlib.md5(cls.body).hexdigest()
+        cls.last_modified = formatdate(usegmt=True)
+
+    def do_GET(self):  # noqa: N802 - BaseHTTPRequestHandler API
+        if self.path.endswith("/product_synonyms.json"):
+            body = json.dumps(self.synonyms).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        if self.headers.get("If-None-Match") == self.etag:
+            self.statuses.append(304)
+            self.send_response(304)
+            self.send_header("ETag", self.etag)
+            self.end_headers()
+            return
+
+        self.statuses.append(200)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(self.body)))
+        self.send_header("ETag", self.etag)
+        self.send_header("Last-Modified", self.last_modified)
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, format, *args):  # keep output readable
+        pass
+
+
+def check(condition: bool, message: str) -> None:
+    print(f"{'OK  ' if condition else 'FAIL'} {message}")
+    if not condition:
+        raise SystemExit(1)
+
+
+def main() -> None:
+    CatalogHandler.publish(CATALOG)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), CatalogHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    settings.product_catalog_url = f"http://127.0.0.1:{server.server_port}/unified-products-master.json"
+    settings.product_synonyms_url = f"http://127.0.0.1:{server.server_port}/product_synonyms.json"
+
+    try:
+        catalog = ProductCatalog()
+
+        first = catalog.refresh()
+        check(CatalogHandler.statuses == [200], "initial refresh downloads the catalog")
+        check(first is not None and first.etag == CatalogHandler.etag, "ETag stored on snapshot")
+
+        second = catalog.refresh()
+        check(CatalogHandler.statuses[-1] == 304, "second refresh gets 304 Not Modified")
+        check(second.version == first.version, "snapshot version unchanged")
+        check(second.index is first.index, "index reused without rebuild")
+        check(second.products is first.products, "products reused without parsing")
+        check(second.loaded_at >= first.loaded_at, "freshness timestamp renewed")
+
+        CatalogHandler.synonyms = {"expansions": {"earbuds": ["airpods"]}}
+        reindexed = catalog.refresh()
+        check(CatalogHandler.statuses[-1] == 304, "catalog still not modified")
+        check(reindexed.version > second.version, "changed synonyms re-index the catalog")
+        check(reindexed.products == second.products, "products reused without downloading")
+        check(bool(reindexed.index.search("earbuds", 5)), "new expansion is searchable")
+        second = reindexed
+
+        CatalogHandler.publish(CATALOG + [
+            {"product_id": "A3", "name": "Kindle Paperwhite", "price": 149, "is_available": True},
+        ])
+        third = catalog.refresh()
+        check(CatalogHandler.statuses[-1] == 200, "changed catalog is downloaded again")
+        check(third.version > first.version and len(third.products) == 3, "new snapshot built")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Measure how much of each chat prompt a provider could serve from its cache.
+
+Replays a voice session through LLMService against a fake completion
+endpoint that caches like OpenAI: a request reuses the longest token prefix
+it shares with an earlier request, in 128-token steps once that prefix is at
+least 1024 tokens. The fake reports the cached tokens in ``usage`` like the
+API does, so the script also checks what the ``llm_usage`` metrics show.
+
+    legacy   the previous assembly: history cut to the last 6 messages every
+             turn, and the call after the tools ran sent no tools schema
+    client   current assembly with the history resent by the client
+    server   current assembly with the conversation store (rolling summary)
+
+Usage:
+    cd backend
+    python scripts/check_prompt_prefix.py
+    python scripts/check_prompt_prefix.py --turns 100
+"""
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.config import settings  # noqa: E402
+from app.services.conversation import ConversationService, SQLiteConversationStore  # noqa: E402
+from app.services.llm import LLMService  # noqa: E402
+from app.services.tool_executor import ToolExecutor  # noqa: E402
+from app.tools.schemas import TOOLS_SCHEMA  # noqa: E402
+
+MIN_CACHED_PREFIX = 1024
+CACHE_STEP = 128
+
+QUESTIONS = [
+    "Find me wireless headphones with good noise canceling for flights.",
+    "How long does the battery last on the second one?",
+    "Show me something similar but under a hundred dollars.",
+    "Does that one come in black, and is it comfortable with glasses?",
+]
+ANSWER = (
+    "The Sony pair lasts about thirty hours with noise canceling on and folds flat. The Anker "
+    "model is the budget pick at seventy nine dollars and comes in black. Want me to add one?"
+)
+
+
+class CachingCompletions:
+    def __init__(self, counter):
+        self.encoding = counter._load()
+        self.seen: List[List[int]] = []
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+
+    def render(self, payload: Dict[str, Any]) -> List[int]:
+        # Providers place the tools schema right after the system prompt
+        messages = payload["messages"]
+        parts = [json.dumps(messages[0])]
+        if payload.get("tools"):
+            parts.append(json.dumps(payload["tools"]))
+        parts.extend(json.dumps(message) for message in messages[1:])
+        return [token for part in parts for token in self.encoding.encode(part, disallowed_special=())]
+
+    def cached(self, tokens: List[int]) -> int:
+        best = 0
+        for previous in self.seen:
+            shared = 0
+            for a, b in zip(previous, tokens):
+                if a != b:
+                    break
+                shared += 1
+            best = max(best, shared)
+        return best - best % CACHE_STEP if best >= MIN_CACHED_PREFIX else 0
+
+    async def create(self, **payload):
+        tokens = self.render(payload)
+        cached = self.cached(tokens)
+        self.seen.append(tokens)
+        self.prompt_tokens += len(tokens)
+        self.cached_tokens += cached
+
+        if payload.get("tools") and payload.get("tool_choice") != "none" and "Find" in payload["messages"][-1]["content"]:
+            call = SimpleNamespace(
+                id=f"call_{len(self.seen)}", type="function",
+                function=SimpleNamespace(name="search_products", arguments=json.dumps({"query": "headphones"})),
+            )
+            message = SimpleNamespace(role="assistant", content=None, tool_calls=[call])
+        else:
+            message = SimpleNamespace(role="assistant", content=ANSWER, tool_calls=None)
+        usage = SimpleNamespace(
+            prompt_tokens=len(tokens), completion_tokens=40,
+            prompt_tokens_details=SimpleNamespace(cached_tokens=cached),
+        )
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
+
+class LegacyLLMService(LLMService):
+    """The previous request assembly, for comparison."""
+
+    def _prepare_history(self, history):
+        return history[-self.max_history_messages:]
+
+    async def chat_completion(self, messages, tools=None, tool_choice="auto"):
+        if tool_choice == "none":
+            tools, tool_choice = None, "auto"
+        return await super().chat_completion(messages, tools, tool_choice)
+
+
+def search_products(query: str):
+    return [{"name": f"{query} model {i}", "price": 79.0 + 40 * i, "rating": 4.5} for i in range(5)]
+
+
+async def run_session(service: LLMService, turns: int, conversations: ConversationService = None) -> None:
+    executor = ToolExecutor()
+    executor.register_tool("search_products", search_products)
+    history: List[Dict[str, Any]] = []
+    for turn in range(turns):
+        message = QUESTIONS[turn % len(QUESTIONS)]
+        if conversations is None:
+            result = await service.process_with_tools(message, history, TOOLS_SCHEMA, executor)
+            history += [{"role": "user", "content": message}, {"role": "assistant", "content": result["text"]}]
+        else:
+            context = conversations.context("session")
+            result = await service.process_with_tools(message, context, TOOLS_SCHEMA, executor, trim_history=False)
+            conversations.append_turn("session", message, result["text"])
+            await conversations.compact("session", service.summarize)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--turns", type=int, default=40)
+    args = parser.parse_args()
+
+    settings.llm_provider = "openai"
+    logging.disable(logging.WARNING)
+
+    print(f"{args.turns} turns, prefix cached from {MIN_CACHED_PREFIX} tokens in {CACHE_STEP}-token steps")
+    print(
+        f"{'assembly':>9} {'prompt tokens':>14} {'cached':>10} {'uncached':>9} "
+        f"{'cached %':>9} {'metrics cached %':>17}"
+    )
+    ratios = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for mode in ("legacy", "client", "server"):
+            service = LegacyLLMService() if mode == "legacy" else LLMService()
+            completions = CachingCompletions(service.token_counter)
+            service._client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+            conversations = None
+            if mode == "server":
+                conversations = ConversationService(SQLiteConversationStore(str(Path(directory) / "c.db")))
+            asyncio.run(run_session(service, args.turns, conversations))
+            if conversations is not None:
+                conversations.close()
+
+            # Summary calls go through the same fake and count as well
+            uncached = completions.prompt_tokens - completions.cached_tokens
+            ratios[mode] = completions.cached_tokens / completions.prompt_tokens
+            print(
+                f"{mode:>9} {completions.prompt_tokens:>14} {completions.cached_tokens:>10} {uncached:>9} "
+                f"{ratios[mode] * 100:>8.1f}% {service.usage_stats()['cached_ratio'] * 100:>16.1f}%"
+            )
+
+    if ratios["client"] <= ratios["legacy"]:
+        print("FAIL: the current assembly caches no more than the legacy one")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
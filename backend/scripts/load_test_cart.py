@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Load test the cart service with many concurrent carts.
+
+Runs bursts of add-to-cart updates from several threads against each store,
+once writing through on every update (the naive approach) and once with the
+write-back cache. Reports throughput, p95 latency per update and store round
+trips. Then checks that every cart persisted with the expected quantities.
+
+    memory  InMemoryCartStore, a stand-in for DynamoDB/Redis with --latency-ms per round trip
+    sqlite  SQLiteCartStore in a temporary directory
+
+Usage:
+    cd backend
+    python scripts/load_test_cart.py
+    python scripts/load_test_cart.py --carts 500 --threads 32 --updates 20 --latency-ms 5
+"""
+import argparse
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.cart import CartService, CartStore, InMemoryCartStore, SQLiteCartStore  # noqa: E402
+
+
+class CountingStore(CartStore):
+    """Wraps a store to count calls for stores that do not count round trips themselves."""
+
+    def __init__(self, inner: CartStore):
+        self.inner = inner
+        self.name = inner.name
+        self.loads = 0
+        self.batches = 0
+
+    def load(self, cart_id):
+        self.loads += 1
+        return self.inner.load(cart_id)
+
+    def save_many(self, carts):
+        self.batches += 1
+        self.inner.save_many(carts)
+
+    def close(self):
+        self.inner.close()
+
+
+def run(service: CartService, carts: int, threads: int, updates: int, seed: int) -> Dict[str, float]:
+    """Each thread owns a slice of the carts and adds ``updates`` items to each."""
+    rng = random.Random(seed)
+    plan: List[List[str]] = [[] for _ in range(threads)]
+    for cart in range(carts):
+        plan[cart % threads].append(f"cart-{cart}")
+    latencies: List[float] = []
+    lock = threading.Lock()
+
+    def worker(cart_ids: List[str], worker_seed: int) -> None:
+        local_rng = random.Random(worker_seed)
+        samples = []
+        for _ in range(updates):
+            for cart_id in cart_ids:
+                start = time.perf_counter()
+                service.add_item(cart_id, f"P{local_rng.randrange(50):03d}", 1)
+                samples.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(samples)
+
+    workers = [
+        threading.Thread(target=worker, args=(cart_ids, rng.random())) for cart_ids in plan
+    ]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    service.flush()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "ops": len(latencies),
+        "ops_per_second": len(latencies) / elapsed,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        "mean_ms": statistics.fmean(latencies) * 1000,
+    }
+
+
+def verify(store: CartStore, carts: int, updates: int) -> None:
+    """Every cart must hold exactly ``updates`` units once flushed."""
+    reader = CartService(store, flush_interval=0)
+    for cart in range(carts):
+        items = reader.get_cart(f"cart-{cart}")
+        total = sum(items.values())
+        if total != updates:
+            print(f"FAIL cart-{cart} holds {total} items, expected {updates}")
+            raise SystemExit(1)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--carts", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--updates", type=int, default=10, help="add-to-cart calls per cart")
+    parser.add_argument("--latency-ms", type=float, default=2.0, help="simulated remote store round trip")
+    args = parser.parse_args()
+
+    print(f"{args.carts} carts x {args.updates} updates from {args.threads} threads")
+    print(f"{'store':>7} {'mode':>13} {'ops/s':>9} {'mean ms':>8} {'p95 ms':>8} {'writes':>7}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for store_name in ("memory", "sqlite"):
+            for mode, flush_interval in (("write-through", 0.0), ("write-back", 0.2)):
+                if store_name == "memory":
+                    inner: CartStore = InMemoryCartStore(latency=args.latency_ms / 1000)
+                else:
+                    inner = SQLiteCartStore(str(Path(tmp) / f"carts-{mode}.db"))
+                store = CountingStore(inner)
+                service = CartService(store, cache_size=args.carts * 2, flush_interval=flush_interval)
+                result = run(service, args.carts, args.threads, args.updates, seed=7)
+                service.close()
+                writes = inner.round_trips - store.loads if store_name == "memory" else store.batches
+                print(
+                    f"{store_name:>7} {mode:>13} {result['ops_per_second']:>9.0f} "
+                    f"{result['mean_ms']:>8.3f} {result['p95_ms']:>8.3f} {writes:>7}"
+                )
+
+                if store_name == "sqlite":
+                    inner = SQLiteCartStore(inner.path)
+                verify(inner, args.carts, args.updates)
+    print("All carts persisted")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+OpenAI-compatible mock LLM for the chat benchmarks.
+
+Serves POST /v1/chat/completions on a local port, plain or streamed (SSE).
+A ``reply`` function picks the assistant message from the request body;
+every completion takes ``latency`` seconds before its first output and
+``per_token`` seconds for each further word of text.
+
+Usage (from a script in this directory):
+    from mock_llm import MockLLM, text_message, tool_call_message, wants_tool
+
+    mock = MockLLM(lambda body: tool_call_message(("search_products", {"query": "tv"}))
+                   if wants_tool(body) else text_message("Here you go."), latency=0.3)
+    settings.openai_base_url = mock.base_url
+"""
+import json
+import re
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Tuple
+
+Reply = Callable[[Dict[str, Any]], Dict[str, Any]]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wants_tool(body: Dict[str, Any]) -> bool:
+    """True if the request lets the model call a tool."""
+    return bool(body.get("tools")) and body.get("tool_choice") != "none"
+
+
+def text_message(content: str) -> Dict[str, Any]:
+    return {"role": "assistant", "content": content}
+
+
+def tool_call_message(*calls: Tuple[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """An assistant message calling each ``(name, arguments)`` in order."""
+    return {"role": "assistant", "content": None, "tool_calls": [
+        {"id": f"call_{number}", "type": "function", "function": {
+            "name": name, "arguments": json.dumps(arguments)}}
+        for number, (name, arguments) in enumerate(calls)
+    ]}
+
+
+def _tokens(content: str) -> List[str]:
+    return re.findall(r"\S+\s*", content) or [content]
+
+
+def completion(message: Dict[str, Any]) -> bytes:
+    """A non-streamed chat.completion response carrying ``message``."""
+    completion_tokens = len(_tokens(message["content"])) if message.get("content") else 20
+    return json.dumps({
+        "id": "chatcmpl-mock",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": "mock",
+        "choices": [{
+            "index": 0,
+            "message": message,
+            "finish_reason": "tool_calls" if message.get("tool_calls") else "stop",
+        }],
+        "usage": {"prompt_tokens": 100, "completion_tokens": completion_tokens,
+                  "total_tokens": 100 + completion_tokens},
+    }).encode("utf-8")
+
+
+def _chunk(delta: Dict[str, Any], finish_reason=None) -> bytes:
+    data = {
+        "id": "chatcmpl-mock", "object": "chat.completion.chunk", "created": int(time.time()),
+        "model": "mock", "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+    return f"data: {json.dumps(data)}\n\n".encode("utf-8")
+
+
+class MockLLM:
+    """
+    Mock completions server running in a daemon thread.
+
+    Attributes:
+        base_url: Value for ``OPENAI_BASE_URL``
+        calls: Completions served so far (benchmarks may reset it)
+    """
+
+    def __init__(self, reply: Reply, latency: float = 0.0, per_token: float = 0.0):
+        self.reply = reply
+        self.latency = latency
+        self.per_token = per_token
+        self.calls = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", free_port()), self._handler())
+        self._server.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self._server.server_address[1]}/v1"
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def shutdown(self) -> None:
+        self._server.shutdown()
+
+    def _handler(self):
+        mock = self
+
+        class MockLLMHandler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _write_chunk(self, data: bytes) -> None:
+                self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+                self.wfile.flush()
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with mock._lock:
+                    mock.calls += 1
+                message = mock.reply(body)
+                tokens = _tokens(message["content"]) if message.get("content") else []
+                time.sleep(mock.latency)
+
+                if not body.get("stream"):
+                    time.sleep(mock.per_token * max(len(tokens) - 1, 0))
+                    payload = completion(message)
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(payload)))
+                    self.end_headers()
+                    self.wfile.write(payload)
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                if message.get("tool_calls"):
+                    calls = [dict(call, index=index) for index, call in enumerate(message["tool_calls"])]
+                    self._write_chunk(_chunk({"role": "assistant", "tool_calls": calls}))
+                    self._write_chunk(_chunk({}, "tool_calls"))
+                else:
+                    for position, token in enumerate(tokens):
+                        if position:
+                            time.sleep(mock.per_token)
+                        self._write_chunk(_chunk({"content": token}))
+                    self._write_chunk(_chunk({}, "stop"))
+                self._write_chunk(b"data: [DONE]\n\n")
+                self._write_chunk(b"")
+
+        return MockLLMHandler
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Replay a conversation corpus and count context-length errors.
+
+Generates conversations whose history mixes English chat, number-heavy tool
+output, JSON and CJK text (which the old one-token-per-3-characters guess
+undercounts the most), then runs each turn through
+LLMService.process_with_tools against a fake completion endpoint. The fake
+endpoint renders every request in the chat format, counts it with the
+model's tokenizer and rejects it with a context_length_exceeded error when
+it does not fit the context window, as the API does.
+
+The corpus is replayed twice: with the current token budgeting, and with the
+previous character-based trimming, where each error cost a retry call.
+Exits non-zero if the current budgeting hits any error.
+
+Usage:
+    cd backend
+    python scripts/replay_context_budget.py
+    python scripts/replay_context_budget.py --conversations 500 --model gpt-4o --seed 7
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+import statistics
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.config import settings  # noqa: E402
+from app.services.llm import LLMService  # noqa: E402
+from app.services.token_counter import TokenCounter  # noqa: E402
+from app.services.tool_executor import ToolExecutor  # noqa: E402
+from app.tools.schemas import TOOLS_SCHEMA  # noqa: E402
+
+ENGLISH = (
+    "Can you compare the noise canceling on these two headphones and tell me which one "
+    "has the better battery life for long flights? I also care about comfort."
+)
+CJK = "这款耳机的降噪效果非常好，电池续航时间长，佩戴舒适。ワイヤレスイヤホンの音質はとても良いです。"
+NUMBERS = "SKU 4901234567894 qty 12 @ $1,299.99 = $15,599.88; lot 2024-03-17T09:41:07Z #A7F3-22B9"
+
+
+def make_conversation(rng: random.Random) -> List[Dict[str, Any]]:
+    """A client-side history in one language: alternating user and assistant messages."""
+    language = rng.choice((ENGLISH, CJK))
+    history = []
+    for turn in range(rng.randint(0, 8)):
+        style = rng.choice((language, language, NUMBERS, None))
+        if style is None:
+            product = {"id": f"SYN{rng.randrange(10**8):08d}", "price": rng.random() * 500, "specs": NUMBERS}
+            text = json.dumps([product] * rng.randint(1, 15))
+        else:
+            text = " ".join([style] * rng.randint(1, 40))
+        history.append({"role": "user" if turn % 2 == 0 else "assistant", "content": text})
+    return history
+
+
+class FakeCompletions:
+    """Counts each request like the API and enforces the context window."""
+
+    def __init__(self, counter: TokenCounter):
+        self.counter = counter
+        self.calls = 0
+        self.errors = 0
+        self.prompt_tokens: List[int] = []
+
+    def prompt_size(self, payload: Dict[str, Any]) -> int:
+        encoding = self.counter._load()
+        rendered = "".join(
+            f"<|im_start|>{message['role']}"
+            + (f" name={message['name']}" if message.get("name") else "")
+            + f"\n{message.get('content') or ''}"
+            + "".join(json.dumps(call) for call in message.get("tool_calls", []))
+            + "<|im_end|>\n"
+            for message in payload["messages"]
+        ) + "<|im_start|>assistant\n"
+        tools = json.dumps(payload["tools"], separators=(",", ":")) if payload.get("tools") else ""
+        return len(encoding.encode(rendered, allowed_special="all")) + len(encoding.encode(tools))
+
+    async def create(self, **payload):
+        self.calls += 1
+        tokens = self.prompt_size(payload)
+        if tokens > self.counter.context_window:
+            self.errors += 1
+            raise RuntimeError(
+                "Error code: 400 - {'error': {'code': 'context_length_exceeded', 'message': "
+                f"\"This model's maximum context length is {self.counter.context_window} tokens. "
+                f"However, your messages resulted in {tokens} tokens.\"}}"
+            )
+        self.prompt_tokens.append(tokens)
+        if payload.get("tools") and payload.get("tool_choice") != "none":
+            call = SimpleNamespace(
+                id=f"call_{self.calls}", type="function",
+                function=SimpleNamespace(name="search_products", arguments=json.dumps({"query": "headphones"})),
+            )
+            message = SimpleNamespace(role="assistant", content=None, tool_calls=[call])
+        else:
+            message = SimpleNamespace(role="assistant", content="Here are a few options.", tool_calls=None)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+
+class LegacyLLMService(LLMService):
+    """The previous character-based trimming, for comparison."""
+
+    @staticmethod
+    def _estimate(message: Dict[str, Any]) -> int:
+        content = message.get("content") or ""
+        if not content:
+            return 50 if message.get("tool_calls") else 5
+        tokens = len(content) // 3
+        if message.get("role") == "tool":
+            tokens = int(tokens * 1.5)
+        return tokens + (15 if message.get("role") == "tool" else 10)
+
+    def _legacy_trim(self, messages, limit):
+        total, kept = 0, []
+        for message in reversed(messages):
+            total += self._estimate(message)
+            if total > limit:
+                break
+            kept.insert(0, message)
+        return kept
+
+    def _prepare_history(self, history):
+        return self._legacy_trim(history[-6:], 5000)
+
+    def _enforce_context_limits(self, messages, tools=None):
+        messages = self._truncate_tool_responses(messages)
+        limit = max(5000 - (1500 if tools else 0), 2000)
+        return self._legacy_trim(messages[-6:], limit) or messages[-1:]
+
+
+async def replay(service: LLMService, corpus: List[List[Dict[str, Any]]]) -> Dict[str, Any]:
+    completions = FakeCompletions(service.token_counter)
+    service._client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    executor = ToolExecutor()
+    executor.register_tool("search_products", lambda query: [{"name": f"{query} {i}", "specs": NUMBERS} for i in range(5)])
+
+    failed = 0
+    for history in corpus:
+        try:
+            await service.process_with_tools("find me headphones", history, TOOLS_SCHEMA, executor)
+        except RuntimeError:
+            failed += 1
+    return {
+        "calls": completions.calls,
+        "errors": completions.errors,
+        "failed_turns": failed,
+        "median_prompt": statistics.median(completions.prompt_tokens) if completions.prompt_tokens else 0,
+        "max_prompt": max(completions.prompt_tokens, default=0),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--conversations", type=int, default=300)
+    parser.add_argument("--model", default="gpt-4")
+    parser.add_argument("--seed", type=int, default=21)
+    args = parser.parse_args()
+
+    settings.llm_provider = "openai"
+    settings.llm_model = args.model
+    logging.disable(logging.ERROR)
+
+    rng = random.Random(args.seed)
+    corpus = [make_conversation(rng) for _ in range(args.conversations)]
+
+    current = LLMService()
+    if not current.token_counter.exact:
+        raise SystemExit("tiktoken or the vendored vocabulary is unavailable; counts would be estimates")
+
+    print(f"{args.conversations} conversations, {args.model} ({current.token_counter.context_window} token window)")
+    print(f"{'budgeting':>10} {'calls':>6} {'ctx errors':>11} {'median prompt':>14} {'max prompt':>11}")
+    results = {}
+    for label, service in (("legacy", LegacyLLMService()), ("tokenizer", current)):
+        result = results[label] = asyncio.run(replay(service, corpus))
+        print(
+            f"{label:>10} {result['calls']:>6} {result['errors']:>11} "
+            f"{result['median_prompt']:>14.0f} {result['max_prompt']:>11}"
+        )
+
+    if results["tokenizer"]["errors"]:
+        print("FAIL: context-length errors with tokenizer budgeting")
+        raise SystemExit(1)
+    print("No context-length errors, so no retry calls")
+
+
+if __name__ == "__main__":
+    main()
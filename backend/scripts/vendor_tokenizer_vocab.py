@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Download the tokenizer vocabularies that token counting loads offline.
+
+Fetches the BPE files for the given tiktoken encodings (tiktoken checks
+each against its published SHA-256) and writes them to app/data/tiktoken
+as <encoding>.tiktoken, next to encodings.json with the split pattern,
+special tokens and file hash the backend needs to rebuild each encoding
+without tiktoken's download cache. Run it when tiktoken is upgraded or a
+model with a new encoding is configured, and commit the files.
+
+Usage:
+    cd backend
+    python scripts/vendor_tokenizer_vocab.py
+    python scripts/vendor_tokenizer_vocab.py --encodings cl100k_base o200k_base
+"""
+import argparse
+import base64
+import hashlib
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.token_counter import VOCAB_DIR, VOCAB_MANIFEST  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--encodings", nargs="+", default=["cl100k_base", "o200k_base"])
+    args = parser.parse_args()
+
+    VOCAB_DIR.mkdir(parents=True, exist_ok=True)
+    manifest_path = VOCAB_DIR / VOCAB_MANIFEST
+    manifest = json.loads(manifest_path.read_text()) if manifest_path.exists() else {}
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        # A fresh download cache, so nothing stale is vendored
+        os.environ["TIKTOKEN_CACHE_DIR"] = cache_dir
+        import tiktoken
+
+        for name in args.encodings:
+            encoding = tiktoken.get_encoding(name)
+            ranks = sorted(encoding._mergeable_ranks.items(), key=lambda item: item[1])
+            data = b"".join(base64.b64encode(token) + b" %d\n" % rank for token, rank in ranks)
+            path = VOCAB_DIR / f"{name}.tiktoken"
+            path.write_bytes(data)
+            manifest[name] = {
+                "file": path.name,
+                "sha256": hashlib.sha256(data).hexdigest(),
+                "pat_str": encoding._pat_str,
+                "special_tokens": encoding._special_tokens,
+            }
+            print(f"{name}: {encoding.n_vocab} tokens, {path.relative_to(VOCAB_DIR.parent.parent.parent)} ({len(data)} bytes)")
+
+    manifest_path.write_text(json.dumps(manifest, indent=2, sort_keys=True) + "\n")
+
+
+if __name__ == "__main__":
+    main()